@@ -0,0 +1,438 @@
+"""Record/replay cassettes for one session's external calls.
+
+A cassette is a gzipped JSON-lines file holding, in order:
+
+- `audio`: each raw chunk the phone sent, with its arrival time
+- `stt`: each `StreamingRecognizeResponse` (serialized proto) with the time
+  it arrived and how many chunks had been fed to the Transcriber by then
+- `chunking`: each instructor `ChunkingResult`, keyed by the transcript it
+  chunked, with how long the call took
+- `recommend`: each recommender response text, keyed by its prompt
+- `dump`: each time the working buffer was sent for chunking, as the number
+  of final results received by then
+- `topic_match`: each local topic fast-path decision, keyed by the dumped
+  text (`topic_id` is null when the dump went to the LLM)
+
+Record with `python mainserver.py --record DIR`; replay with
+`python -m benchmarks.replay DIR/<session>.cassette.jsonl.gz`.
+"""
+import base64
+import dataclasses
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Callable, Deque, Dict, List, Optional
+
+from google.cloud import speech_v1 as speech
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+CASSETTE_SUFFIX = ".cassette.jsonl.gz"
+
+
+def _key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def prompt_transcript(prompt: str) -> str:
+    """The transcript section of a chunking prompt."""
+    return prompt.split("Here is the transcript to chunk:")[1].split(
+        "Here are the existing topics:"
+    )[0].strip()
+
+
+class CassetteWriter:
+    def __init__(self, path: str, session_id: str, config: Optional[Dict] = None):
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._closed = False
+        self.write(
+            "meta",
+            version=CASSETTE_VERSION,
+            session_id=session_id,
+            recorded_at=time.time(),
+            config=config or {},
+        )
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def write(self, kind: str, **fields) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._file.write(json.dumps({"kind": kind, "t": round(self.elapsed(), 6), **fields}) + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._file.close()
+
+
+class Cassette:
+    """A recorded session loaded back into memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta: Dict = {}
+        self.audio: List[Dict] = []
+        self.stt: List[Dict] = []
+        self.chunking: List[Dict] = []
+        self.recommend: List[Dict] = []
+        self.dump: List[Dict] = []
+        self.topic_match: List[Dict] = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind = record.pop("kind")
+                if kind == "meta":
+                    self.meta = record
+                else:
+                    getattr(self, kind).append(record)
+        if self.meta.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {self.meta.get('version')} in {path}")
+
+    def transcriber_config(self, **overrides):
+        """The recorded TranscriberConfig, with `overrides` applied."""
+        from transcriber import TranscriberConfig
+
+        known = {f.name for f in dataclasses.fields(TranscriberConfig)}
+        recorded = {k: v for k, v in self.meta.get("config", {}).items() if k in known}
+        # Recorded before the local topic fast path existed: every dump went to the LLM
+        recorded.setdefault("topic_fast_path_threshold", 0.0)
+        return TranscriberConfig(**{**recorded, **overrides})
+
+    @property
+    def duration(self) -> float:
+        return self.audio[-1]["t"] if self.audio else 0.0
+
+
+# --- recording ---------------------------------------------------------------
+
+_recording = threading.local()
+
+
+class _RecordingCall:
+    def __init__(self, call, on_response: Callable):
+        self._call = call
+        self._on_response = on_response
+
+    def __iter__(self):
+        for response in self._call:
+            self._on_response(response)
+            yield response
+
+    def cancel(self):
+        if hasattr(self._call, "cancel"):
+            self._call.cancel()
+
+
+class _RecordingSpeechClient:
+    def __init__(self, client, writer: CassetteWriter, fed: Callable[[], int]):
+        self._client = client
+        self._writer = writer
+        self._fed = fed
+        self._streams = 0
+
+    def streaming_recognize(self, config=None, requests=()):
+        stream = self._streams
+        self._streams += 1
+
+        def record(response):
+            self._writer.write(
+                "stt",
+                stream=stream,
+                after=self._fed(),
+                response=base64.b64encode(speech.StreamingRecognizeResponse.serialize(response)).decode("ascii"),
+            )
+
+        return _RecordingCall(self._client.streaming_recognize(config=config, requests=requests), record)
+
+
+class _RecordingInstructorClient:
+    def __init__(self, client):
+        self._client = client
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self.create, create_iterable=self.create_iterable)
+        )
+
+    def create(self, response_model, messages, **kwargs):
+        started = time.perf_counter()
+        result = self._client.chat.completions.create(response_model=response_model, messages=messages, **kwargs)
+        self._record(messages, started, result.model_dump())
+        return result
+
+    def create_iterable(self, response_model, messages, **kwargs):
+        # Stored like a whole ChunkingResult, so either mode can replay it
+        started = time.perf_counter()
+        assignments = []
+        for assignment in self._client.chat.completions.create_iterable(
+            response_model=response_model, messages=messages, **kwargs
+        ):
+            assignments.append(assignment.model_dump())
+            yield assignment
+        self._record(messages, started, {"assignments": assignments, "incomplete_text": ""})
+
+    @staticmethod
+    def _record(messages, started: float, result: Dict) -> None:
+        writer = getattr(_recording, "writer", None)
+        if writer is not None:
+            transcript = prompt_transcript(messages[-1]["content"])
+            writer.write(
+                "chunking",
+                key=_key(transcript),
+                latency=round(time.perf_counter() - started, 6),
+                result=result,
+            )
+
+
+class _RecordingModel:
+    def __init__(self, model, writer: CassetteWriter):
+        self._model = model
+        self._writer = writer
+
+    def generate_content(self, prompt, *args, **kwargs):
+        response = self._model.generate_content(prompt, *args, **kwargs)
+        self._writer.write("recommend", key=_key(prompt), text=response.text)
+        return response
+
+
+class CassetteRecorder:
+    """Records every session the server creates into its own cassette."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._writers: Dict[str, CassetteWriter] = {}
+        os.makedirs(directory, exist_ok=True)
+
+        import chunking
+        from chunk_batcher import MODE_OFF
+        from llm_clients import llm_clients
+        from response_cache import response_caches
+
+        # A cached response would leave its call out of the cassette
+        for cache in response_caches:
+            cache.enabled = False
+        # and a batched one would be made off the session's own threads
+        chunking.configure_batching(MODE_OFF)
+
+        # Chunking clients are pooled across sessions; record the calls made
+        # on a session's chunking threads
+        build = llm_clients.factory
+        llm_clients.factory = lambda *key: _RecordingInstructorClient(build(*key))
+        llm_clients.clear()
+
+    def path_for(self, session_id: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)[:64]
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.directory, f"{safe}-{stamp}{CASSETTE_SUFFIX}")
+
+    def attach(self, session) -> None:
+        transcriber = session.transcriber
+        config = dataclasses.asdict(transcriber.config)
+        # Enum values are stored as plain ints
+        config["encoding"] = int(config["encoding"])
+        writer = CassetteWriter(self.path_for(session.session_id), session.session_id, config)
+        self._writers[session.session_id] = writer
+
+        fed = [0]
+        feed = transcriber.feed
+
+        def counting_feed(audio):
+            fed[0] += 1
+            feed(audio)
+
+        transcriber.feed = counting_feed
+
+        # Dump decisions depend on live LLM latency and in-flight counts, so
+        # record where they fell rather than re-deciding them in replay
+        finals = [0]
+        observe_final = transcriber.scheduler.observe_final
+
+        def counting_observe_final(words, now):
+            finals[0] += 1
+            observe_final(words, now)
+
+        transcriber.scheduler.observe_final = counting_observe_final
+        dump = transcriber._dump_to_long_term
+
+        def recording_dump(*args, **kwargs):
+            submitted = dump(*args, **kwargs)
+            if submitted and not kwargs.get("include_interim"):
+                writer.write("dump", finals=finals[0])
+            return submitted
+
+        transcriber._dump_to_long_term = recording_dump
+
+        # Like dump points, a local topic match depends on which earlier
+        # results were applied by then
+        match_topic = transcriber._match_topic_locally
+
+        def recording_match_topic(text):
+            match = match_topic(text)
+            writer.write(
+                "topic_match",
+                key=_key(text),
+                topic_id=match.topic_id if match else None,
+                score=match.score if match else None,
+                runner_up=match.runner_up if match else None,
+            )
+            return match
+
+        transcriber._match_topic_locally = recording_match_topic
+
+        handler = session.ingest.handler
+
+        def recording_handler(chunk):
+            writer.write("audio", data=base64.b64encode(bytes(chunk)).decode("ascii"))
+            handler(chunk)
+
+        session.ingest.handler = recording_handler
+
+        transcriber.client = _RecordingSpeechClient(transcriber.client, writer, lambda: fed[0])
+        session.recommender.model = _RecordingModel(session.recommender.model, writer)
+
+        work = transcriber.chunking.work
+
+        def recording_work(text):
+            _recording.writer = writer
+            try:
+                return work(text)
+            finally:
+                _recording.writer = None
+
+        transcriber.chunking.work = recording_work
+        logger.info(f"Recording session {session.session_id} to {writer.path}")
+
+    def detach(self, session_id: str) -> None:
+        writer = self._writers.pop(session_id, None)
+        if writer:
+            writer.close()
+
+    def close(self) -> None:
+        for session_id in list(self._writers):
+            self.detach(session_id)
+
+
+# --- replay ------------------------------------------------------------------
+
+
+class VirtualClock:
+    """Stands in for the `time` module inside the Transcriber during replay:
+    `time()` follows the recorded arrival time of the response being
+    processed, so dump timing matches the recording however fast it runs."""
+
+    def __init__(self):
+        self.base = time.time()
+        self.offset = 0.0
+
+    def time(self) -> float:
+        return self.base + self.offset
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class ReplaySpeechClient:
+    """Yields the recorded responses, each one once the Transcriber has been
+    fed as many chunks as it had been when the response was recorded.
+
+    Replay uses a single stream; `finish()` releases the remaining responses
+    once all audio has been fed."""
+
+    def __init__(self, cassette: Cassette, clock: VirtualClock, on_response: Optional[Callable] = None):
+        self._pending: Deque[Dict] = deque(cassette.stt)
+        self._clock = clock
+        self._on_response = on_response
+        self.fed = 0
+        self._finished = False
+        self.consumed = threading.Event()
+        if not self._pending:
+            self.consumed.set()
+
+    def finish(self) -> None:
+        self._finished = True
+
+    def _ready(self, force: bool):
+        while self._pending and (force or self._pending[0]["after"] <= self.fed):
+            record = self._pending.popleft()
+            self._clock.offset = record["t"]
+            response = speech.StreamingRecognizeResponse.deserialize(base64.b64decode(record["response"]))
+            if self._on_response:
+                self._on_response(response)
+            yield response
+        if not self._pending:
+            self.consumed.set()
+
+    def streaming_recognize(self, config=None, requests=()):
+        for _ in requests:
+            yield from self._ready(force=False)
+        yield from self._ready(force=self._finished)
+
+
+class ReplayInstructorClient:
+    def __init__(self, cassette: Cassette):
+        self._by_key: Dict[str, Deque[Dict]] = defaultdict(deque)
+        for record in cassette.chunking:
+            self._by_key[record["key"]].append(record["result"])
+        self._in_order = deque(record["result"] for record in cassette.chunking)
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self.create, create_iterable=self.create_iterable)
+        )
+
+    def create(self, response_model, messages, **kwargs):
+        return response_model.model_validate(self._result(messages))
+
+    def create_iterable(self, response_model, messages, **kwargs):
+        for assignment in self._result(messages)["assignments"]:
+            yield response_model.model_validate(assignment)
+
+    def _result(self, messages) -> Dict:
+        key = _key(prompt_transcript(messages[-1]["content"]))
+        with self._lock:
+            if self._by_key.get(key):
+                result = self._by_key[key].popleft()
+            else:
+                # Dumps split differently from the recording; fall back to order
+                self.misses += 1
+                result = self._in_order[0] if self._in_order else {"assignments": [], "incomplete_text": ""}
+            if self._in_order:
+                self._in_order.popleft()
+        return result
+
+
+class ReplayModel:
+    def __init__(self, cassette: Cassette):
+        self._by_key: Dict[str, Deque[str]] = defaultdict(deque)
+        for record in cassette.recommend:
+            self._by_key[record["key"]].append(record["text"])
+        self._in_order = deque(record["text"] for record in cassette.recommend)
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, *args, **kwargs):
+        key = _key(prompt)
+        with self._lock:
+            if self._by_key.get(key):
+                text = self._by_key[key].popleft()
+            else:
+                self.misses += 1
+                text = self._in_order[0] if self._in_order else "{}"
+            if self._in_order:
+                self._in_order.popleft()
+        return SimpleNamespace(text=text)
@@ -0,0 +1,177 @@
+"""Cost and latency of scheduling chunking calls across sessions.
+
+Several sessions (threads) each send their dumps for chunking one after
+another, a dump every `--interval` seconds, while the chunking batcher runs
+in each mode in turn: `off` (every dump calls at once), `concurrent` (at
+most `--concurrency` calls at once) and `batch` with each `--windows` value
+(dumps arriving within the window share one call). Reports per mode the LLM
+calls made, throughput, per-dump latency and prompt tokens.
+
+The LLM is the local fake from `benchmarks.fakes`: a call takes
+`--call-latency` seconds plus `--item-latency` per extra request in a
+batch, and the provider serves at most `--provider-concurrency` calls at
+once (0 = unlimited), like a quota. Response caches are off so every dump
+reaches the LLM. Run from `backend/`:
+
+    python -m benchmarks.chunk_batching --sessions 8 --dumps 10
+    python -m benchmarks.chunk_batching --windows 20 50 100 --max-batch 4
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import WORDS, FakeBackendConfig, install_fakes  # noqa: E402
+
+
+def _topics(session: int):
+    from topic_manager import TopicDigest
+
+    return [
+        TopicDigest(
+            topic_id=f"session-{session}-topic-{index}",
+            description=" ".join(WORDS[index * 4:index * 4 + 8]),
+            last_changed=index,
+            recent_blurbs=[" ".join(WORDS[index:index + 6])],
+        )
+        for index in range(3)
+    ]
+
+
+def _session(session: int, dumps: int, interval: float, start: threading.Event, out: List[Tuple[float, int]]):
+    import chunking
+
+    topics = _topics(session)
+    start.wait()
+    # Sessions don't dump in lockstep
+    time.sleep(interval * session / max(1, dumps))
+    for dump in range(dumps):
+        started = time.perf_counter()
+        result = chunking.chunk_transcript_by_topics(
+            f"{' '.join(WORDS)} session {session} dump {dump}", existing_topics=topics, project_id="bench"
+        )
+        out.append((time.perf_counter() - started, result["prompt_tokens"]))
+        time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+def run_mode(mode: str, window: float, sessions: int, dumps: int, interval: float, max_batch: int, concurrency: int) -> Dict:
+    import chunking
+
+    batcher = chunking.configure_batching(mode, window=window, max_batch=max_batch, max_concurrency=concurrency)
+    samples: List[List[Tuple[float, int]]] = [[] for _ in range(sessions)]
+    start = threading.Event()
+    threads = [
+        threading.Thread(target=_session, args=(session, dumps, interval, start, samples[session]))
+        for session in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    start.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for per_session in samples for latency, _ in per_session)
+    stats = batcher.stats()
+    return {
+        "mode": mode,
+        "window_ms": window * 1000 if mode == "batch" else 0.0,
+        "dumps": len(latencies),
+        "llm_calls": stats["calls"],
+        "batched_dumps": stats["batched_requests"],
+        "seconds": elapsed,
+        "dumps_per_second": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "mean": statistics.fmean(latencies),
+        "prompt_tokens": sum(tokens for per_session in samples for _, tokens in per_session),
+    }
+
+
+def run(sessions: int, dumps: int, interval: float, windows: List[float], max_batch: int, concurrency: int) -> Dict:
+    import chunking
+    from chunk_batcher import MODE_BATCH, MODE_CONCURRENT, MODE_OFF
+    from response_cache import response_caches
+
+    for cache in response_caches:
+        cache.enabled = False
+    modes = [(MODE_OFF, 0.0), (MODE_CONCURRENT, 0.0)] + [(MODE_BATCH, window / 1000) for window in windows]
+    try:
+        results = [
+            run_mode(mode, window, sessions, dumps, interval, max_batch, concurrency)
+            for mode, window in modes
+        ]
+    finally:
+        chunking.configure_batching(MODE_OFF)
+    return {
+        "sessions": sessions,
+        "dumps_per_session": dumps,
+        "interval": interval,
+        "max_batch": max_batch,
+        "concurrency": concurrency,
+        "modes": results,
+    }
+
+
+def print_report(result: Dict) -> None:
+    print(
+        f"{result['sessions']} session(s) x {result['dumps_per_session']} dump(s), one every "
+        f"{result['interval'] * 1000:.0f} ms; max batch {result['max_batch']}, "
+        f"max concurrency {result['concurrency']}"
+    )
+    print(
+        f"{'mode':>10} {'window':>7} {'calls':>6} {'dumps/s':>8} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'prompt tok':>11}"
+    )
+    print("-" * 66)
+    for stats in result["modes"]:
+        print(
+            f"{stats['mode']:>10} {stats['window_ms']:>7.0f} {stats['llm_calls']:>6} "
+            f"{stats['dumps_per_second']:>8.2f} {stats['p50'] * 1000:>9.1f} "
+            f"{stats['p95'] * 1000:>9.1f} {stats['prompt_tokens']:>11}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--dumps", type=int, default=10, help="dumps chunked per session")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between a session's dumps")
+    parser.add_argument("--windows", type=float, nargs="+", default=[20.0, 50.0, 100.0], help="batch windows (ms) to try")
+    parser.add_argument("--max-batch", type=int, default=8, help="most dumps per batched call")
+    parser.add_argument("--concurrency", type=int, default=4, help="most chunking calls at once (concurrent and batch)")
+    parser.add_argument("--call-latency", type=float, default=0.5, help="fake: seconds per chunking call")
+    parser.add_argument("--item-latency", type=float, default=0.1, help="fake: extra seconds per batched request")
+    parser.add_argument("--provider-concurrency", type=int, default=4, help="fake: calls the provider serves at once (0 = unlimited)")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "chunk-batching-bench")
+    install_fakes(FakeBackendConfig(
+        chunking_latency=args.call_latency,
+        chunking_jitter=0.0,
+        chunking_batch_item_latency=args.item_latency,
+        chunking_max_concurrency=args.provider_concurrency,
+    ))
+    # Per-call debug output would swamp the report
+    logging.getLogger("chunking").setLevel(logging.WARNING)
+
+    result = run(args.sessions, args.dumps, args.interval, args.windows, args.max_batch, args.concurrency)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
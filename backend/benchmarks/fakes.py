@@ -0,0 +1,239 @@
+"""Local stand-ins for Google STT, Instructor/Gemini and Vertex GenerativeModel.
+
+They keep the real call shapes (and return the real response types) so the
+server's own hot paths run unchanged, but answer from memory after a
+configurable latency. Nothing here touches the network.
+"""
+import contextlib
+import json
+import random
+import re
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+from google.cloud import speech_v1 as speech
+
+WORDS = (
+    "we should look at the budget for next quarter and decide how much goes to "
+    "hiring versus infrastructure because the latency numbers from last week "
+    "suggest the database is the bottleneck rather than the network layer"
+).split()
+
+# Phones in the load generator stamp the send time (ms) into the first 8 bytes
+# of each PCM payload; the fake recognizer echoes it back as a "ts<ms>" word so
+# the dashboard side can compute end-to-end latency.
+TIMESTAMP_MARKER = "ts"
+_TIMESTAMP_RE = re.compile(r"\bts(\d{13})\b")
+_TOPIC_ID_RE = re.compile(r"\('([^']+)', Topic\(")
+
+
+@dataclass
+class FakeBackendConfig:
+    stt_latency: float = 0.05
+    stt_jitter: float = 0.02
+    words_per_chunk: int = 4
+    chunking_latency: float = 1.0
+    chunking_jitter: float = 0.3
+    recommend_latency: float = 0.5
+    recommend_jitter: float = 0.2
+    # Cost of building an LLM client (SDK setup, credentials) and of its first
+    # request (TLS handshake); pooled clients pay them once
+    client_build_latency: float = 0.0
+    client_connect_latency: float = 0.0
+    # Extra generation time per request after the first in a batched
+    # chunking call, and how many chunking calls the provider serves at
+    # once (0 = unlimited; the rest wait, like a quota)
+    chunking_batch_item_latency: float = 0.15
+    chunking_max_concurrency: int = 0
+    seed: Optional[int] = None
+
+
+class _Latency:
+    def __init__(self, seed: Optional[int]):
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, latency: float, jitter: float) -> None:
+        with self._lock:
+            delay = latency + self._random.uniform(-jitter, jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def choice(self, items):
+        with self._lock:
+            return self._random.choice(items)
+
+
+def tone_pcm(n_samples: int, sample_rate: int = 16000, frequency: float = 220.0) -> bytearray:
+    """A steady tone loud enough that the server's VAD treats it as speech."""
+    t = np.arange(n_samples) / sample_rate
+    return bytearray((np.sin(2 * np.pi * frequency * t) * 6000).astype("<i2").tobytes())
+
+
+def stamp_audio(pcm: bytearray, timestamp_ms: int) -> None:
+    struct.pack_into("<Q", pcm, 0, timestamp_ms)
+
+
+def extract_timestamps(text: str):
+    return [int(ms) for ms in _TIMESTAMP_RE.findall(text)]
+
+
+class FakeSpeechClient:
+    """Answers each streaming_recognize call with one interim and one final
+    result, like a short utterance."""
+
+    def __init__(self, config: FakeBackendConfig, latency: _Latency):
+        self.config = config
+        self.latency = latency
+
+    def streaming_recognize(self, config=None, requests=()):
+        stream_seconds = 0.0
+        for request in requests:
+            audio = request.audio_content
+            stream_seconds += len(audio) / (2 * config.config.sample_rate_hertz)
+            self.latency.sleep(self.config.stt_latency, self.config.stt_jitter)
+
+            words = [self.latency.choice(WORDS) for _ in range(self.config.words_per_chunk)]
+            if len(audio) >= 8:
+                (timestamp_ms,) = struct.unpack_from("<Q", audio, 0)
+                words.append(f"{TIMESTAMP_MARKER}{timestamp_ms}")
+
+            for is_final, text in ((False, " ".join(words[:-1])), (True, " ".join(words))):
+                yield speech.StreamingRecognizeResponse(
+                    results=[
+                        speech.StreamingRecognitionResult(
+                            alternatives=[speech.SpeechRecognitionAlternative(transcript=text)],
+                            is_final=is_final,
+                            result_end_time=timedelta(seconds=stream_seconds),
+                        )
+                    ]
+                )
+
+
+class FakeInstructorClient:
+    """Mimics `instructor.from_provider(...)`: splits the transcript into two
+    chunks on the current topic."""
+
+    def __init__(self, config: FakeBackendConfig, latency: _Latency, provider=None):
+        self.config = config
+        self.latency = latency
+        # Shared by every client: calls the provider serves at once
+        self.provider = provider or contextlib.nullcontext()
+        self.chat = SimpleNamespace(
+            completions=SimpleNamespace(create=self.create, create_iterable=self.create_iterable)
+        )
+        self._connected = False
+        if config.client_build_latency > 0:
+            time.sleep(config.client_build_latency)
+
+    def create(self, response_model, messages, **kwargs):
+        from chunking import TopicAssignment
+
+        transcripts = self._transcripts(messages)
+        with self.provider:
+            if "results" in response_model.model_fields:
+                # Batched request: one result per transcript, in order
+                result_model = response_model.model_fields["results"].annotation.__args__[0]
+                self.latency.sleep(
+                    self.config.chunking_latency
+                    + self.config.chunking_batch_item_latency * (len(transcripts) - 1),
+                    self.config.chunking_jitter,
+                )
+                return response_model(results=[
+                    result_model(
+                        request_index=index,
+                        assignments=self._assignments(transcript, TopicAssignment),
+                        incomplete_text="",
+                    )
+                    for index, transcript in enumerate(transcripts)
+                ])
+            assignments = self._assignments(transcripts[0], TopicAssignment)
+            self.latency.sleep(self.config.chunking_latency, self.config.chunking_jitter)
+            return response_model(assignments=assignments, incomplete_text="")
+
+    def create_iterable(self, response_model, messages, **kwargs):
+        # Generation time is spread over the assignments as they stream out
+        assignments = self._assignments(self._transcripts(messages)[0], response_model)
+        with self.provider:
+            for assignment in assignments:
+                self.latency.sleep(
+                    self.config.chunking_latency / len(assignments), self.config.chunking_jitter / len(assignments)
+                )
+                yield assignment
+
+    def _transcripts(self, messages):
+        if not self._connected:
+            self._connected = True
+            if self.config.client_connect_latency > 0:
+                time.sleep(self.config.client_connect_latency)
+
+        prompt = messages[-1]["content"]
+        return [
+            section.split("Here are the existing topics:")[0].strip()
+            for section in prompt.split("Here is the transcript to chunk:")[1:]
+        ]
+
+    def _assignments(self, transcript, assignment_model):
+        words = transcript.split()
+        middle = max(1, len(words) // 2)
+        halves = [" ".join(words[:middle]), " ".join(words[middle:])]
+        return [
+            assignment_model(
+                existing_topic_id="load-test-topic",
+                updated_description="Synthetic load test conversation",
+                chunk_blurb=" ".join(half.split()[:5]),
+                chunk_content=half,
+            )
+            for half in halves
+            if half
+        ]
+
+
+class FakeGenerativeModel:
+    def __init__(self, config: FakeBackendConfig, latency: _Latency):
+        self.config = config
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        self.latency.sleep(self.config.recommend_latency, self.config.recommend_jitter)
+        topic_ids = _TOPIC_ID_RE.findall(prompt) or ["load-test-topic"]
+        recommendations = {
+            topic_id: ["Ask a follow-up question.", "Summarize the decision so far."]
+            for topic_id in topic_ids
+        }
+        return SimpleNamespace(text=f"```json\n{json.dumps(recommendations)}\n```")
+
+
+def install_fakes(config: Optional[FakeBackendConfig] = None) -> FakeBackendConfig:
+    """Swap the network-backed clients used by the server for local fakes.
+
+    Must run before any Session is created.
+    """
+    config = config or FakeBackendConfig()
+    latency = _Latency(config.seed)
+    provider = (
+        threading.BoundedSemaphore(config.chunking_max_concurrency)
+        if config.chunking_max_concurrency > 0
+        else None
+    )
+
+    import recommender
+    import transcriber
+    from llm_clients import llm_clients
+    from response_cache import response_caches
+
+    transcriber.speech.SpeechClient = lambda *args, **kwargs: FakeSpeechClient(config, latency)
+    llm_clients.factory = lambda *key: FakeInstructorClient(config, latency, provider)
+    llm_clients.clear()
+    for cache in response_caches:
+        cache.clear()
+    recommender.vertexai.init = lambda *args, **kwargs: None
+    recommender.GenerativeModel = lambda *args, **kwargs: FakeGenerativeModel(config, latency)
+    return config
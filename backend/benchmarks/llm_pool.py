@@ -0,0 +1,142 @@
+"""Startup and per-call cost of the pooled chunking LLM clients.
+
+Measures how long warming the pool takes at startup, then runs the same
+`chunk_transcript_by_topics` calls from several threads twice: once with a
+client built per call (the old behaviour) and once through the warm pool,
+and reports the latency of each and the per-call overhead the pool removes.
+
+By default the LLM is the local fake from `benchmarks.fakes`, with
+configurable client build and first-request (connection) costs; `--real`
+calls Gemini through Vertex AI instead (needs credentials, and costs
+tokens). Run from `backend/`:
+
+    python -m benchmarks.llm_pool --calls 40 --threads 4
+    python -m benchmarks.llm_pool --real --calls 10 --threads 2
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import WORDS, FakeBackendConfig, install_fakes  # noqa: E402
+
+TRANSCRIPT = " ".join(WORDS)
+
+
+class _Unpooled:
+    """Stands in for the pool with a fresh client per call."""
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    @contextmanager
+    def client(self, model, project=None, location=None):
+        yield self.factory(model, project, location)
+
+
+def _run_calls(calls: int, threads: int, project, location) -> List[float]:
+    from chunking import chunk_transcript_by_topics
+
+    def one(_):
+        started = time.perf_counter()
+        chunk_transcript_by_topics(TRANSCRIPT, existing_topics=[], project_id=project, location=location)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(one, range(calls)))
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "calls": len(samples),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "mean": statistics.fmean(samples),
+    }
+
+
+def run(calls: int, threads: int, warm: int, project, location) -> Dict:
+    import chunking
+    from config import CHUNKING_MODEL
+    from llm_clients import llm_clients
+
+    llm_clients.clear()
+    startup = llm_clients.warm(CHUNKING_MODEL, project, location, count=warm)
+    warm_clients = llm_clients.stats()["clients"]
+
+    pooled = chunking.llm_clients
+    chunking.llm_clients = _Unpooled(llm_clients.factory)
+    try:
+        per_call = _run_calls(calls, threads, project, location)
+    finally:
+        chunking.llm_clients = pooled
+    pooled_samples = _run_calls(calls, threads, project, location)
+
+    result = {
+        "startup_seconds": startup,
+        "warm_clients": warm_clients,
+        "pooled_clients": llm_clients.stats()["clients"],
+        "threads": threads,
+        "per_call_client": _summary(per_call),
+        "pooled": _summary(pooled_samples),
+    }
+    result["overhead_removed_per_call"] = result["per_call_client"]["mean"] - result["pooled"]["mean"]
+    return result
+
+
+def print_report(result: Dict) -> None:
+    print(f"pool warm-up: {result['warm_clients']} client(s) in {result['startup_seconds'] * 1000:.1f} ms")
+    print(f"{'clients':>16} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    print("-" * 53)
+    for name in ("per_call_client", "pooled"):
+        stats = result[name]
+        print(
+            f"{name:>16} {stats['calls']:>6} {stats['p50'] * 1000:>9.1f} "
+            f"{stats['p95'] * 1000:>9.1f} {stats['mean'] * 1000:>9.1f}"
+        )
+    print(f"overhead removed per call: {result['overhead_removed_per_call'] * 1000:.1f} ms "
+          f"({result['threads']} thread(s), pool grew to {result['pooled_clients']} client(s))")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40, help="chunking calls per strategy")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent callers (sessions)")
+    parser.add_argument("--warm", type=int, default=2, help="clients built at startup")
+    parser.add_argument("--real", action="store_true", help="call Gemini through Vertex AI instead of the fake")
+    parser.add_argument("--build-latency", type=float, default=0.3, help="fake: seconds to build a client")
+    parser.add_argument("--connect-latency", type=float, default=0.15, help="fake: extra seconds on a client's first call")
+    parser.add_argument("--call-latency", type=float, default=0.5, help="fake: seconds per chunking call")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    if not args.real:
+        os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "llm-pool-bench")
+        install_fakes(FakeBackendConfig(
+            chunking_latency=args.call_latency,
+            chunking_jitter=0.0,
+            client_build_latency=args.build_latency,
+            client_connect_latency=args.connect_latency,
+        ))
+
+    from config import LOCATION, PROJECT_ID
+
+    result = run(args.calls, args.threads, args.warm, PROJECT_ID, LOCATION)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Offline load generator for mainserver.
+
+Starts `WebSocketServer` in a child process with the fake STT/LLM backends
+from `benchmarks.fakes`, then drives it with synthetic phone and dashboard
+clients and reports end-to-end latency, throughput, event-loop lag, CPU and
+RSS. Run from `backend/`:
+
+    python -m benchmarks.loadgen --sessions 1,5,10,20 --speed 5 --duration 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+import websockets
+from websockets.sync.client import connect
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fakes import FakeBackendConfig, extract_timestamps, stamp_audio, tone_pcm, install_fakes
+from frames import encode_audio_frame
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.1
+FRAME_BYTES = int(SAMPLE_RATE * FRAME_SECONDS) * 2  # LINEAR16 mono
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "p50": ordered[int(round(0.50 * last))],
+        "p95": ordered[int(round(0.95 * last))],
+        "p99": ordered[int(round(0.99 * last))],
+        "max": ordered[-1],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            # A full handshake, so the server doesn't log a bare TCP probe as an error
+            with connect(f"ws://127.0.0.1:{port}", open_timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Server did not start listening on port {port} within {timeout}s")
+
+
+# --- server side (child process) ------------------------------------------
+
+
+async def _monitor_loop_lag(samples: List[float], interval: float = 0.05) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def _serve(port: int, stop_event, results) -> None:
+    from mainserver import WebSocketServer
+
+    server = WebSocketServer(host="127.0.0.1", port=port)
+    serve_task = asyncio.create_task(server.start_server())
+    lag_samples: List[float] = []
+    lag_task = asyncio.create_task(_monitor_loop_lag(lag_samples))
+    cpu_start = time.process_time()
+
+    await asyncio.get_running_loop().run_in_executor(None, stop_event.wait)
+
+    cpu_seconds = time.process_time() - cpu_start
+    lag_task.cancel()
+    await server.close_websocket_server()
+    await serve_task
+
+    results.put({
+        "loop_lag": percentiles(lag_samples),
+        "server_cpu_seconds": cpu_seconds,
+        "server_max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def run_server(port: int, fake_config: FakeBackendConfig, stop_event, results, quiet: bool = True) -> None:
+    # Keep metrics off so several runs never fight over the port, and start
+    # every run cold rather than restoring sessions from an earlier one
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["CHECKPOINT_DIR"] = ""
+    install_fakes(fake_config)
+    with contextlib.redirect_stdout(io.StringIO() if quiet else sys.stdout):
+        asyncio.run(_serve(port, stop_event, results))
+
+
+# --- client side -----------------------------------------------------------
+
+
+@dataclass
+class ClientStats:
+    frames_sent: int = 0
+    acks: int = 0
+    credit_stalls: int = 0
+    errors: int = 0
+    updates: int = 0
+    end_to_end: List[float] = field(default_factory=list)
+
+
+async def phone_client(url: str, session_id: str, speed: float, duration: float, stats: ClientStats) -> None:
+    interval = FRAME_SECONDS / speed
+    pcm = tone_pcm(FRAME_BYTES // 2, SAMPLE_RATE)
+    sequence = 0
+    # Highest sequence the server currently lets us send (credit-based flow control)
+    limit = -1
+    credit = asyncio.Event()
+
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "register_client", "client_type": "phone", "session_id": session_id}))
+
+        async def read_replies():
+            nonlocal limit
+            async for message in ws:
+                reply = json.loads(message)
+                if reply.get("type") == "flow":
+                    stats.acks += 1
+                    acked = reply["ack"] if reply["ack"] is not None else sequence - 1
+                    limit = acked + reply["credits"]
+                    credit.set()
+                elif reply.get("type") == "error":
+                    stats.errors += 1
+
+        reader = asyncio.create_task(read_replies())
+        deadline = time.perf_counter() + duration
+        next_send = time.perf_counter()
+        while time.perf_counter() < deadline:
+            if sequence > limit:
+                stats.credit_stalls += 1
+                credit.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(credit.wait(), timeout=max(0.0, deadline - time.perf_counter()))
+                next_send = time.perf_counter()
+                continue
+            stamp_audio(pcm, int(time.time() * 1000))
+            await ws.send(encode_audio_frame(pcm, sequence, session_id))
+            sequence += 1
+            stats.frames_sent += 1
+            next_send += interval
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+        reader.cancel()
+
+
+async def site_client(url: str, session_id: str, stop: asyncio.Event, stats: ClientStats) -> None:
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "register_client", "client_type": "site", "session_id": session_id}))
+
+        async def read_updates():
+            async for message in ws:
+                received_ms = time.time() * 1000
+                msg = json.loads(message)
+                if msg.get("type") != "updates":
+                    continue
+                stats.updates += 1
+                for update in msg["updates"]:
+                    if update.get("type") == "chunk_appended":
+                        for sent_ms in extract_timestamps(update.get("content", "")):
+                            stats.end_to_end.append((received_ms - sent_ms) / 1000)
+
+        reader = asyncio.create_task(read_updates())
+        await stop.wait()
+        reader.cancel()
+
+
+async def drive(url: str, sessions: int, sites: int, speed: float, duration: float, drain: float):
+    phone_stats = ClientStats()
+    site_stats = ClientStats()
+    stop = asyncio.Event()
+
+    site_tasks = [
+        asyncio.create_task(site_client(url, f"bench-{i % sessions}", stop, site_stats))
+        for i in range(sites)
+    ]
+    await asyncio.sleep(0.5)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        phone_client(url, f"bench-{i}", speed, duration, phone_stats)
+        for i in range(sessions)
+    ])
+    elapsed = time.perf_counter() - started
+
+    # Let in-flight chunking and recommendations reach the dashboards
+    await asyncio.sleep(drain)
+    stop.set()
+    await asyncio.gather(*site_tasks, return_exceptions=True)
+    return phone_stats, site_stats, elapsed
+
+
+def run_once(sessions: int, sites: int, speed: float, duration: float, drain: float, fake_config: FakeBackendConfig) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = ctx.Event()
+    results = ctx.Queue()
+    port = _free_port()
+    server = ctx.Process(target=run_server, args=(port, fake_config, stop_event, results))
+    server.start()
+    _wait_for_port(port, timeout=60)
+
+    try:
+        phone_stats, site_stats, elapsed = asyncio.run(
+            drive(f"ws://127.0.0.1:{port}", sessions, sites, speed, duration, drain)
+        )
+    finally:
+        stop_event.set()
+        server_stats = results.get(timeout=30)
+        server.join(timeout=10)
+
+    return {
+        "sessions": sessions,
+        "site_clients": sites,
+        "speed": speed,
+        "frames_sent": phone_stats.frames_sent,
+        "frames_per_sec": phone_stats.frames_sent / elapsed if elapsed else 0.0,
+        "acks": phone_stats.acks,
+        "credit_stalls": phone_stats.credit_stalls,
+        "errors": phone_stats.errors,
+        "site_updates": site_stats.updates,
+        "end_to_end": percentiles(site_stats.end_to_end),
+        "end_to_end_samples": len(site_stats.end_to_end),
+        **server_stats,
+    }
+
+
+def print_table(rows: List[dict]) -> None:
+    header = f"{'sess':>5} {'sites':>5} {'fps':>8} {'e2e p50':>8} {'e2e p95':>8} {'e2e p99':>8} {'lag p99':>8} {'cpu s':>7} {'rss MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['sessions']:>5} {row['site_clients']:>5} {row['frames_per_sec']:>8.1f} "
+            f"{row['end_to_end']['p50']:>8.3f} {row['end_to_end']['p95']:>8.3f} {row['end_to_end']['p99']:>8.3f} "
+            f"{row['loop_lag']['p99']:>8.4f} {row['server_cpu_seconds']:>7.2f} {row['server_max_rss_mb']:>7.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the WebSocket server")
+    parser.add_argument("--sessions", default="1,5,10", help="comma separated session counts; one run per value")
+    parser.add_argument("--sites-per-session", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=5.0, help="audio speed relative to real time (1-20)")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds each phone streams for")
+    parser.add_argument("--drain", type=float, default=5.0, help="seconds to wait for trailing updates")
+    parser.add_argument("--stt-latency", type=float, default=0.05)
+    parser.add_argument("--stt-jitter", type=float, default=0.02)
+    parser.add_argument("--chunking-latency", type=float, default=1.0)
+    parser.add_argument("--chunking-jitter", type=float, default=0.3)
+    parser.add_argument("--recommend-latency", type=float, default=0.5)
+    parser.add_argument("--recommend-jitter", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    fake_config = FakeBackendConfig(
+        stt_latency=args.stt_latency,
+        stt_jitter=args.stt_jitter,
+        chunking_latency=args.chunking_latency,
+        chunking_jitter=args.chunking_jitter,
+        recommend_latency=args.recommend_latency,
+        recommend_jitter=args.recommend_jitter,
+        seed=args.seed,
+    )
+
+    rows = []
+    for sessions in [int(n) for n in args.sessions.split(",") if n]:
+        print(f"Running {sessions} session(s) at {args.speed}x for {args.duration}s...")
+        rows.append(run_once(
+            sessions,
+            sessions * args.sites_per_session,
+            args.speed,
+            args.duration,
+            args.drain,
+            fake_config,
+        ))
+
+    print()
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"fake_backend": asdict(fake_config), "runs": rows}, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
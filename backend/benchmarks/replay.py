@@ -0,0 +1,355 @@
+"""Replay a recorded session cassette through the real pipeline, offline.
+
+Drives Session (normalizer, VAD, Transcriber, ChunkingPipeline,
+chunk_transcript_by_topics, TopicManager, Recommender) with the audio,
+STT responses and LLM results captured by `mainserver.py --record`, and
+reports CPU time per stage, allocations and end-to-end latency. Results
+are deterministic for a given cassette, and the printed state digest can be
+compared across runs to catch regressions. Run from `backend/`:
+
+    python -m benchmarks.replay recordings/demo-20250101-120000.cassette.jsonl.gz --speed 0
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from typing import Deque, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.cassette import (  # noqa: E402
+    Cassette,
+    ReplayInstructorClient,
+    ReplayModel,
+    ReplaySpeechClient,
+    VirtualClock,
+    _key,
+)
+
+
+class StageProfiler:
+    """Exclusive CPU time (time.thread_time) and call counts per stage. A
+    stage called from inside another is subtracted from its parent."""
+
+    def __init__(self):
+        self.cpu: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[float]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def wrap(self, stage: str, fn):
+        def timed(*args, **kwargs):
+            stack = self._stack()
+            stack.append(0.0)
+            started = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.thread_time() - started
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with self._lock:
+                    self.cpu[stage] += elapsed - children
+                    self.calls[stage] += 1
+
+        return timed
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def state_digest(session) -> str:
+    """Stable hash of the final topics and transcript, for regression checks."""
+    _, topics = session.topic_manager.snapshot()
+    state = {
+        "topics": {
+            topic_id: {
+                "description": topic.description,
+                "chunks": [[c.blurb, c.content] for c in topic.chunk_stack],
+                "recommendations": topic.recommendations,
+            }
+            for topic_id, topic in sorted(topics.items())
+        },
+        "transcript": session.transcriber.get_full_transcript(),
+    }
+    return hashlib.sha1(json.dumps(state, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def replay(path: str, speed: float = 0.0, trace_allocations: bool = False) -> Dict:
+    cassette = Cassette(path)
+    clock = VirtualClock()
+    profiler = StageProfiler()
+    instructor_client = ReplayInstructorClient(cassette)
+    models: List[ReplayModel] = []
+
+    # Finals waiting to be dumped, then dumps waiting to be applied, each
+    # carrying the wall time their triggering audio was fed
+    feed_times: Dict[int, float] = {}
+    undumped: List[float] = []
+    dumped: Deque[List[float]] = deque()
+    latencies: List[float] = []
+
+    speech_client = None
+
+    def on_response(response):
+        if response.results and response.results[0].is_final:
+            undumped.append(feed_times.get(speech_client.fed, time.perf_counter()))
+
+    import chunking
+    import recommender
+    import transcriber as transcriber_module
+    from chunk_batcher import MODE_OFF
+    from llm_clients import llm_clients
+    from response_cache import response_caches
+
+    speech_client = ReplaySpeechClient(cassette, clock, on_response=on_response)
+    transcriber_module.time = clock
+    transcriber_module.speech.SpeechClient = lambda *args, **kwargs: speech_client
+    llm_clients.factory = lambda *key: instructor_client
+    llm_clients.clear()
+    # Every call is answered from the cassette, as it was recorded
+    for cache in response_caches:
+        cache.enabled = False
+    chunking.configure_batching(MODE_OFF)
+    recommender.vertexai.init = lambda *args, **kwargs: None
+
+    def make_model(*args, **kwargs):
+        models.append(ReplayModel(cassette))
+        return models[-1]
+
+    recommender.GenerativeModel = make_model
+
+    from session import Session
+
+    def on_chunks(session, chunks):
+        # What mainserver does with new chunks, minus the broadcast
+        topics = [session.topic_manager.get_topic_from_topic_id(topic_id) for topic_id in chunks]
+        recommendations = session.recommender.recommend(topics)
+        session.transcriber.previous_recommendations = recommendations
+        if isinstance(recommendations, dict):
+            for topic_id in chunks:
+                session.topic_manager.set_recommendations(topic_id, recommendations.get(topic_id, []))
+        session.topic_manager.drain_updates()
+
+    # The recorded config, except: one stream for the whole replay, and no
+    # cap on dumps in flight. Replayed LLM calls return at once, so a cap
+    # would only make dump boundaries depend on thread timing (results are
+    # still applied in dump order).
+    config = cassette.transcriber_config(
+        restart_interval_seconds=0,
+        stream_idle_timeout=float("inf"),
+        max_chunking_in_flight=1 << 16,
+        transcript_spill_dir=None,
+    )
+    session = Session(
+        cassette.meta.get("session_id", "replay"),
+        on_chunks_produced=on_chunks,
+        transcriber_config=config,
+    )
+    transcriber = session.transcriber
+
+    # Dump where the recording did. Without dump records, let the scheduler
+    # decide, with the recorded average LLM latency standing in for live
+    # measurements (replayed calls take no time).
+    finals = [0]
+    observe_final = transcriber.scheduler.observe_final
+
+    def counting_observe_final(words, now):
+        finals[0] += 1
+        observe_final(words, now)
+
+    transcriber.scheduler.observe_final = counting_observe_final
+    if cassette.dump:
+        dump_points = deque(record["finals"] for record in cassette.dump)
+
+        def recorded_dump_ready():
+            if dump_points and dump_points[0] <= finals[0]:
+                dump_points.popleft()
+                return True
+            return False
+
+        transcriber.dump_ready = recorded_dump_ready
+    else:
+        recorded_latencies = [record["latency"] for record in cassette.chunking if "latency" in record]
+        if recorded_latencies:
+            transcriber.scheduler.chunking_latency = statistics.fmean(recorded_latencies)
+        transcriber.scheduler.observe_latency = lambda seconds: None
+
+    # Likewise follow the recorded local topic matches
+    if cassette.topic_match:
+        from topic_index import TopicMatch
+
+        matches = defaultdict(deque)
+        for record in cassette.topic_match:
+            matches[record["key"]].append(record)
+
+        def recorded_match_topic(text):
+            recorded = matches.get(_key(text))
+            record = recorded.popleft() if recorded else None
+            if record is None or record["topic_id"] is None:
+                return None
+            return TopicMatch(record["topic_id"], record["score"], record["runner_up"])
+
+        transcriber._match_topic_locally = recorded_match_topic
+
+    session.normalizer.process = profiler.wrap("normalize", session.normalizer.process)
+    if transcriber.vad is not None:
+        transcriber.vad.process = profiler.wrap("vad", transcriber.vad.process)
+    transcriber.chunking.work = profiler.wrap("chunking", transcriber.chunking.work)
+    session.recommender.recommend = profiler.wrap("recommend", session.recommender.recommend)
+
+    feed = transcriber.feed
+
+    def counting_feed(audio):
+        speech_client.fed += 1
+        feed_times[speech_client.fed] = time.perf_counter()
+        feed(audio)
+
+    transcriber.feed = counting_feed
+
+    dump = transcriber._dump_to_long_term
+
+    def tracking_dump(*args, **kwargs):
+        finals = list(undumped)
+        submitted = dump(*args, **kwargs)
+        if submitted:
+            dumped.append(finals)
+            undumped.clear()
+        return submitted
+
+    transcriber._dump_to_long_term = tracking_dump
+
+    apply = transcriber.chunking.apply
+
+    def tracking_apply(text, result, error):
+        apply(text, result, error)
+        applied_at = time.perf_counter()
+        if dumped:
+            latencies.extend(applied_at - fed_at for fed_at in dumped.popleft())
+
+    transcriber.chunking.apply = profiler.wrap("apply", tracking_apply)
+
+    # Everything that happens on the transcription thread between responses
+    process = transcriber._process_responses
+    transcriber._process_responses = profiler.wrap("transcribe", process)
+
+    if trace_allocations:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    for record in cassette.audio:
+        if speed > 0:
+            delay = started + record["t"] / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        session._feed_audio(base64.b64decode(record["data"]))
+
+    speech_client.finish()
+    transcriber._audio_queue.put(None)
+    speech_client.consumed.wait(timeout=60)
+    # Give the transcription thread a moment to process the last responses
+    time.sleep(0.05)
+    transcriber.stop(timeout=60, dump=True)
+    wall = time.perf_counter() - started
+
+    peak = current = 0
+    if trace_allocations:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    _, topics = session.topic_manager.snapshot()
+    result = {
+        "cassette": os.path.basename(path),
+        "audio_seconds": round(cassette.duration, 3),
+        "replay_seconds": round(wall, 3),
+        "speedup": round(cassette.duration / wall, 1) if wall else None,
+        "stt_responses": len(cassette.stt),
+        "topics": len(topics),
+        "chunks": sum(len(topic.chunk_stack) for topic in topics.values()),
+        "chunking_misses": instructor_client.misses,
+        "recommend_misses": sum(model.misses for model in models),
+        "stages": {
+            stage: {
+                "calls": profiler.calls[stage],
+                "cpu_ms": round(profiler.cpu[stage] * 1000, 3),
+                "cpu_us_per_call": round(profiler.cpu[stage] / profiler.calls[stage] * 1e6, 1),
+            }
+            for stage in sorted(profiler.cpu)
+        },
+        "end_to_end": {
+            "count": len(latencies),
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "p99": _percentile(latencies, 0.99),
+            "mean": statistics.fmean(latencies) if latencies else float("nan"),
+        },
+        "alloc_peak_mb": round(peak / 1e6, 3) if trace_allocations else None,
+        "alloc_current_mb": round(current / 1e6, 3) if trace_allocations else None,
+        "digest": state_digest(session),
+    }
+    session.close()
+    return result
+
+
+def print_report(result: Dict) -> None:
+    print(
+        f"{result['cassette']}: {result['audio_seconds']}s of audio replayed in "
+        f"{result['replay_seconds']}s ({result['speedup']}x), {result['stt_responses']} STT responses, "
+        f"{result['topics']} topics / {result['chunks']} chunks"
+    )
+    print(f"{'stage':>14} {'calls':>7} {'cpu ms':>10} {'us/call':>10}")
+    print("-" * 44)
+    for stage, stats in result["stages"].items():
+        print(f"{stage:>14} {stats['calls']:>7} {stats['cpu_ms']:>10.3f} {stats['cpu_us_per_call']:>10.1f}")
+    e2e = result["end_to_end"]
+    print(
+        f"final -> topics applied: n={e2e['count']} p50={e2e['p50'] * 1000:.2f}ms "
+        f"p95={e2e['p95'] * 1000:.2f}ms p99={e2e['p99'] * 1000:.2f}ms"
+    )
+    if result["alloc_peak_mb"] is not None:
+        print(f"allocations: peak {result['alloc_peak_mb']} MB, retained {result['alloc_current_mb']} MB")
+    if result["chunking_misses"] or result["recommend_misses"]:
+        print(
+            f"warning: {result['chunking_misses']} chunking / {result['recommend_misses']} recommend "
+            f"calls did not match the recording; digest may differ from the recorded run"
+        )
+    print(f"state digest: {result['digest']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="Cassette written by `mainserver.py --record`")
+    parser.add_argument("--speed", type=float, default=0.0, help="Audio pacing vs. real time; 0 feeds as fast as possible")
+    parser.add_argument("--trace-allocations", action="store_true", help="Track Python allocations with tracemalloc (slower)")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "replay")
+    result = replay(args.cassette, speed=args.speed, trace_allocations=args.trace_allocations)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from metrics import metrics, STAGE_OUTBOUND_SEND
+
+logger = logging.getLogger(__name__)
+
+POLICY_COALESCE = "coalesce"
+POLICY_DROP = "drop"
+SLOW_CONSUMER_POLICIES = (POLICY_COALESCE, POLICY_DROP)
+
+# Queued in place of a payload to make the writer send a fresh snapshot
+_RESYNC = object()
+
+
+def encode_message(message: dict) -> bytes:
+    """Serialize an outgoing message once; the bytes are shared by every
+    subscriber and sent as a text frame."""
+    return json.dumps(message).encode("utf-8")
+
+
+class Subscriber:
+    """One dashboard socket with its own bounded outbound queue and writer."""
+
+    def __init__(self, websocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.writer_task: Optional[asyncio.Task] = None
+
+
+class Broadcaster:
+    """Fans each update out to every site subscriber of a session.
+
+    Must be used from the event loop thread. A subscriber whose queue is full
+    never delays the others; it is handled by the slow-consumer policy.
+    """
+
+    def __init__(
+        self,
+        snapshot_factory: Callable[[], dict],
+        queue_size: int = 32,
+        policy: str = POLICY_COALESCE,
+        name: str = "broadcast",
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Unknown slow-consumer policy {policy!r}, expected one of {SLOW_CONSUMER_POLICIES}"
+            )
+        self.snapshot_factory = snapshot_factory
+        self.queue_size = queue_size
+        self.policy = policy
+        self.name = name
+        self.published = 0
+        self._subscribers: Dict[object, Subscriber] = {}
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def __contains__(self, websocket) -> bool:
+        return websocket in self._subscribers
+
+    def subscribe(self, websocket) -> Subscriber:
+        """Start streaming to a socket; its first message is a full snapshot."""
+        subscriber = self._subscribers.get(websocket)
+        if subscriber is None:
+            subscriber = Subscriber(websocket, self.queue_size)
+            subscriber.writer_task = asyncio.create_task(self._write(subscriber))
+            self._subscribers[websocket] = subscriber
+        self.resync(websocket)
+        return subscriber
+
+    def unsubscribe(self, websocket) -> bool:
+        subscriber = self._subscribers.pop(websocket, None)
+        if subscriber is None:
+            return False
+        if subscriber.writer_task:
+            subscriber.writer_task.cancel()
+        return True
+
+    def resync(self, websocket) -> None:
+        """Replace anything still queued for a socket with one fresh snapshot."""
+        subscriber = self._subscribers.get(websocket)
+        if subscriber is None:
+            return
+        self._clear(subscriber)
+        subscriber.queue.put_nowait(_RESYNC)
+
+    def publish(self, payload: bytes) -> None:
+        """Queue an already-encoded payload for every subscriber."""
+        self.published += 1
+        for subscriber in list(self._subscribers.values()):
+            try:
+                subscriber.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._on_full(subscriber, payload)
+
+    def close(self) -> None:
+        for websocket in list(self._subscribers):
+            self.unsubscribe(websocket)
+
+    def _on_full(self, subscriber: Subscriber, payload: bytes) -> None:
+        if self.policy == POLICY_COALESCE:
+            # Everything pending is superseded by the snapshot taken when the
+            # writer gets to it, so one message replaces the whole backlog
+            subscriber.coalesced += self._clear(subscriber) + 1
+            subscriber.queue.put_nowait(_RESYNC)
+        else:
+            subscriber.dropped += 1
+        logger.warning(
+            f"Subscriber {subscriber.websocket.remote_address} on {self.name} lagging, "
+            f"applied {self.policy} policy"
+        )
+
+    def _clear(self, subscriber: Subscriber) -> int:
+        cleared = 0
+        while True:
+            try:
+                subscriber.queue.get_nowait()
+                cleared += 1
+            except asyncio.QueueEmpty:
+                return cleared
+
+    async def _write(self, subscriber: Subscriber) -> None:
+        try:
+            while True:
+                payload = await subscriber.queue.get()
+                if payload is _RESYNC:
+                    payload = encode_message(self.snapshot_factory())
+                started = time.perf_counter()
+                await subscriber.websocket.send(payload, text=True)
+                metrics.observe(STAGE_OUTBOUND_SEND, time.perf_counter() - started)
+                subscriber.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Dropping subscriber on {self.name}: {e}")
+            self._subscribers.pop(subscriber.websocket, None)
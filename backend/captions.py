@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from typing import Callable, Optional
+
+from broadcast import encode_message
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Usually all of `a`, since captions mostly grow at the end; otherwise
+    a binary search with slice compares, which stay in C."""
+    if b.startswith(a):
+        return len(a)
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def utf16_length(text: str) -> int:
+    """Length in UTF-16 code units, as JavaScript strings count it."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+class CaptionStream:
+    """Streams a session's live (not yet chunked) transcript to its site
+    subscribers as a caption, at most `max_rate` messages per second.
+
+    `touch()` is cheap and safe to call from any thread on every interim STT
+    result: it only schedules a flush on the event loop unless one is already
+    pending. The flush reads the text once and publishes only what changed:
+
+        {"type": "caption", "seq": n, "base": k, "text": "..."}
+
+    means keep the first `k` characters of caption `n - 1` and append `text`.
+    `k` counts UTF-16 code units, so a browser can `slice(0, k)` even when
+    the caption has characters outside the BMP (emoji, some names).
+    A client that missed a message (seq gap) resyncs from a snapshot, which
+    carries the last caption sent (see `snapshot()`)."""
+
+    def __init__(
+        self,
+        text_source: Callable[[], str],
+        publish: Callable[[bytes], None],
+        max_rate: float = 5.0,
+        active: Optional[Callable[[], bool]] = None,
+    ):
+        self.text_source = text_source
+        self.publish = publish
+        self.max_rate = max_rate
+        # Nothing is read or sent while this returns False (no subscribers)
+        self.active = active
+        self.seq = 0
+        self.text = ""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scheduled = False
+        self._last_flush = float("-inf")
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rate > 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Set the event loop flushes run on; until then touch() is a no-op."""
+        self._loop = loop
+
+    def touch(self) -> None:
+        """The text may have changed."""
+        loop = self._loop
+        if loop is None or not self.enabled or self._closed:
+            return
+        if self.active is not None and not self.active():
+            return
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            loop.call_soon_threadsafe(self._schedule)
+        except RuntimeError:
+            # Loop already closed during shutdown
+            self._scheduled = False
+
+    def _schedule(self) -> None:
+        delay = self._last_flush + 1.0 / self.max_rate - self._loop.time()
+        if delay > 0:
+            self._loop.call_later(delay, self._flush)
+        else:
+            self._flush()
+
+    def _flush(self) -> None:
+        # Touches from here on schedule another flush
+        with self._lock:
+            self._scheduled = False
+        if self._closed:
+            return
+        self._last_flush = self._loop.time()
+
+        text = self.text_source()
+        if text == self.text:
+            return
+        base = common_prefix_length(self.text, text)
+
+        self.seq += 1
+        self.text = text
+        self.publish(encode_message({
+            "type": "caption", "seq": self.seq, "base": utf16_length(text[:base]), "text": text[base:],
+        }))
+
+    def snapshot(self) -> dict:
+        """The last caption sent, for a snapshot message."""
+        return {"seq": self.seq, "text": self.text}
+
+    def close(self) -> None:
+        self._closed = True
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from metrics import metrics, STAGE_CHECKPOINT, STAGE_SESSION_RESTORE
+from topic_manager import Chunk, Topic
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint files are JSON lines. The first record is a full "base" of the
+# session; every later record only carries what changed since the previous
+# one (new chunks, changed descriptions/recommendations, text appended to the
+# long-term buffer). Replaying the file in order rebuilds the session.
+
+
+@dataclass
+class _Cursor:
+    """What has already been written for a session, so the next checkpoint
+    only appends the difference."""
+
+    version: int = -1
+    chunk_counts: Dict[str, int] = field(default_factory=dict)
+    descriptions: Dict[str, str] = field(default_factory=dict)
+    recommendations: Dict[str, List[str]] = field(default_factory=dict)
+    # Bytes of the long-term transcript already written
+    long_term_size: int = 0
+    working_buffer: str = ""
+    previous_recommendations: Any = None
+    records_since_base: int = 0
+
+
+class SessionCheckpointer:
+    def __init__(self, directory: str, compact_every: int = 50):
+        self.directory = directory
+        self.compact_every = compact_every
+        self._cursors: Dict[str, _Cursor] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, session_id: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)[:64]
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.directory, f"{safe}-{digest}.jsonl")
+
+    def checkpoint(self, session) -> bool:
+        """Append whatever changed in the session since the last checkpoint.
+        Returns True if anything was written."""
+        with self._lock, metrics.time(STAGE_CHECKPOINT):
+            version, topics = session.topic_manager.snapshot()
+            long_term = session.transcriber.long_term
+            long_term_size = long_term.size
+            working = session.transcriber.get_working_buffer_text()
+            previous_recommendations = session.transcriber.previous_recommendations
+
+            cursor = self._cursors.get(session.session_id)
+            needs_base = (
+                cursor is None
+                or long_term_size < cursor.long_term_size
+                or any(len(t.chunk_stack) < cursor.chunk_counts.get(tid, 0) for tid, t in topics.items())
+                or cursor.records_since_base >= self.compact_every
+            )
+            if needs_base:
+                # The only place the whole transcript is read back, once per compaction
+                self._write_base(session.session_id, version, topics, long_term.read(0, long_term_size), working, previous_recommendations)
+                return True
+
+            record: Dict[str, Any] = {}
+            topic_changes = {}
+            for topic_id, topic in topics.items():
+                change = {}
+                written = cursor.chunk_counts.get(topic_id, 0)
+                if len(topic.chunk_stack) > written:
+                    change["chunks"] = [[c.blurb, c.content] for c in topic.chunk_stack[written:]]
+                if topic.description != cursor.descriptions.get(topic_id):
+                    change["description"] = topic.description
+                if topic.recommendations != cursor.recommendations.get(topic_id):
+                    change["recommendations"] = topic.recommendations
+                if change:
+                    topic_changes[topic_id] = change
+            if topic_changes:
+                record["topics"] = topic_changes
+            if long_term_size > cursor.long_term_size:
+                record["long_term_append"] = long_term.read(cursor.long_term_size, long_term_size)
+            if working != cursor.working_buffer:
+                record["working_buffer"] = working
+            if previous_recommendations != cursor.previous_recommendations:
+                record["previous_recommendations"] = previous_recommendations
+
+            if not record:
+                return False
+
+            record["version"] = version
+            record["saved_at"] = time.time()
+            with open(self.path_for(session.session_id), "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+            self._advance(cursor, version, topics, long_term_size, working, previous_recommendations)
+            cursor.records_since_base += 1
+            return True
+
+    def restore(self, session) -> bool:
+        """Rebuild a freshly created session from its checkpoint file, if any."""
+        path = self.path_for(session.session_id)
+        if not os.path.exists(path):
+            return False
+
+        started = time.perf_counter()
+        version = 0
+        topics: Dict[str, Topic] = {}
+        long_term_parts: List[str] = []
+        working = ""
+        previous_recommendations = None
+        records = 0
+
+        try:
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    records += 1
+                    if record.get("base"):
+                        topics = {}
+                        long_term_parts = [record.get("long_term_buffer", "")]
+                    for topic_id, change in record.get("topics", {}).items():
+                        topic = topics.setdefault(topic_id, Topic(description=""))
+                        topic.chunk_stack.extend(Chunk(blurb=b, content=c) for b, c in change.get("chunks", []))
+                        if "description" in change:
+                            topic.description = change["description"]
+                        if "recommendations" in change:
+                            topic.recommendations = change["recommendations"]
+                    if "long_term_append" in record:
+                        long_term_parts.append(record["long_term_append"])
+                    if "working_buffer" in record:
+                        working = record["working_buffer"]
+                    if "previous_recommendations" in record:
+                        previous_recommendations = record["previous_recommendations"]
+                    version = record.get("version", version)
+        except (OSError, ValueError) as e:
+            # A torn last line from a crash is expected; anything earlier is used
+            logger.warning(f"Checkpoint for {session.session_id} partly unreadable after {records} records: {e}")
+
+        long_term = "".join(long_term_parts)
+        session.topic_manager.restore(version, topics)
+        session.transcriber.restore_buffers(long_term, working, previous_recommendations)
+
+        with self._lock:
+            cursor = _Cursor()
+            self._advance(cursor, version, topics, session.transcriber.long_term.size, working, previous_recommendations)
+            cursor.records_since_base = records
+            self._cursors[session.session_id] = cursor
+
+        elapsed = time.perf_counter() - started
+        metrics.observe(STAGE_SESSION_RESTORE, elapsed)
+        logger.info(
+            f"Restored session {session.session_id} from {records} checkpoint records "
+            f"({len(topics)} topics) in {elapsed * 1000:.1f} ms"
+        )
+        return True
+
+    def forget(self, session_id: str, delete: bool = False) -> None:
+        with self._lock:
+            self._cursors.pop(session_id, None)
+        if delete:
+            try:
+                os.remove(self.path_for(session_id))
+            except FileNotFoundError:
+                pass
+
+    def prune(self, max_age: float) -> int:
+        """Delete checkpoint files not written to for `max_age` seconds."""
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".jsonl") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def _write_base(self, session_id, version, topics, long_term, working, previous_recommendations) -> None:
+        record = {
+            "base": True,
+            "version": version,
+            "saved_at": time.time(),
+            "topics": {
+                topic_id: {
+                    "chunks": [[c.blurb, c.content] for c in topic.chunk_stack],
+                    "description": topic.description,
+                    "recommendations": topic.recommendations,
+                }
+                for topic_id, topic in topics.items()
+            },
+            "long_term_buffer": long_term,
+            "working_buffer": working,
+            "previous_recommendations": previous_recommendations,
+        }
+        path = self.path_for(session_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, path)
+
+        cursor = _Cursor()
+        self._advance(cursor, version, topics, len(long_term.encode("utf-8")), working, previous_recommendations)
+        self._cursors[session_id] = cursor
+
+    @staticmethod
+    def _advance(cursor: _Cursor, version, topics, long_term_size, working, previous_recommendations) -> None:
+        cursor.version = version
+        cursor.chunk_counts = {tid: len(t.chunk_stack) for tid, t in topics.items()}
+        cursor.descriptions = {tid: t.description for tid, t in topics.items()}
+        cursor.recommendations = {tid: list(t.recommendations) for tid, t in topics.items()}
+        cursor.long_term_size = long_term_size
+        cursor.working_buffer = working
+        cursor.previous_recommendations = previous_recommendations
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from metrics import metrics, STAGE_CHUNKING_QUEUE
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_CONCURRENT = "concurrent"
+MODE_BATCH = "batch"
+MODES = (MODE_OFF, MODE_CONCURRENT, MODE_BATCH)
+
+
+class ChunkingBatcher:
+    """Schedules the chunking LLM calls of every session in the process.
+
+    - `off`: each call runs on its caller's thread, as many at once as
+      sessions have dumps in flight.
+    - `concurrent`: each request is still its own call, but at most
+      `max_concurrency` run at once across all sessions; the rest wait in
+      arrival order.
+    - `batch`: requests that arrive within `window` seconds of the first one
+      waiting, up to `max_batch`, go out as one multi-part call
+      (`call_batch(requests)` returns their results in order). A batch that
+      fills up goes at once; at most `max_concurrency` batches run at once,
+      and while none can start more requests collect into the next batch.
+
+    `submit()` blocks the caller (a session's chunking worker) until its own
+    result is ready, so each session's ChunkingPipeline still applies
+    results in its dump order. A longer window or larger batches mean fewer
+    calls and prompt tokens for more waiting per request."""
+
+    def __init__(
+        self,
+        call_one: Callable[[Any], Any],
+        call_batch: Optional[Callable[[List[Any]], List[Any]]] = None,
+        mode: str = MODE_OFF,
+        window: float = 0.05,
+        max_batch: int = 8,
+        max_concurrency: int = 8,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown chunking batch mode {mode!r}, expected one of {MODES}")
+        if mode == MODE_BATCH and call_batch is None:
+            raise ValueError("Batch mode needs call_batch")
+        self.call_one = call_one
+        self.call_batch = call_batch
+        self.mode = mode
+        self.window = window
+        self.max_batch = max(1, max_batch) if mode == MODE_BATCH else 1
+        self.max_concurrency = max(1, max_concurrency)
+
+        # (request, future, submitted at) in arrival order
+        self._queue: Deque[Tuple[Any, Future, float]] = deque()
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._state = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+        self._counts: Dict[str, int] = {"requests": 0, "calls": 0, "batched_requests": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != MODE_OFF
+
+    def submit(self, request: Any) -> Any:
+        """Run `request` through the scheduler and return its result."""
+        with self._state:
+            self._counts["requests"] += 1
+            if not self.enabled:
+                self._counts["calls"] += 1
+        if not self.enabled:
+            return self.call_one(request)
+
+        future: Future = Future()
+        with self._state:
+            if self._closed:
+                raise RuntimeError("Chunking batcher is closed")
+            self._queue.append((request, future, time.perf_counter()))
+            if self._dispatcher is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="chunking-batch"
+                )
+                self._dispatcher = threading.Thread(target=self._dispatch, name="chunking-batcher", daemon=True)
+                self._dispatcher.start()
+            self._state.notify_all()
+        return future.result()
+
+    def _take(self) -> Optional[List[Tuple[Any, Future, float]]]:
+        with self._state:
+            while not self._queue and not self._closed:
+                self._state.wait()
+            if self._closed:
+                return None
+            # Hold the first request up to `window` for others to join
+            deadline = self._queue[0][2] + self.window
+            while len(self._queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._state.wait(remaining)
+            count = min(self.max_batch, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _dispatch(self) -> None:
+        while True:
+            # Wait for a free slot first: while every call is busy, the queue
+            # keeps growing and the next batch is bigger
+            self._slots.acquire()
+            items = self._take()
+            if items is None:
+                self._slots.release()
+                return
+            now = time.perf_counter()
+            for _, _, submitted in items:
+                metrics.observe(STAGE_CHUNKING_QUEUE, now - submitted)
+            with self._state:
+                self._counts["calls"] += 1
+                if len(items) > 1:
+                    self._counts["batched_requests"] += len(items)
+            self._executor.submit(self._run, items)
+
+    def _run(self, items: List[Tuple[Any, Future, float]]) -> None:
+        try:
+            requests = [request for request, _, _ in items]
+            if len(requests) == 1:
+                results = [self.call_one(requests[0])]
+            else:
+                results = self.call_batch(requests)
+                if len(results) != len(requests):
+                    raise ValueError(f"Batch of {len(requests)} returned {len(results)} results")
+            for (_, future, _), result in zip(items, results):
+                future.set_result(result)
+        except Exception as e:
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._state:
+            return {**self._counts, "queued": len(self._queue)}
+
+    def close(self) -> None:
+        """Stop dispatching; requests still queued fail with RuntimeError."""
+        with self._state:
+            self._closed = True
+            queued = list(self._queue)
+            self._queue.clear()
+            self._state.notify_all()
+            executor = self._executor
+        for _, future, _ in queued:
+            future.set_exception(RuntimeError("Chunking batcher closed"))
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,183 @@
+import logging
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkingPipeline:
+    """Runs `work(text)` for each submitted dump on background threads, at
+    most `max_in_flight` at a time, and hands results to `apply(text,
+    result, error)` strictly in submission order.
+
+    A dump that finishes early waits for the ones before it, so topics are
+    always updated in the order the speech happened. Dumps count as in
+    flight until they have been applied.
+
+    `work` may hand over parts of its result early by calling `emit(item)`
+    from its thread; each is passed to `apply_partial(text, item)` as soon as
+    every earlier dump has been applied, and always before the dump's own
+    `apply`.
+
+    Once `close()` returns nothing more is applied; results still to come
+    are dropped."""
+
+    def __init__(
+        self,
+        work: Callable[[str], Any],
+        apply: Callable[[str, Any, Optional[BaseException]], None],
+        max_in_flight: int = 2,
+        name: str = "",
+        apply_partial: Optional[Callable[[str, Any], None]] = None,
+    ):
+        self.work = work
+        self.apply = apply
+        self.apply_partial = apply_partial
+        self.max_in_flight = max(1, max_in_flight)
+        self.name = name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._next_seq = 0
+        self._next_apply = 0
+        # seq -> text for every dump submitted but not yet applied
+        self._pending: Dict[int, str] = {}
+        self._finished: Dict[int, Tuple[Any, Optional[BaseException]]] = {}
+        self._partials: Dict[int, List[Any]] = {}
+        # The seq a worker thread is running work for, for emit()
+        self._current = threading.local()
+        self._futures: Dict[int, Future] = {}
+        self._state = threading.Condition()
+        self._apply_lock = threading.Lock()
+        self._closed = False
+
+    def in_flight(self) -> int:
+        with self._state:
+            return len(self._pending)
+
+    def has_capacity(self) -> bool:
+        return self.in_flight() < self.max_in_flight
+
+    def pending_texts(self) -> List[str]:
+        """Texts handed off but not applied yet, oldest first."""
+        with self._state:
+            return [self._pending[seq] for seq in sorted(self._pending)]
+
+    def submit(self, text: str, block: bool = False, timeout: Optional[float] = None) -> bool:
+        """Queue a dump for chunking. Returns False if the pipeline is full
+        (after waiting up to `timeout` when `block` is set) or closed."""
+        with self._state:
+            if self._closed:
+                return False
+            if len(self._pending) >= self.max_in_flight:
+                if not block or not self._state.wait_for(
+                    lambda: len(self._pending) < self.max_in_flight, timeout
+                ):
+                    return False
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending[seq] = text
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_in_flight, thread_name_prefix=f"chunking-{self.name}"
+                )
+            self._futures[seq] = self._executor.submit(self._run, seq, text)
+        return True
+
+    def _run(self, seq: int, text: str) -> None:
+        result, error = None, None
+        self._current.seq = seq
+        try:
+            result = self.work(text)
+        except Exception as e:
+            error = e
+        finally:
+            self._current.seq = None
+        with self._state:
+            self._futures.pop(seq, None)
+            self._finished[seq] = (result, error)
+        self._apply_ready()
+
+    def emit(self, item: Any) -> None:
+        """Hand over part of the current dump's result; call from `work`."""
+        seq = getattr(self._current, "seq", None)
+        if seq is None:
+            raise RuntimeError("emit() called outside a chunking worker")
+        with self._state:
+            self._partials.setdefault(seq, []).append(item)
+        self._apply_ready()
+
+    def _apply_ready(self) -> None:
+        # Whichever worker completes the oldest outstanding dump (or emits
+        # part of it) applies it and any later ones that already finished
+        with self._apply_lock:
+            while not self._closed:
+                with self._state:
+                    seq = self._next_apply
+                    partials = self._partials.pop(seq, [])
+                    finished = self._finished.pop(seq, None)
+                    text = self._pending.get(seq)
+                for item in partials:
+                    if self._closed:
+                        return
+                    try:
+                        self.apply_partial(text, item)
+                    except Exception as e:
+                        logger.error(f"Applying partial chunking result {seq} for {self.name} failed: {e}", exc_info=True)
+                if finished is None:
+                    return
+                result, error = finished
+                try:
+                    self.apply(text, result, error)
+                except Exception as e:
+                    logger.error(f"Applying chunking result {seq} for {self.name} failed: {e}", exc_info=True)
+                with self._state:
+                    self._pending.pop(seq, None)
+                    self._next_apply += 1
+                    self._state.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted dump has been applied."""
+        with self._state:
+            return self._state.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker threads. Without `wait`, dumps not yet started are
+        applied with a CancelledError (so their text is not lost) and running
+        ones finish in the background."""
+        with self._state:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        executor.shutdown(wait=wait, cancel_futures=not wait)
+
+        with self._state:
+            cancelled = [seq for seq, future in self._futures.items() if future.cancelled()]
+            for seq in cancelled:
+                del self._futures[seq]
+                self._finished[seq] = (None, CancelledError(f"Chunking for {self.name} shut down"))
+        if cancelled:
+            # A running dump may hold the apply lock through a slow callback;
+            # don't make the caller wait for it
+            threading.Thread(target=self._apply_ready, name=f"chunking-{self.name}-drain", daemon=True).start()
+
+    def close(self, timeout: Optional[float] = 1.0) -> None:
+        """Shut down and stop applying results, so the caller can release
+        what `apply` writes to. Waits up to `timeout` for an apply already
+        under way; dumps still outstanding are dropped."""
+        self.shutdown()
+        acquired = self._apply_lock.acquire(timeout=-1 if timeout is None else timeout)
+        try:
+            self._closed = True
+        finally:
+            if acquired:
+                self._apply_lock.release()
+        if not acquired:
+            logger.warning(f"Closed {self.name} chunking while a result was still being applied")
+        with self._state:
+            dropped = len(self._pending)
+            self._pending.clear()
+            self._finished.clear()
+            self._partials.clear()
+            self._state.notify_all()
+        if dropped:
+            logger.info(f"Dropped {dropped} chunking dump(s) for {self.name} on close")
@@ -1,9 +1,25 @@
 import logging
 import os
-from typing import Dict, Optional, List
-import instructor
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, List, Sequence
 from pydantic import BaseModel, Field
 
+from chunk_batcher import ChunkingBatcher
+from config import (
+    CHUNKING_BATCH_MAX,
+    CHUNKING_BATCH_MODE,
+    CHUNKING_BATCH_WINDOW_MS,
+    CHUNKING_MAX_CONCURRENCY,
+    CHUNKING_MODEL,
+    CHUNKING_PROMPT_BUDGET,
+)
+from llm_clients import llm_clients
+from metrics import metrics, STAGE_LLM_CHUNKING, STAGE_LLM_CHUNKING_FIRST
+from prompt_builder import ChunkingPromptBuilder
+from response_cache import chunking_cache
+from topic_manager import TopicDigest
+
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -24,6 +40,9 @@ def _load_examples() -> str:
 EXAMPLES = _load_examples()
 
 
+prompt_builder = ChunkingPromptBuilder(EXAMPLES, budget=CHUNKING_PROMPT_BUDGET)
+
+
 class TopicAssignment(BaseModel):
     existing_topic_id: Optional[str] = Field(
         None, description="ID of an existing topic if this chunk matches one"
@@ -51,144 +70,322 @@ class ChunkingResult(BaseModel):
     )
 
 
+class RequestChunkingResult(ChunkingResult):
+    request_index: int = Field(description="Index of the request these assignments answer")
+
+
+class BatchChunkingResult(BaseModel):
+    results: List[RequestChunkingResult] = Field(
+        description="One result per request, in request order"
+    )
+
+
+@dataclass
+class ChunkingRequest:
+    transcript: str
+    existing_topics: Sequence[TopicDigest]
+    previous_recommendations: Any
+    project_id: Optional[str]
+    location: str
+    cache_key: str
+
+
 def chunk_transcript_by_topics(
     transcript: str,
-    existing_topics: Optional[str] = None,
+    existing_topics: Optional[Sequence[TopicDigest]] = None,
     project_id: str = None,
     location: str = "us-central1",
-    previous_recommendations: Optional[str] = None,
+    previous_recommendations: Any = None,
+    on_assignment: Optional[Callable[["TopicAssignment"], None]] = None,
 ) -> Dict[str, any]:
+    """Split `transcript` into topic chunks with the LLM.
+
+    With `on_assignment`, the response is streamed and every complete
+    assignment is passed to it as soon as it has been parsed, while later
+    ones are still being generated; the returned result is then marked
+    `streamed` (its chunks were already handed over). A cached result is
+    never streamed, and is marked `cached`. Otherwise the call goes through `chunk_batcher`, which
+    may hold it briefly to share a call with other sessions' dumps."""
     logger.debug(f"Chunking transcript of length {len(transcript)}")
 
-    client = instructor.from_provider(
-        "google/gemini-2.0-flash-exp",
-        vertexai=True,
-        project=project_id,
+    # Prompt examples and recommendations only steer the answer; the same
+    # transcript against the same topics gets the same chunks
+    cache_key = chunking_cache.key(
+        CHUNKING_MODEL,
+        transcript,
+        sorted((digest.topic_id, digest.description) for digest in existing_topics or ()),
+    )
+    cached = chunking_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Chunking result served from cache")
+        return {**cached, "prompt_tokens": 0, "prompt_tokens_saved": 0, "cached": True}
+
+    request = ChunkingRequest(
+        transcript=transcript,
+        existing_topics=existing_topics or (),
+        previous_recommendations=previous_recommendations,
+        project_id=project_id,
         location=location,
+        cache_key=cache_key,
     )
+    if on_assignment is not None:
+        return _chunk_one(request, on_assignment)
+    return chunk_batcher.submit(request)
 
-    prompt = f"""
-    You are a helpful assistant that identifies summary points of chunks from a transcript
-    in addition to identifying topics that the chunk might belong to as well as previous recommendations for how to continue the topic.
-
-    Here are some examples of topics and the chunk blurbs that might belong to those topics:
-    {EXAMPLES}
-
-    Here is the transcript to chunk:
-    {transcript}
 
-    Here are the existing topics:
-    {existing_topics}
-
-    Here are the previous recommendations made by the assistant for each topic:
-    {previous_recommendations}
-    
+def _chunk_one(
+    request: ChunkingRequest,
+    on_assignment: Optional[Callable[["TopicAssignment"], None]] = None,
+) -> Dict[str, any]:
+    built = prompt_builder.build(
+        request.transcript, request.existing_topics, request.previous_recommendations
+    )
+    prompt = built.text
+    prompt_tokens = built.tokens
+    logger.info(
+        f"Chunking prompt: {prompt_tokens} tokens ({built.tokens_saved} saved), "
+        f"{built.topics_included}/{built.topics_total} topics, "
+        f"{built.examples_included}/{built.examples_total} examples"
+    )
 
-    If there are no existing topics that match the chunk, return None for the existing_topic_id parameter
-    and create a new topic in the new_topic_id parameter.
+    logger.info("Calling Gemini via Instructor for chunking")
+    messages = [
+        {
+            "role": "user",
+            "content": prompt,
+        }
+    ]
+    streamed = on_assignment is not None
+    # Chunk contents handed to on_assignment, which can't be taken back
+    applied: List[str] = []
+    try:
+        with metrics.time(STAGE_LLM_CHUNKING), llm_clients.client(
+            CHUNKING_MODEL, request.project_id, request.location
+        ) as client:
+            if not streamed:
+                result = client.chat.completions.create(
+                    response_model=ChunkingResult,
+                    messages=messages,
+                )
+            else:
+                started = time.perf_counter()
+                assignments = []
+                for assignment in client.chat.completions.create_iterable(
+                    response_model=TopicAssignment,
+                    messages=messages,
+                ):
+                    if not assignments:
+                        metrics.observe(STAGE_LLM_CHUNKING_FIRST, time.perf_counter() - started)
+                    assignments.append(assignment)
+                    if assignment.is_complete and (assignment.existing_topic_id or assignment.new_topic_id):
+                        on_assignment(assignment)
+                        applied.append(assignment.chunk_content)
+                # Unfinished text comes back as incomplete assignments
+                result = ChunkingResult(assignments=assignments, incomplete_text="")
+
+        chunked = _split_result(result)
+        chunking_cache.set(request.cache_key, chunked)
+        return {
+            **chunked,
+            "prompt_tokens": prompt_tokens,
+            "prompt_tokens_saved": built.tokens_saved,
+            "streamed": streamed,
+        }
 
-    Note that a chunk has to be ENTIRELY unrelated to the topic in order to justify the creation of
-    a new topic. Therefore, in general chunks in a real conversation will most likely belong to the same topic unless you hear TRANSITION WORDS like "now i want to talk about", or "let's move on to", or other transition words.
+    except Exception as e:
+        logger.error(f"Error calling Instructor: {e}", exc_info=True)
+        # Chunks streamed before the error were already applied; only the
+        # rest of the transcript goes back to be chunked again
+        return _failed(
+            request, prompt_tokens, built.tokens_saved, streamed,
+            incomplete_text=_unassigned_text(request.transcript, applied),
+        )
 
-    IGNORE any parts of the transcript that you consider meaningless, or provide no conversational value or context, for example
-    filler words like um, uh, so, etc., or any other parts of the transcript that you consider meaningless.
 
-    Correct typos based on the context of the transcript; the transcript is bad.
-    Each chunk should contain one point or idea; a chunk blurb should not involve multiple points.
-    """
+def _chunk_batch(requests: List[ChunkingRequest]) -> List[Dict[str, any]]:
+    """Chunk several sessions' requests with one call; results in request
+    order. A request the response leaves out is retried on its own."""
+    if len({(request.project_id, request.location) for request in requests}) > 1:
+        return [_chunk_one(request) for request in requests]
+
+    built = prompt_builder.build_batch([
+        (request.transcript, request.existing_topics, request.previous_recommendations)
+        for request in requests
+    ])
+    # Each request is billed an even share of the shared prompt
+    prompt_tokens = built.tokens // len(requests)
+    tokens_saved = built.tokens_saved // len(requests)
+    logger.info(
+        f"Batched chunking prompt for {len(requests)} requests: {built.tokens} tokens "
+        f"({built.tokens_saved} saved), {built.topics_included}/{built.topics_total} topics, "
+        f"{built.examples_included}/{built.examples_total} examples"
+    )
 
-    logger.info("Calling Gemini via Instructor for chunking")
     try:
-        result = client.chat.completions.create(
-            response_model=ChunkingResult,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-        )
+        with metrics.time(STAGE_LLM_CHUNKING), llm_clients.client(
+            CHUNKING_MODEL, requests[0].project_id, requests[0].location
+        ) as client:
+            batch = client.chat.completions.create(
+                response_model=BatchChunkingResult,
+                messages=[{"role": "user", "content": built.text}],
+            )
+    except Exception as e:
+        logger.error(f"Error calling Instructor for a batch of {len(requests)}: {e}", exc_info=True)
+        return [_failed(request, prompt_tokens, tokens_saved, False) for request in requests]
+
+    by_index = {result.request_index: result for result in batch.results}
+    outputs = []
+    for index, request in enumerate(requests):
+        result = by_index.get(index)
+        if result is None:
+            logger.warning(f"Batched chunking response has no result for request {index}, retrying alone")
+            outputs.append(_chunk_one(request))
+            continue
+        chunked = _split_result(result)
+        chunking_cache.set(request.cache_key, chunked)
+        outputs.append({
+            **chunked,
+            "prompt_tokens": prompt_tokens,
+            "prompt_tokens_saved": tokens_saved,
+            "streamed": False,
+        })
+    return outputs
+
+
+def _split_result(result: ChunkingResult) -> Dict[str, any]:
+    """Group complete assignments by topic; the rest is incomplete text."""
+    logger.info(
+        f"Successfully got structured response with {len(result.assignments)} assignments"
+    )
+    logger.debug(f"Incomplete text length: {len(result.incomplete_text)}")
 
-        logger.info(
-            f"Successfully got structured response with {len(result.assignments)} assignments"
-        )
-        logger.debug(f"Incomplete text length: {len(result.incomplete_text)}")
+    logger.debug("=" * 70)
+    logger.debug("INSTRUCTOR OUTPUT - Raw ChunkingResult:")
+    logger.debug(f"  Total assignments: {len(result.assignments)}")
+    logger.debug(
+        f"  Incomplete text: '{result.incomplete_text[:100]}{'...' if len(result.incomplete_text) > 100 else ''}'"
+    )
 
-        logger.debug("=" * 70)
-        logger.debug("INSTRUCTOR OUTPUT - Raw ChunkingResult:")
-        logger.debug(f"  Total assignments: {len(result.assignments)}")
+    for idx, assignment in enumerate(result.assignments, 1):
+        logger.debug(f"\n  Assignment #{idx}:")
+        logger.debug(f"    existing_topic_id: {assignment.existing_topic_id}")
+        logger.debug(f"    new_topic_id: {assignment.new_topic_id}")
+        logger.debug(f"    updated_description: {assignment.updated_description}")
+        logger.debug(f"    chunk_blurb: {assignment.chunk_blurb}")
+        logger.debug(f"    is_complete: {assignment.is_complete}")
         logger.debug(
-            f"  Incomplete text: '{result.incomplete_text[:100]}{'...' if len(result.incomplete_text) > 100 else ''}'"
+            f"    chunk_content: '{assignment.chunk_content[:100]}{'...' if len(assignment.chunk_content) > 100 else ''}'"
         )
 
-        for idx, assignment in enumerate(result.assignments, 1):
-            logger.debug(f"\n  Assignment #{idx}:")
-            logger.debug(f"    existing_topic_id: {assignment.existing_topic_id}")
-            logger.debug(f"    new_topic_id: {assignment.new_topic_id}")
-            logger.debug(f"    updated_description: {assignment.updated_description}")
-            logger.debug(f"    chunk_blurb: {assignment.chunk_blurb}")
-            logger.debug(f"    is_complete: {assignment.is_complete}")
+    logger.debug("=" * 70)
+
+    complete_chunks = {}
+    chunk_blurbs = {}
+    topic_descriptions = {}
+
+    for assignment in result.assignments:
+        if assignment.is_complete:
+            topic_id = assignment.existing_topic_id or assignment.new_topic_id
+            if topic_id:
+                if topic_id not in complete_chunks:
+                    complete_chunks[topic_id] = []
+                    chunk_blurbs[topic_id] = []
+                complete_chunks[topic_id].append(assignment.chunk_content)
+                chunk_blurbs[topic_id].append(assignment.chunk_blurb)
+                if assignment.updated_description:
+                    topic_descriptions[topic_id] = assignment.updated_description
+                logger.info(f"Assigned chunk to topic: {topic_id}")
+        else:
+            if result.incomplete_text:
+                result.incomplete_text += " " + assignment.chunk_content
+            else:
+                result.incomplete_text = assignment.chunk_content
+
+    logger.debug("\n" + "=" * 70)
+    logger.debug("PROCESSED OUTPUT - Final Result Dictionary:")
+    logger.debug(f"  complete_chunks: {list(complete_chunks.keys())}")
+    for topic_id, chunks in complete_chunks.items():
+        logger.debug(f"    [{topic_id}]: {len(chunks)} chunk(s)")
+        for i, (blurb, content) in enumerate(
+            zip(chunk_blurbs[topic_id], chunks), 1
+        ):
+            logger.debug(f"      Chunk #{i}:")
+            logger.debug(f"        Blurb: '{blurb}'")
             logger.debug(
-                f"    chunk_content: '{assignment.chunk_content[:100]}{'...' if len(assignment.chunk_content) > 100 else ''}'"
+                f"        Content: '{content[:80]}{'...' if len(content) > 80 else ''}'"
             )
+    logger.debug(f"  topic_descriptions: {list(topic_descriptions.keys())}")
+    for topic_id, desc in topic_descriptions.items():
+        logger.debug(f"    [{topic_id}]: '{desc}'")
+    logger.debug(
+        f"  incomplete_text: '{result.incomplete_text[:100]}{'...' if len(result.incomplete_text) > 100 else ''}'"
+    )
+    logger.debug("=" * 70 + "\n")
+
+    return {
+        "complete_chunks": complete_chunks,
+        "chunk_blurbs": chunk_blurbs,
+        "incomplete_text": result.incomplete_text,
+        "topic_descriptions": topic_descriptions,
+    }
+
+
+def _unassigned_text(transcript: str, applied: List[str]) -> str:
+    """`transcript` without the chunks already applied. A chunk the model
+    didn't copy verbatim can't be located, so its text is kept."""
+    if not applied:
+        return transcript
+    remaining = " ".join(transcript.split())
+    for content in applied:
+        content = " ".join(content.split())
+        if content and content in remaining:
+            remaining = remaining.replace(content, " ", 1)
+    return " ".join(remaining.split())
+
+
+def _failed(
+    request: ChunkingRequest,
+    prompt_tokens: int,
+    tokens_saved: int,
+    streamed: bool,
+    incomplete_text: Optional[str] = None,
+) -> Dict[str, any]:
+    return {
+        "complete_chunks": {},
+        "chunk_blurbs": {},
+        "incomplete_text": request.transcript if incomplete_text is None else incomplete_text,
+        "topic_descriptions": {},
+        "prompt_tokens": prompt_tokens,
+        "prompt_tokens_saved": tokens_saved,
+        "streamed": streamed,
+    }
+
+
+def _batcher(mode: str, window: float, max_batch: int, max_concurrency: int) -> ChunkingBatcher:
+    return ChunkingBatcher(
+        _chunk_one,
+        _chunk_batch,
+        mode=mode,
+        window=window,
+        max_batch=max_batch,
+        max_concurrency=max_concurrency,
+    )
 
-        logger.debug("=" * 70)
-
-        complete_chunks = {}
-        chunk_blurbs = {}
-        topic_descriptions = {}
-
-        for assignment in result.assignments:
-            if assignment.is_complete:
-                topic_id = assignment.existing_topic_id or assignment.new_topic_id
-                if topic_id:
-                    if topic_id not in complete_chunks:
-                        complete_chunks[topic_id] = []
-                        chunk_blurbs[topic_id] = []
-                    complete_chunks[topic_id].append(assignment.chunk_content)
-                    chunk_blurbs[topic_id].append(assignment.chunk_blurb)
-                    if assignment.updated_description:
-                        topic_descriptions[topic_id] = assignment.updated_description
-                    logger.info(f"Assigned chunk to topic: {topic_id}")
-            else:
-                if result.incomplete_text:
-                    result.incomplete_text += " " + assignment.chunk_content
-                else:
-                    result.incomplete_text = assignment.chunk_content
-
-        logger.debug("\n" + "=" * 70)
-        logger.debug("PROCESSED OUTPUT - Final Result Dictionary:")
-        logger.debug(f"  complete_chunks: {list(complete_chunks.keys())}")
-        for topic_id, chunks in complete_chunks.items():
-            logger.debug(f"    [{topic_id}]: {len(chunks)} chunk(s)")
-            for i, (blurb, content) in enumerate(
-                zip(chunk_blurbs[topic_id], chunks), 1
-            ):
-                logger.debug(f"      Chunk #{i}:")
-                logger.debug(f"        Blurb: '{blurb}'")
-                logger.debug(
-                    f"        Content: '{content[:80]}{'...' if len(content) > 80 else ''}'"
-                )
-        logger.debug(f"  topic_descriptions: {list(topic_descriptions.keys())}")
-        for topic_id, desc in topic_descriptions.items():
-            logger.debug(f"    [{topic_id}]: '{desc}'")
-        logger.debug(
-            f"  incomplete_text: '{result.incomplete_text[:100]}{'...' if len(result.incomplete_text) > 100 else ''}'"
-        )
-        logger.debug("=" * 70 + "\n")
 
-        return {
-            "complete_chunks": complete_chunks,
-            "chunk_blurbs": chunk_blurbs,
-            "incomplete_text": result.incomplete_text,
-            "topic_descriptions": topic_descriptions,
-        }
+chunk_batcher = _batcher(
+    CHUNKING_BATCH_MODE, CHUNKING_BATCH_WINDOW_MS / 1000, CHUNKING_BATCH_MAX, CHUNKING_MAX_CONCURRENCY
+)
 
-    except Exception as e:
-        logger.error(f"Error calling Instructor: {e}", exc_info=True)
-        return {
-            "complete_chunks": {},
-            "chunk_blurbs": {},
-            "incomplete_text": transcript,
-            "topic_descriptions": {},
-        }
+
+def configure_batching(
+    mode: str,
+    window: float = CHUNKING_BATCH_WINDOW_MS / 1000,
+    max_batch: int = CHUNKING_BATCH_MAX,
+    max_concurrency: int = CHUNKING_MAX_CONCURRENCY,
+) -> ChunkingBatcher:
+    """Replace `chunk_batcher` (closing the old one), e.g. for benchmarks."""
+    global chunk_batcher
+    old = chunk_batcher
+    chunk_batcher = _batcher(mode, window, max_batch, max_concurrency)
+    old.close()
+    return chunk_batcher
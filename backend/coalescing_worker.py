@@ -0,0 +1,59 @@
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescingWorker:
+    """Runs `work(keys)` on a background thread for the keys passed to
+    `request()`.
+
+    Keys requested while a run is in progress are merged into a single
+    follow-up run (in first-requested order), so a burst of requests costs
+    at most two runs and the caller never waits for one."""
+
+    def __init__(self, work: Callable[[List[str]], None], name: str = ""):
+        self.work = work
+        self.name = name
+        # Insertion-ordered set of keys waiting for the next run
+        self._pending: Dict[str, None] = {}
+        self._running = False
+        self._closed = False
+        self._state = threading.Condition()
+
+    def request(self, keys: Iterable[str]) -> None:
+        with self._state:
+            if self._closed:
+                return
+            for key in keys:
+                self._pending.setdefault(key, None)
+            if self._running or not self._pending:
+                return
+            self._running = True
+        threading.Thread(target=self._run, name=f"coalescing-{self.name}", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            with self._state:
+                if not self._pending or self._closed:
+                    self._running = False
+                    self._state.notify_all()
+                    return
+                keys = list(self._pending)
+                self._pending.clear()
+            try:
+                self.work(keys)
+            except Exception as e:
+                logger.error(f"{self.name} run failed: {e}", exc_info=True)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until nothing is running or pending."""
+        with self._state:
+            return self._state.wait_for(lambda: not self._running, timeout)
+
+    def close(self) -> None:
+        """Drop pending keys; a run in progress finishes in the background."""
+        with self._state:
+            self._closed = True
+            self._pending.clear()
@@ -4,6 +4,38 @@ PROJECT_ID = os.environ.get("GOOGLE_CLOUD_PROJECT")
 LOCATION = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
 
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+# Instructor provider/model used to chunk transcripts into topics
+CHUNKING_MODEL = os.environ.get("CHUNKING_MODEL", "google/gemini-2.0-flash-exp")
+# Estimated tokens per chunking prompt: instructions and transcript always go in,
+# the most relevant topics, recommendations and examples fill the rest (0 = send all)
+CHUNKING_PROMPT_BUDGET = int(os.environ.get("CHUNKING_PROMPT_BUDGET", "2000"))
+# CHUNKING_STREAM=1 streams chunking responses and applies (and broadcasts) each
+# topic assignment as soon as it is parsed
+CHUNKING_STREAM = os.environ.get("CHUNKING_STREAM", "0") == "1"
+# Chunking and recommendation responses are cached by normalized request: up to
+# RESPONSE_CACHE_SIZE per kind in memory for RESPONSE_CACHE_TTL seconds (0 = off),
+# and with RESPONSE_CACHE_DIR set, on disk (LRU-evicted beyond RESPONSE_CACHE_DISK_MB,
+# expired after RESPONSE_CACHE_DISK_TTL seconds)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "900"))
+RESPONSE_CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR", "")
+RESPONSE_CACHE_DISK_MB = int(os.environ.get("RESPONSE_CACHE_DISK_MB", "256"))
+RESPONSE_CACHE_DISK_TTL = float(os.environ.get("RESPONSE_CACHE_DISK_TTL", "86400"))
+
+# Long-lived chunking LLM clients shared by all sessions: at most LLM_POOL_SIZE
+# per project/location/model, LLM_POOL_WARM of them built at startup (and, with
+# LLM_POOL_PING=1, connected with a model lookup)
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "4"))
+LLM_POOL_WARM = int(os.environ.get("LLM_POOL_WARM", "2"))
+LLM_POOL_PING = os.environ.get("LLM_POOL_PING", "0") == "1"
+# Scheduling of chunking calls across sessions: CHUNKING_BATCH_MODE is "off"
+# (each dump calls at once), "concurrent" (at most CHUNKING_MAX_CONCURRENCY calls
+# at once) or "batch" (dumps arriving within CHUNKING_BATCH_WINDOW_MS of each
+# other, up to CHUNKING_BATCH_MAX, share one call). Streamed chunking is never batched.
+CHUNKING_BATCH_MODE = os.environ.get("CHUNKING_BATCH_MODE", "off")
+CHUNKING_BATCH_WINDOW_MS = float(os.environ.get("CHUNKING_BATCH_WINDOW_MS", "50"))
+CHUNKING_BATCH_MAX = int(os.environ.get("CHUNKING_BATCH_MAX", "8"))
+CHUNKING_MAX_CONCURRENCY = int(os.environ.get("CHUNKING_MAX_CONCURRENCY", "8"))
 GEMINI_SYSTEM_PROMPT = """You are a transcript cleaning and topic analysis assistant. 
 Your task is to:
 1. Clean and format the provided transcript by:
@@ -23,3 +55,80 @@ A topic should be considered "finished" when:
 - The main point or question has been fully addressed
 
 Provide the cleaned transcript in the cleaned_transcript field and set topic_finished to true if the topic has concluded, false otherwise."""
+
+# Sessions with no connected sockets are reclaimed after this many seconds
+SESSION_IDLE_TIMEOUT = float(os.environ.get("SESSION_IDLE_TIMEOUT", "300"))
+SESSION_REAP_INTERVAL = float(os.environ.get("SESSION_REAP_INTERVAL", "30"))
+
+# Per-session audio ingest queue feeding the transcription worker.
+# INGEST_FULL_POLICY is one of "block", "drop_oldest" or "reject".
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "64"))
+INGEST_FULL_POLICY = os.environ.get("INGEST_FULL_POLICY", "drop_oldest")
+INGEST_BLOCK_TIMEOUT = float(os.environ.get("INGEST_BLOCK_TIMEOUT", "5.0"))
+# Closing a session waits this long for the chunk its ingest worker is handling
+INGEST_CLOSE_TIMEOUT = float(os.environ.get("INGEST_CLOSE_TIMEOUT", "1.0"))
+
+# Incoming audio is normalized to LINEAR16 mono at the recognizer's rate and
+# coalesced into frames of this length. Headerless audio from a phone that
+# does not declare its format is assumed to be AUDIO_INPUT_SAMPLE_RATE/CHANNELS.
+AUDIO_FRAME_MS = int(os.environ.get("AUDIO_FRAME_MS", "100"))
+AUDIO_INPUT_SAMPLE_RATE = int(os.environ.get("AUDIO_INPUT_SAMPLE_RATE", "16000"))
+AUDIO_INPUT_CHANNELS = int(os.environ.get("AUDIO_INPUT_CHANNELS", "1"))
+
+# Adaptive dump scheduling: target seconds from a final transcript to its
+# topic chunk, and a cap on chunking LLM calls per minute per session (0 for
+# no cap). DUMP_TARGET_LATENCY=0 restores fixed 10-word / 5-second dumps.
+DUMP_TARGET_LATENCY = float(os.environ.get("DUMP_TARGET_LATENCY", "15"))
+DUMP_MAX_PER_MINUTE = int(os.environ.get("DUMP_MAX_PER_MINUTE", "6"))
+
+# Dumps that clearly match one existing topic by local (hashing TF-IDF)
+# similarity skip the chunking LLM call; TOPIC_FAST_PATH_THRESHOLD=0 turns this
+# off. Every TOPIC_FAST_PATH_AUDIT_EVERY-th match is also checked by the LLM.
+TOPIC_FAST_PATH_THRESHOLD = float(os.environ.get("TOPIC_FAST_PATH_THRESHOLD", "0.3"))
+TOPIC_FAST_PATH_MARGIN = float(os.environ.get("TOPIC_FAST_PATH_MARGIN", "0.15"))
+TOPIC_FAST_PATH_AUDIT_EVERY = int(os.environ.get("TOPIC_FAST_PATH_AUDIT_EVERY", "10"))
+
+# Dumps of the working buffer chunked concurrently per session; results are
+# still applied to topics in dump order
+CHUNKING_MAX_IN_FLIGHT = int(os.environ.get("CHUNKING_MAX_IN_FLIGHT", "2"))
+
+# Long-term transcripts are spilled to unlinked files in this directory (the
+# system temp dir when empty), keeping only TRANSCRIPT_TAIL_BYTES in memory
+TRANSCRIPT_SPILL_DIR = os.environ.get("TRANSCRIPT_SPILL_DIR", "")
+TRANSCRIPT_TAIL_BYTES = int(os.environ.get("TRANSCRIPT_TAIL_BYTES", "16384"))
+
+# Credit-based flow control for phones: how many frames a phone may have in
+# flight, and how often the server sends a cumulative ack (every N frames or
+# every T seconds, whichever comes first)
+FLOW_WINDOW_FRAMES = int(os.environ.get("FLOW_WINDOW_FRAMES", "32"))
+FLOW_ACK_EVERY = int(os.environ.get("FLOW_ACK_EVERY", "10"))
+FLOW_ACK_INTERVAL = float(os.environ.get("FLOW_ACK_INTERVAL", "0.25"))
+
+# Live caption of the not-yet-chunked transcript pushed to dashboards, at most
+# this many updates per second per session (0 disables it)
+CAPTION_MAX_RATE = float(os.environ.get("CAPTION_MAX_RATE", "5"))
+
+# Outbound queue per dashboard subscriber. When a slow subscriber's queue is
+# full, SITE_SLOW_POLICY either "coalesce"s everything pending into one fresh
+# snapshot or "drop"s the update (the client resyncs on the sequence gap).
+SITE_QUEUE_SIZE = int(os.environ.get("SITE_QUEUE_SIZE", "32"))
+SITE_SLOW_POLICY = os.environ.get("SITE_SLOW_POLICY", "coalesce")
+
+# Prometheus text-format metrics endpoint served next to the WebSocket server.
+# Set METRICS_PORT=0 to disable it.
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9100"))
+
+# Incremental per-session checkpoints used to warm-restore sessions after a
+# restart. Off unless CHECKPOINT_DIR is set; the shared default session is
+# never checkpointed.
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "")
+CHECKPOINT_INTERVAL = float(os.environ.get("CHECKPOINT_INTERVAL", "10"))
+# Rewrite the file as a single base record after this many incremental records,
+# which bounds restore time
+CHECKPOINT_COMPACT_EVERY = int(os.environ.get("CHECKPOINT_COMPACT_EVERY", "50"))
+CHECKPOINT_RETENTION = float(os.environ.get("CHECKPOINT_RETENTION", str(24 * 3600)))
+
+# Worker processes for `mainserver.py --workers N`; each reports its load this often
+WORKERS = int(os.environ.get("WORKERS", "1"))
+WORKER_LOAD_REPORT_INTERVAL = float(os.environ.get("WORKER_LOAD_REPORT_INTERVAL", "2.0"))
@@ -0,0 +1,150 @@
+import threading
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+# Weight of the newest observation in the chunking latency average
+LATENCY_SMOOTHING = 0.3
+# Dump before the deadline once waiting for it would grow the batch by less
+# than this fraction (the speaker has paused or slowed right down)
+EARLY_DUMP_GAIN = 0.25
+RATE_LIMIT_WINDOW = 60.0
+
+
+class DumpScheduler:
+    """Decides when a session's working buffer should be sent for chunking.
+
+    The goal is for finalized speech to show up as a topic chunk within
+    `target_latency` seconds, using as few LLM calls as that allows. Each
+    dump is expected to take the observed chunking latency (a moving
+    average), stretched by the dumps already in flight whose results are
+    applied first. The buffer is held as long as the oldest final in it can
+    still make the target, so fast talkers produce larger batches instead
+    of more calls; it is dumped early when a pause means waiting would add
+    little, or when it reaches `max_words`. At most `max_dumps_per_minute`
+    dumps are made in any 60 seconds; `min_words` is the smallest batch
+    worth dumping ahead of the deadline.
+
+    With `target_latency <= 0` it falls back to fixed thresholds: at least
+    `min_words` words and `min_interval` seconds since the last dump.
+
+    Times are passed in by the caller (time.time() values) so the decision
+    can be replayed against a recorded clock."""
+
+    def __init__(
+        self,
+        target_latency: float = 15.0,
+        max_dumps_per_minute: int = 6,
+        min_words: int = 10,
+        max_words: int = 400,
+        min_interval: float = 5.0,
+        initial_latency: float = 3.0,
+        rate_window: float = 10.0,
+        max_in_flight: int = 2,
+    ):
+        self.target_latency = target_latency
+        self.max_dumps_per_minute = max_dumps_per_minute
+        self.min_words = min_words
+        self.max_words = max_words
+        self.min_interval = min_interval
+        self.rate_window = rate_window
+        self.max_in_flight = max(1, max_in_flight)
+
+        self.chunking_latency = initial_latency
+        self._finals: Deque[Tuple[float, int]] = deque()
+        self._final_words = 0
+        self._dumps: Deque[float] = deque()
+        self._oldest_pending: Optional[float] = None
+        self._last_dump: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def adaptive(self) -> bool:
+        return self.target_latency > 0
+
+    def observe_final(self, words: int, now: float) -> None:
+        """A final result with `words` words was added to the buffer."""
+        with self._lock:
+            if self._oldest_pending is None:
+                self._oldest_pending = now
+            self._finals.append((now, words))
+            self._final_words += words
+            self._expire(now)
+
+    def observe_latency(self, seconds: float) -> None:
+        """A dump took `seconds` to chunk."""
+        with self._lock:
+            self.chunking_latency += LATENCY_SMOOTHING * (seconds - self.chunking_latency)
+
+    def record_dump(self, now: float) -> None:
+        """The finalized text in the buffer was handed off for chunking."""
+        with self._lock:
+            self._dumps.append(now)
+            self._last_dump = now
+            self._oldest_pending = None
+            self._expire(now)
+
+    def reset(self, now: float, pending: bool = False) -> None:
+        """Start over, e.g. after the buffer was replaced; `pending` when it
+        already holds text that should count as waiting from `now`."""
+        with self._lock:
+            self._oldest_pending = now if pending else None
+            self._last_dump = now
+
+    def _expire(self, now: float) -> None:
+        while self._finals and now - self._finals[0][0] > self.rate_window:
+            self._final_words -= self._finals.popleft()[1]
+        while self._dumps and now - self._dumps[0] > RATE_LIMIT_WINDOW:
+            self._dumps.popleft()
+
+    def speech_rate(self, now: float) -> float:
+        """Finalized words per second over the last `rate_window` seconds."""
+        with self._lock:
+            return self._speech_rate(now)
+
+    def expected_latency(self, in_flight: int) -> float:
+        """How long a dump made now should take to be applied."""
+        with self._lock:
+            return self._expected_latency(in_flight)
+
+    def rate_limited(self, now: float) -> bool:
+        with self._lock:
+            return self._rate_limited(now)
+
+    def should_dump(self, words: int, in_flight: int, now: float) -> bool:
+        # One lock for the whole decision, so it sees a consistent state
+        # while finals and dumps are recorded from other threads
+        with self._lock:
+            if words <= 0 or self._rate_limited(now):
+                return False
+
+            if not self.adaptive:
+                last = self._last_dump
+                return words >= self.min_words and (last is None or now - last >= self.min_interval)
+
+            if words >= self.max_words:
+                return True
+            oldest = self._oldest_pending
+            if oldest is None:
+                return False
+
+            age = now - oldest
+            slack = self.target_latency - self._expected_latency(in_flight) - age
+            if slack <= 0:
+                return True
+            # Before the deadline, only batches worth a call go early
+            if words < self.min_words:
+                return False
+            return self._speech_rate(now) * slack < words * EARLY_DUMP_GAIN
+
+    # The helpers below expect the lock to be held
+
+    def _speech_rate(self, now: float) -> float:
+        self._expire(now)
+        return self._final_words / self.rate_window
+
+    def _expected_latency(self, in_flight: int) -> float:
+        return self.chunking_latency * (1 + in_flight / self.max_in_flight)
+
+    def _rate_limited(self, now: float) -> bool:
+        self._expire(now)
+        return self.max_dumps_per_minute > 0 and len(self._dumps) >= self.max_dumps_per_minute
@@ -0,0 +1,60 @@
+import time
+from typing import Optional
+
+
+class FlowController:
+    """Credit-based flow control for one phone socket.
+
+    Instead of acking every frame, the server sends a `flow` message every
+    `ack_every` frames or `ack_interval` seconds carrying the highest sequence
+    received (a cumulative ack) and how many frames past it the phone may
+    send. Credits shrink as the session's ingest queue fills, so a phone
+    sending faster than the transcriber drains is told to buffer locally.
+    """
+
+    def __init__(self, window: int = 32, ack_every: int = 10, ack_interval: float = 0.25):
+        self.window = window
+        self.ack_every = ack_every
+        self.ack_interval = ack_interval
+        self.reset()
+
+    def reset(self) -> None:
+        self.last_sequence: Optional[int] = None
+        self.unacked = 0
+        self.last_granted: Optional[int] = None
+        self.last_ack_time = time.monotonic()
+        self.acks_sent = 0
+
+    def credits_for(self, free_slots: int) -> int:
+        return max(0, min(self.window, free_slots))
+
+    def on_frame(self, sequence: int, free_slots: int) -> Optional[dict]:
+        """Record a received frame; returns a flow message when one is due."""
+        self.last_sequence = sequence
+        self.unacked += 1
+        if self.unacked >= self.ack_every:
+            return self.make_ack(free_slots)
+        return None
+
+    def poll(self, free_slots: int, now: Optional[float] = None) -> Optional[dict]:
+        """Timer-driven ack: flushes frames not yet acked and announces credit
+        that opened up while the phone was stalled."""
+        now = now if now is not None else time.monotonic()
+        credits = self.credits_for(free_slots)
+        if self.unacked and now - self.last_ack_time >= self.ack_interval:
+            return self.make_ack(free_slots)
+        if self.last_granted is not None and credits > self.last_granted:
+            return self.make_ack(free_slots)
+        return None
+
+    def make_ack(self, free_slots: int) -> dict:
+        credits = self.credits_for(free_slots)
+        self.unacked = 0
+        self.last_granted = credits
+        self.last_ack_time = time.monotonic()
+        self.acks_sent += 1
+        return {
+            "type": "flow",
+            "ack": self.last_sequence,
+            "credits": credits,
+        }
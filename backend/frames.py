@@ -0,0 +1,96 @@
+import struct
+import time
+from dataclasses import dataclass
+from typing import Optional, Union
+
+# Binary audio frame sent by phone clients instead of base64 JSON:
+#
+#   offset  size  field
+#   0       2     magic b"EA"
+#   2       1     protocol version
+#   3       1     flags (reserved, 0)
+#   4       16    session id, UTF-8, NUL padded
+#   20      4     sequence number, uint32
+#   24      8     capture timestamp in ms since the epoch, uint64
+#   32      ...   raw LINEAR16 PCM
+#
+# All integers are little-endian so browsers and phones can write the header
+# with a DataView without byte swapping.
+AUDIO_FRAME_MAGIC = b"EA"
+AUDIO_FRAME_VERSION = 1
+AUDIO_FRAME_HEADER = struct.Struct("<2sBB16sIQ")
+AUDIO_FRAME_HEADER_SIZE = AUDIO_FRAME_HEADER.size
+MAX_SESSION_ID_BYTES = 16
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+
+class FrameError(ValueError):
+    pass
+
+
+@dataclass
+class AudioFrame:
+    session_id: Optional[str]
+    sequence: int
+    timestamp_ms: int
+    payload: memoryview
+
+
+def parse_audio_frame(message: BufferLike) -> AudioFrame:
+    """Parse a binary audio frame. The returned payload is a view into
+    `message`, so no audio bytes are copied."""
+    view = memoryview(message)
+    if view.nbytes < AUDIO_FRAME_HEADER_SIZE:
+        raise FrameError(
+            f"Binary frame too short: {view.nbytes} bytes, header is {AUDIO_FRAME_HEADER_SIZE}"
+        )
+
+    magic, version, _flags, raw_session_id, sequence, timestamp_ms = (
+        AUDIO_FRAME_HEADER.unpack_from(view)
+    )
+    if magic != AUDIO_FRAME_MAGIC:
+        raise FrameError(f"Bad frame magic {magic!r}")
+    if version != AUDIO_FRAME_VERSION:
+        raise FrameError(f"Unsupported frame version {version}")
+
+    try:
+        session_id = raw_session_id.rstrip(b"\x00").decode("utf-8") or None
+    except UnicodeDecodeError as e:
+        raise FrameError(f"Invalid session id in frame header: {e}")
+
+    return AudioFrame(
+        session_id=session_id,
+        sequence=sequence,
+        timestamp_ms=timestamp_ms,
+        payload=view[AUDIO_FRAME_HEADER_SIZE:],
+    )
+
+
+def encode_audio_frame(
+    pcm: BufferLike,
+    sequence: int,
+    session_id: Optional[str] = None,
+    timestamp_ms: Optional[int] = None,
+) -> bytes:
+    raw_session_id = (session_id or "").encode("utf-8")
+    if len(raw_session_id) > MAX_SESSION_ID_BYTES:
+        raise FrameError(
+            f"Session id {session_id!r} longer than {MAX_SESSION_ID_BYTES} bytes"
+        )
+    if timestamp_ms is None:
+        timestamp_ms = int(time.time() * 1000)
+
+    frame = bytearray(AUDIO_FRAME_HEADER_SIZE + memoryview(pcm).nbytes)
+    AUDIO_FRAME_HEADER.pack_into(
+        frame,
+        0,
+        AUDIO_FRAME_MAGIC,
+        AUDIO_FRAME_VERSION,
+        0,
+        raw_session_id,
+        sequence & 0xFFFFFFFF,
+        timestamp_ms,
+    )
+    frame[AUDIO_FRAME_HEADER_SIZE:] = pcm
+    return bytes(frame)
@@ -0,0 +1,184 @@
+import asyncio
+import functools
+import logging
+import queue
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+POLICY_BLOCK = "block"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_REJECT = "reject"
+FULL_QUEUE_POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_REJECT)
+
+_STOP = object()
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+class AudioIngestQueue:
+    """Bounded queue between the event loop and a dedicated worker thread.
+
+    `put` is called from the event loop and returns as soon as the chunk is
+    queued; the worker drains the queue and runs the (blocking) handler, so
+    STT and LLM calls never stall other sockets.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[bytes], None],
+        maxsize: int = 64,
+        policy: str = POLICY_DROP_OLDEST,
+        block_timeout: float = 5.0,
+        name: str = "ingest",
+        on_idle: Optional[Callable[[], None]] = None,
+        idle_after: float = 0.25,
+    ):
+        if policy not in FULL_QUEUE_POLICIES:
+            raise ValueError(
+                f"Unknown full-queue policy {policy!r}, expected one of {FULL_QUEUE_POLICIES}"
+            )
+        self.handler = handler
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.name = name
+        # Called on the worker once no chunk has arrived for `idle_after`
+        # seconds since the last one was handled
+        self.on_idle = on_idle
+        self.idle_after = idle_after
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._is_running = False
+        self._stopped = False
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._is_running:
+            return
+        if self._worker is not None:
+            # The last run's worker may still be handling its final chunk;
+            # two workers would feed the handler out of order
+            self._worker.join()
+            # and a fresh queue keeps its _STOP from ending this run
+            self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._is_running = True
+        self._stopped = False
+        self._worker = threading.Thread(
+            target=self._drain, args=(self._queue,), name=f"ingest-{self.name}", daemon=True
+        )
+        self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker once the chunk in flight is done. Queued audio is
+        discarded, and so is audio put afterwards until `start()` is called
+        again. Only waits for the worker if `timeout` is given (also when it
+        was already stopped)."""
+        self._stopped = True
+        if self._is_running:
+            self._is_running = False
+            # The worker only exits on _STOP, so make room for it
+            while True:
+                self._clear()
+                try:
+                    self._queue.put_nowait(_STOP)
+                    break
+                except queue.Full:
+                    continue
+        if self._worker and timeout is not None:
+            self._worker.join(timeout=timeout)
+
+    async def put(self, chunk: bytes) -> None:
+        """Queue a chunk for the worker, applying the full-queue policy.
+
+        Raises IngestQueueFull when the chunk could not be queued.
+        """
+        if not self._is_running:
+            if self._stopped:
+                # e.g. a frame racing the reaper; the session is going away
+                self.dropped += 1
+                return
+            self.start()
+
+        try:
+            self._queue.put_nowait(chunk)
+            self.enqueued += 1
+            return
+        except queue.Full:
+            pass
+
+        if self.policy == POLICY_DROP_OLDEST:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(chunk)
+                    self.enqueued += 1
+                    return
+                except queue.Full:
+                    continue
+
+        if self.policy == POLICY_BLOCK:
+            # Wait off-loop so only this client's handler is suspended; not
+            # reading from its socket is what pushes back on the sender.
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(
+                    None,
+                    functools.partial(self._queue.put, chunk, timeout=self.block_timeout),
+                )
+                self.enqueued += 1
+                return
+            except queue.Full:
+                pass
+
+        self.rejected += 1
+        raise IngestQueueFull(
+            f"Audio queue full ({self._queue.maxsize} chunks), chunk rejected"
+        )
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def free_slots(self) -> int:
+        return max(0, self._queue.maxsize - self._queue.qsize())
+
+    def _clear(self) -> None:
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _drain(self, chunks: queue.Queue) -> None:
+        busy = False
+        while True:
+            try:
+                chunk = chunks.get(timeout=self.idle_after if busy and self.on_idle else None)
+            except queue.Empty:
+                busy = False
+                try:
+                    self.on_idle()
+                except Exception as e:
+                    logger.error(f"Ingest worker {self.name} idle hook failed: {e}", exc_info=True)
+                continue
+            if chunk is _STOP:
+                break
+            busy = True
+            try:
+                self.handler(chunk)
+            except Exception as e:
+                logger.error(f"Ingest worker {self.name} failed on chunk: {e}", exc_info=True)
+            finally:
+                self.processed += 1
+        logger.info(f"Ingest worker {self.name} stopped")
@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import instructor
+
+from config import LLM_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Tuple[str, Optional[str], Optional[str]]
+
+
+def _build_instructor_client(model: str, project: Optional[str], location: Optional[str]):
+    return instructor.from_provider(model, vertexai=True, project=project, location=location)
+
+
+class LLMClientPool:
+    """Process-wide pool of long-lived LLM clients keyed by (model, project,
+    location).
+
+    Building an instructor client sets up the provider SDK, credentials and
+    an HTTP session, and its first request pays for the TLS handshake; a
+    pooled client keeps its keep-alive connections for the next call.
+
+    Callers get an idle client when there is one. Otherwise a new one is
+    built, up to `max_per_key`; beyond that, callers share the least busy
+    client (the SDK clients are thread-safe, each with its own connection
+    pool), so the pool never caps how many calls run at once."""
+
+    def __init__(
+        self,
+        factory: Callable[[str, Optional[str], Optional[str]], Any] = _build_instructor_client,
+        max_per_key: int = 4,
+    ):
+        self.factory = factory
+        self.max_per_key = max(1, max_per_key)
+        # Per key: [client, calls in progress] for every client built
+        self._clients: Dict[ClientKey, List[List[Any]]] = {}
+        self._building: Dict[ClientKey, int] = {}
+        self._state = threading.Condition()
+
+    def _checkout(self, key: ClientKey) -> List[Any]:
+        with self._state:
+            while True:
+                entries = self._clients.setdefault(key, [])
+                entry = min(entries, key=lambda e: e[1], default=None)
+                if entry is not None and entry[1] == 0:
+                    break
+                if len(entries) + self._building.get(key, 0) < self.max_per_key:
+                    self._building[key] = self._building.get(key, 0) + 1
+                    entry = None
+                    break
+                if entry is not None:
+                    break
+                # Every allowed client is still being built
+                self._state.wait()
+            if entry is not None:
+                entry[1] += 1
+                return entry
+
+        # Build outside the lock; other callers keep using existing clients
+        try:
+            client = self._build(key)
+        finally:
+            with self._state:
+                self._building[key] -= 1
+                self._state.notify_all()
+        entry = [client, 1]
+        with self._state:
+            self._clients.setdefault(key, []).append(entry)
+        return entry
+
+    def _build(self, key: ClientKey) -> Any:
+        started = time.perf_counter()
+        client = self.factory(*key)
+        logger.info(f"Built LLM client for {key[0]} in {time.perf_counter() - started:.3f}s")
+        return client
+
+    def _checkin(self, entry: List[Any]) -> None:
+        with self._state:
+            entry[1] -= 1
+
+    @contextmanager
+    def client(self, model: str, project: Optional[str] = None, location: Optional[str] = None) -> Iterator[Any]:
+        """Borrow a client for one call."""
+        entry = self._checkout((model, project, location))
+        try:
+            yield entry[0]
+        finally:
+            self._checkin(entry)
+
+    def warm(
+        self,
+        model: str,
+        project: Optional[str] = None,
+        location: Optional[str] = None,
+        count: int = 1,
+        ping: bool = False,
+    ) -> float:
+        """Build up to `count` clients ahead of the first request (and with
+        `ping`, open their connections with a cheap model lookup). Returns
+        the seconds spent."""
+        key = (model, project, location)
+        started = time.perf_counter()
+        # Holding each one makes the next checkout build another
+        entries = []
+        try:
+            for _ in range(min(count, self.max_per_key)):
+                entries.append(self._checkout(key))
+                if ping:
+                    self._ping(entries[-1][0], model)
+        finally:
+            for entry in entries:
+                self._checkin(entry)
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _ping(client: Any, model: str) -> None:
+        # instructor keeps the provider SDK client as `.client`
+        models = getattr(getattr(client, "client", None), "models", None)
+        if models is None:
+            return
+        try:
+            models.get(model=model.split("/", 1)[-1])
+        except Exception as e:
+            logger.warning(f"Warm-up request for {model} failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._state:
+            entries = [entry for entries in self._clients.values() for entry in entries]
+            return {
+                "clients": len(entries),
+                "idle": sum(1 for entry in entries if entry[1] == 0),
+                "calls_in_progress": sum(entry[1] for entry in entries),
+            }
+
+    def clear(self) -> None:
+        """Forget every client, e.g. after the factory was swapped. Calls in
+        progress finish on the client they have."""
+        with self._state:
+            self._clients.clear()
+
+
+llm_clients = LLMClientPool(max_per_key=LLM_POOL_SIZE)
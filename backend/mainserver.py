@@ -4,88 +4,285 @@ import websockets
 import json
 import os
 import time
-import queue
+import threading
 import uuid
 from datetime import datetime
 import sys
-from audio_streams import WebSocketAudioStream
 import base64
 import struct
 import signal
+import argparse
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from transcriber import Transcriber
-from recommender import Recommender
-from topic_manager import TopicManager
+from session import Session, SessionRegistry, DEFAULT_SESSION_ID
+from config import (
+    SESSION_IDLE_TIMEOUT,
+    SESSION_REAP_INTERVAL,
+    METRICS_HOST,
+    METRICS_PORT,
+    WORKERS,
+    WORKER_LOAD_REPORT_INTERVAL,
+    CHECKPOINT_DIR,
+    CHECKPOINT_INTERVAL,
+    CHECKPOINT_COMPACT_EVERY,
+    CHECKPOINT_RETENTION,
+    FLOW_ACK_INTERVAL,
+    AUDIO_INPUT_SAMPLE_RATE,
+    AUDIO_INPUT_CHANNELS,
+    PROJECT_ID,
+    LOCATION,
+    CHUNKING_MODEL,
+    LLM_POOL_WARM,
+    LLM_POOL_PING,
+)
+from checkpoint import SessionCheckpointer
+from ingest import IngestQueueFull
+from frames import parse_audio_frame, FrameError, MAX_SESSION_ID_BYTES
+from normalizer import AudioFormat, AudioFormatError
+from broadcast import encode_message
+import chunking
+from llm_clients import llm_clients
+from response_cache import DISK_HIT, MEMORY_HIT, MISS, response_caches
+from metrics import (
+    metrics,
+    start_metrics_server,
+    escape_label,
+    STAGE_RECEIVE_DECODE,
+    STAGE_OUTBOUND_SEND,
+    COUNTER_BYTES_IN,
+    COUNTER_FRAMES,
+    COUNTER_PROMPT_TOKENS,
+)
 
 class WebSocketServer:
-    def __init__(self, host='0.0.0.0', port=3001):
+    def __init__(self, host='0.0.0.0', port=3001, worker_id=None, directory=None, recorder=None):
         self.host = host
         self.port = port
-        self.phone_socket = None
-        self.site_socket = None
-        
-        # Audio processing components
-        self.audio_chunks = []
-        self.strip_headers = True
-        self.raw_file_header_size = 44
-        self.audio_queue = queue.Queue()
-
-        self.audio_stream = WebSocketAudioStream(None)
-        self.audio_websocket = None
-        
-        # Service instances
-        self.topic_manager = TopicManager()
-        self.transcriber = Transcriber(self.topic_manager, on_working_buffer_update=lambda x: print(f"Working buffer: {x}"), on_dump=lambda x: print(f"Dumped text: {x}"), on_chunks_produced=self.on_chunk_callback)
-        self.recommender = Recommender()
+
+        # Optional cassette recorder capturing each session's audio and
+        # STT/LLM responses for offline replay (benchmarks/replay.py)
+        self.recorder = recorder
+
+        # Multi-process mode: which worker this is and where sessions live
+        self.worker_id = worker_id
+        self.directory = directory
+        self.direct_server = None
+        self._load_report_task = None
+
+        # One isolated Transcriber/TopicManager/Recommender pipeline per conversation
+        self.sessions = SessionRegistry(
+            self._create_session,
+            idle_timeout=SESSION_IDLE_TIMEOUT,
+            on_remove=self._on_session_removed,
+        )
+        self.checkpointer = SessionCheckpointer(CHECKPOINT_DIR, CHECKPOINT_COMPACT_EVERY) if CHECKPOINT_DIR else None
+        self._checkpoint_task = None
+        # session_id -> task restoring it / writing its final checkpoint
+        self._restores = {}
+        self._closing = {}
+        self._flow_task = None
+        self._warm_task = None
+        self.client_sessions = {}  # client_id -> session_id
         
         # Server state
         self.server = None
         self.active_connections = set()
         self.shutdown_event = asyncio.Event()
-
-    def on_chunk_callback(self, chunks):
-
-        topics = [self.topic_manager.get_topic_from_topic_id(topic_id) for topic_id in chunks.keys()]
-
-        recommendations = self.recommender.recommend(topics)
-
-
-
-        self.transcriber.previous_recommendations = recommendations
-
-
-        # now i would like to send this data over the site websocket
-        # Schedule the async function as a task in the current event loop
-        asyncio.create_task(self.send_message(self.site_socket, {
-                "type": "data",
-                "data": {
-                    "topics": [{
-                        "topic_key": topic_id,
-                        "topic_summary": topic.description,
-                        "content_stack": [{"blurb": chunk.blurb, "content": chunk.content} for chunk in topic.chunk_stack],
-                        "recommendations": recommendations[topic_id],
-                    } for (topic_id, topic) in topics]
-                }
-            }))
+        self.loop = None
+        self._publish_lock = threading.Lock()
+        self._reaper_task = None
+        self.metrics_server = None
+        metrics.add_collector(self.collect_session_metrics)
+
+    def _create_session(self, session_id):
+        session = Session(
+            session_id,
+            on_chunks_produced=self.on_chunk_callback,
+            snapshot_builder=self.build_snapshot_message,
+            on_speech_event=self.on_speech_event,
+            on_recommend=self.recommend_topics,
+        )
+        session.captions.bind(self.loop)
+        if self.recorder:
+            self.recorder.attach(session)
+        # Warm-restore a session that was live before a restart. This runs
+        # under the registry lock, so the file is read later, off the loop;
+        # clients of the session wait for it in register_client
+        if self._checkpoints(session_id):
+            self._restores[session_id] = self.loop.create_task(self._restore_session(session))
+        return session
+
+    async def _restore_session(self, session):
+        # A previous session with this id may still be writing its final checkpoint
+        closing = self._closing.get(session.session_id)
+        if closing is not None:
+            await asyncio.wait([closing])
+        try:
+            if await asyncio.to_thread(self.checkpointer.restore, session):
+                print(f"♻️ Restored session {session.session_id} from checkpoint")
+        except Exception as e:
+            print(f"Error restoring session {session.session_id}: {e}")
+
+    async def remove_session(self, session_id):
+        """Write a session's final checkpoint off the loop, then tear it down"""
+        session = self.sessions.pop(session_id)
+        if session is None:
+            return None
+        if self._checkpoints(session_id):
+            closing = asyncio.ensure_future(asyncio.to_thread(self._final_checkpoint, session))
+            self._closing[session_id] = closing
+            try:
+                await closing
+            finally:
+                if self._closing.get(session_id) is closing:
+                    del self._closing[session_id]
+        self.sessions.close_session(session)
+        return session
+
+    def _checkpoints(self, session_id):
+        """Whether a session is checkpointed. The shared default session is
+        not: it would be restored into whoever connects next"""
+        return self.checkpointer is not None and session_id != DEFAULT_SESSION_ID
+
+    def _final_checkpoint(self, session):
+        try:
+            self.checkpointer.checkpoint(session)
+        except Exception as e:
+            print(f"Error checkpointing session {session.session_id}: {e}")
+
+    def _on_session_removed(self, session):
+        """Release the session before it is torn down (its final checkpoint
+        is already written)"""
+        self._restores.pop(session.session_id, None)
+        if self.checkpointer:
+            self.checkpointer.forget(session.session_id)
+        if self.directory is not None:
+            self.directory.release(session.session_id, self.worker_id)
+        if self.recorder:
+            self.recorder.detach(session.session_id)
+
+    def get_client_session(self, client_id):
+        session_id = self.client_sessions.get(client_id)
+        if session_id is None:
+            return None
+        return self.sessions.get(session_id)
+
+    def on_chunk_callback(self, session, chunks):
+        # New chunks go out right away; recommendations follow from a
+        # background run so they never hold up the next chunks
+        self.publish_topic_updates(session)
+        session.recommendations.request(chunks.keys())
+
+    def recommend_topics(self, session, topic_ids):
+        topics = [session.topic_manager.get_topic_from_topic_id(topic_id) for topic_id in topic_ids]
+
+        recommendations = session.recommender.recommend(topics)
+        metrics.inc(session.session_id, COUNTER_PROMPT_TOKENS, session.recommender.last_prompt_tokens)
+
+
+        session.transcriber.previous_recommendations = recommendations
+
+        if isinstance(recommendations, dict):
+            for topic_id in topic_ids:
+                session.topic_manager.set_recommendations(topic_id, recommendations.get(topic_id, []))
+        else:
+            print(f"Recommender returned unparsed output for session {session.session_id}, keeping previous recommendations")
+
+        self.publish_topic_updates(session)
+
+    def publish_topic_updates(self, session):
+        # Only what changed since the last publish goes out; a full snapshot
+        # is sent once, when the site client subscribes. Chunking and
+        # recommendation threads both publish, so drain and hand off under
+        # one lock to keep seqs in order on the wire.
+        with self._publish_lock:
+            updates = session.topic_manager.drain_updates()
+            if not updates:
+                return
+
+            # Encode once here on the worker thread; every subscriber's
+            # writer shares the same bytes
+            payload = encode_message({
+                    "type": "updates",
+                    "updates": [{
+                        "seq": update.seq,
+                        "type": update.kind,
+                        "topic_key": update.topic_id,
+                        **update.data,
+                    } for update in updates]
+                })
+            self.loop.call_soon_threadsafe(session.broadcaster.publish, payload)
+
+    def on_speech_event(self, session, event):
+        """Tell site clients when the phone's speaker starts or stops talking"""
+        payload = encode_message({"type": "speech", "event": event})
+        self.loop.call_soon_threadsafe(session.broadcaster.publish, payload)
+
+    def build_snapshot_message(self, session):
+        """Full topic state for a newly subscribed site client"""
+        version, topics = session.topic_manager.snapshot()
+        return {
+            "type": "snapshot",
+            "seq": version,
+            "caption": session.captions.snapshot(),
+            "data": {
+                "topics": [{
+                    "topic_key": topic_id,
+                    "topic_summary": topic.description,
+                    "content_stack": [{"blurb": chunk.blurb, "content": chunk.content} for chunk in topic.chunk_stack],
+                    "recommendations": topic.recommendations,
+                } for topic_id, topic in topics.items()]
+            }
+        }
 
 
     async def start_server(self):
         """Start the WebSocket server"""
         print(f'WebSocket server running on ws://{self.host}:{self.port}')
         print(f'Server is binding to all interfaces (0.0.0.0)')
+        self.loop = asyncio.get_running_loop()
         
-        # Start the WebSocket server
+        # Start the WebSocket server; in worker mode every worker shares the
+        # public port and also listens on its own port for redirected clients
         self.server = await websockets.serve(
             self.handle_client, 
             self.host, 
             self.port,
             ping_interval=30,
             ping_timeout=50,
-            close_timeout=50
+            close_timeout=50,
+            reuse_port=self.directory is not None
         )
+        if self.directory is not None:
+            direct_port = self.directory.worker_ports[self.worker_id]
+            self.direct_server = await websockets.serve(
+                self.handle_client,
+                self.host,
+                direct_port,
+                ping_interval=30,
+                ping_timeout=50,
+                close_timeout=50
+            )
+            self._load_report_task = asyncio.create_task(self.report_load())
+            print(f'Worker {self.worker_id} (pid {os.getpid()}) also accepting redirected clients on port {direct_port}')
+        
+        self._reaper_task = asyncio.create_task(self.reap_idle_sessions())
+        self._flow_task = asyncio.create_task(self.flush_flow_acks())
+        if LLM_POOL_WARM > 0:
+            self._warm_task = asyncio.create_task(self.warm_llm_clients())
+
+        if self.checkpointer:
+            pruned = self.checkpointer.prune(CHECKPOINT_RETENTION)
+            if pruned:
+                print(f"🗑️ Pruned {pruned} expired session checkpoint(s)")
+            self._checkpoint_task = asyncio.create_task(self.checkpoint_sessions())
+
+        metrics_port = METRICS_PORT + (self.worker_id or 0) if METRICS_PORT > 0 else 0
+        self.metrics_server = await start_metrics_server(METRICS_HOST, metrics_port)
+        if self.metrics_server:
+            print(f'Metrics available at http://{METRICS_HOST}:{metrics_port}/metrics')
         
         print('Server started successfully. Waiting for connections...')
         print('Press Ctrl+C to gracefully shutdown the server')
@@ -99,15 +296,131 @@ class WebSocketServer:
             await self.close_websocket_server()
 
 
-    def queue_audio_data(self, audio_data):
-        """Queue audio data for playback"""
-        if not self.audio_queue.full():
-            self.audio_queue.put(audio_data)
-
-        print(f"Total audio queue size: {self.audio_queue.qsize()}")
-        
-        # Process audio directly with transcriber
-        self.transcriber._transcription_loop(self.audio_queue.get())
+    async def warm_llm_clients(self):
+        """Build the shared chunking clients before the first dump needs one"""
+        try:
+            seconds = await asyncio.to_thread(
+                llm_clients.warm, CHUNKING_MODEL, PROJECT_ID, LOCATION, LLM_POOL_WARM, LLM_POOL_PING
+            )
+            print(f"🔥 Warmed {LLM_POOL_WARM} chunking LLM client(s) in {seconds:.2f}s")
+        except Exception as e:
+            print(f"Error warming LLM clients: {e}")
+
+    def collect_session_metrics(self):
+        """Gauges describing live sessions, appended to the metrics endpoint"""
+        sessions = self.sessions.all_sessions()
+        pool = llm_clients.stats()
+        lines = [
+            "# TYPE echopilot_active_sessions gauge",
+            f"echopilot_active_sessions {len(sessions)}",
+            "# TYPE echopilot_active_connections gauge",
+            f"echopilot_active_connections {len(self.active_connections)}",
+            "# TYPE echopilot_llm_clients gauge",
+            f'echopilot_llm_clients{{state="idle"}} {pool["idle"]}',
+            f'echopilot_llm_clients{{state="total"}} {pool["clients"]}',
+            "# TYPE echopilot_llm_calls_in_progress gauge",
+            f"echopilot_llm_calls_in_progress {pool['calls_in_progress']}",
+            "# TYPE echopilot_response_cache_requests_total counter",
+        ]
+        batcher = chunking.chunk_batcher.stats()
+        cache_stats = [(cache.name, cache.stats()) for cache in response_caches]
+        for name, stats in cache_stats:
+            for result in (MEMORY_HIT, DISK_HIT, MISS):
+                lines.append(f'echopilot_response_cache_requests_total{{cache="{name}",result="{result}"}} {stats[result]}')
+        lines.append("# TYPE echopilot_response_cache_entries gauge")
+        for name, stats in cache_stats:
+            lines.append(f'echopilot_response_cache_entries{{cache="{name}",tier="memory"}} {stats["memory_entries"]}')
+            lines.append(f'echopilot_response_cache_entries{{cache="{name}",tier="disk"}} {stats["disk_entries"]}')
+        lines.append("# TYPE echopilot_chunking_batcher_requests_total counter")
+        lines.append(f"echopilot_chunking_batcher_requests_total {batcher['requests']}")
+        lines.append("# TYPE echopilot_chunking_batcher_calls_total counter")
+        lines.append(f"echopilot_chunking_batcher_calls_total {batcher['calls']}")
+        lines.append("# TYPE echopilot_chunking_batcher_batched_requests_total counter")
+        lines.append(f"echopilot_chunking_batcher_batched_requests_total {batcher['batched_requests']}")
+        lines.append("# TYPE echopilot_chunking_batcher_queued gauge")
+        lines.append(f"echopilot_chunking_batcher_queued {batcher['queued']}")
+        lines.append("# TYPE echopilot_session_ingest_queue_depth gauge")
+        for session in sessions:
+            lines.append(f'echopilot_session_ingest_queue_depth{{session="{escape_label(session.session_id)}"}} {session.ingest.qsize()}')
+        lines.append("# TYPE echopilot_session_ingest_dropped_total counter")
+        for session in sessions:
+            lines.append(f'echopilot_session_ingest_dropped_total{{session="{escape_label(session.session_id)}"}} {session.ingest.dropped + session.ingest.rejected}')
+        lines.append("# TYPE echopilot_session_site_subscribers gauge")
+        for session in sessions:
+            lines.append(f'echopilot_session_site_subscribers{{session="{escape_label(session.session_id)}"}} {len(session.broadcaster)}')
+        lines.append("# TYPE echopilot_session_chunking_in_flight gauge")
+        for session in sessions:
+            lines.append(f'echopilot_session_chunking_in_flight{{session="{escape_label(session.session_id)}"}} {session.transcriber.chunking.in_flight()}')
+        lines.append("# TYPE echopilot_session_chunking_latency_estimate_seconds gauge")
+        for session in sessions:
+            lines.append(f'echopilot_session_chunking_latency_estimate_seconds{{session="{escape_label(session.session_id)}"}} {session.transcriber.scheduler.chunking_latency:.3f}')
+        lines.append("# TYPE echopilot_session_vad_suppressed_ratio gauge")
+        for session in sessions:
+            vad = session.transcriber.vad
+            if vad is not None:
+                lines.append(f'echopilot_session_vad_suppressed_ratio{{session="{escape_label(session.session_id)}"}} {vad.suppressed_fraction:.4f}')
+        return lines
+
+    async def reap_idle_sessions(self):
+        """Periodically reclaim sessions that have no connected clients"""
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(SESSION_REAP_INTERVAL)
+            reaped = self.sessions.idle_ids()
+            for session_id in reaped:
+                await self.remove_session(session_id)
+            if reaped:
+                print(f"♻️ Reclaimed {len(reaped)} idle session(s): {', '.join(reaped)}")
+
+    async def flush_flow_acks(self):
+        """Send time-based cumulative acks and newly opened credit to phones"""
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(FLOW_ACK_INTERVAL)
+            for session in self.sessions.all_sessions():
+                if session.phone_socket is None:
+                    continue
+                message = session.flow.poll(session.ingest.free_slots())
+                if message:
+                    await self.send_message(session.phone_socket, message)
+
+    async def checkpoint_sessions(self):
+        """Periodically append each session's changes to its checkpoint file"""
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(CHECKPOINT_INTERVAL)
+            await self.loop.run_in_executor(None, self._checkpoint_all)
+
+    def _checkpoint_all(self):
+        for session in self.sessions.all_sessions():
+            if not self._checkpoints(session.session_id):
+                continue
+            try:
+                self.checkpointer.checkpoint(session)
+            except Exception as e:
+                print(f"Error checkpointing session {session.session_id}: {e}")
+
+    async def report_load(self):
+        """Publish this worker's load so new sessions go to the least-loaded worker"""
+        while not self.shutdown_event.is_set():
+            self.directory.report_load(self.worker_id, len(self.sessions), len(self.active_connections))
+            await asyncio.sleep(WORKER_LOAD_REPORT_INTERVAL)
+
+    def owns_session(self, session_id):
+        if self.directory is None:
+            return True
+        return self.directory.claim(session_id) == self.worker_id
+
+    async def redirect_client(self, websocket, session_id):
+        """Point a client at the worker that owns its session"""
+        owner = self.directory.claim(session_id)
+        port = self.directory.worker_ports[owner]
+        print(f"Redirecting client for session {session_id} to worker {owner} on port {port}")
+        await self.send_message(websocket, {
+            'type': 'redirect',
+            'session_id': session_id,
+            'port': port,
+            'message': f'Session {session_id} is served by another worker',
+            'timestamp': int(time.time() * 1000)
+        })
+        await websocket.close(code=1000, reason="Redirect")
 
     async def handle_client(self, websocket, path=None):
         client_address = websocket.remote_address
@@ -115,6 +428,7 @@ class WebSocketServer:
 
         
         print(f"New connection attempt from {client_address}")
+        self.active_connections.add(websocket)
 
         try:
             # Send welcome message
@@ -129,6 +443,10 @@ class WebSocketServer:
             try:
                 async for message in websocket:
                     try:
+                        # Binary frames are raw audio; JSON remains the fallback protocol
+                        if isinstance(message, bytes):
+                            await self.handle_binary_message(websocket, client_id, message)
+                            continue
 
                         data = json.loads(message)
                         await self.handle_message(websocket, client_id, data)
@@ -150,9 +468,9 @@ class WebSocketServer:
         
         except websockets.exceptions.ConnectionClosed:
             print(f'Client {client_id} disconnected')
-            self.cleanup_client(client_id, websocket)
         except Exception as e:
             print(f'WebSocket error: {e}')
+        finally:
             self.cleanup_client(client_id, websocket)
 
     def cleanup_client(self, client_id, websocket=None):
@@ -162,13 +480,14 @@ class WebSocketServer:
             self.active_connections.remove(websocket)
             print(f"Removed client {client_id} from active connections")
         
-        # Clear socket references
-        if self.phone_socket and self.phone_socket == client_id:
-            self.phone_socket = None
-            print("Phone client disconnected")
-        elif self.site_socket and self.site_socket == client_id:
-            self.site_socket = None
-            print("Site client disconnected")
+        # Unpair the socket from its session; the session itself stays alive
+        # until the reaper finds it idle so a reconnecting client can resume it
+        session_id = self.client_sessions.pop(client_id, None)
+        session = self.sessions.get(session_id) if session_id else None
+        if session and websocket is not None:
+            role = session.detach(websocket)
+            if role:
+                print(f"{role.capitalize()} client disconnected from session {session_id}")
         
         print(f"Active connections remaining: {len(self.active_connections)}")
 
@@ -183,6 +502,8 @@ class WebSocketServer:
 
         elif message_type == 'audio_chunk':
             await self.handle_audio_chunk(websocket, client_id, data)
+        elif message_type == 'get_snapshot':
+            await self.handle_get_snapshot(websocket, client_id, data)
         elif message_type == 'get_recommendations':
             await self.handle_get_recommendations(websocket, client_id, data)
         else:
@@ -191,36 +512,98 @@ class WebSocketServer:
     async def handle_register_client(self, websocket, client_id, data):
         """Handle client registration"""
         client_type = data.get('client_type', 'unknown')
-        print(f"Registering client {client_id} with type {client_type}")
-        
-        # Check if we can accept this connection
+        session_id = str(data.get('session_id') or DEFAULT_SESSION_ID)
+        # Binary audio frames carry the session id in a fixed-size header field
+        if len(session_id.encode('utf-8')) > MAX_SESSION_ID_BYTES:
+            await self.send_error(websocket, f'Session id longer than {MAX_SESSION_ID_BYTES} bytes (UTF-8)')
+            return
+
+        # Phones sending headerless audio in another format say so on registering
+        audio_format = None
+        if 'sample_rate' in data or 'channels' in data:
+            try:
+                audio_format = AudioFormat(
+                    sample_rate=int(data.get('sample_rate', AUDIO_INPUT_SAMPLE_RATE)),
+                    channels=int(data.get('channels', AUDIO_INPUT_CHANNELS)),
+                )
+            except (TypeError, ValueError) as e:
+                await self.send_error(websocket, f'Invalid audio format: {str(e)}')
+                return
+
+        await self.attach_client(websocket, client_id, session_id, client_type, audio_format)
+
+    async def attach_client(self, websocket, client_id, session_id, client_type, audio_format=None):
+        """Pair a socket with a session, creating the session if needed.
+
+        Returns None when the session lives on another worker and the client
+        has been redirected there."""
+        if not self.owns_session(session_id):
+            await self.redirect_client(websocket, session_id)
+            return None
+
+        print(f"Registering client {client_id} with type {client_type} in session {session_id}")
+
+        # A socket re-registering into another session leaves its old one first
+        previous = self.get_client_session(client_id)
+        if previous and previous.session_id != session_id:
+            previous.detach(websocket)
+
+        session = self.sessions.get_or_create(session_id)
+        restoring = self._restores.get(session_id)
+        if restoring is not None:
+            await restoring
+        self.client_sessions[client_id] = session_id
 
         if client_type == 'site':
-            self.site_socket = websocket
-            print(f"Site client connected: {self.site_socket}")
             await self.send_message(websocket, {
                 'type': 'connected',
                 'client_type': 'site',
+                'session_id': session_id,
                 'message': 'Site client connected successfully'
             })
+            # The subscriber's writer sends the snapshot first, then deltas in order
+            session.broadcaster.subscribe(websocket)
+            print(f"Site client connected to session {session_id} ({len(session.broadcaster)} subscriber(s))")
 
             
         else:
+            if session.phone_socket is not None and session.phone_socket is not websocket:
+                print(f"Replacing phone client in session {session_id}")
+            session.phone_socket = websocket
+            session.flow.reset()
+            if audio_format is not None:
+                try:
+                    session.normalizer.set_input_format(audio_format)
+                except AudioFormatError as e:
+                    await self.send_error(websocket, str(e))
             await self.send_message(websocket, {
                 'type': 'connected',
                 'client_type': 'phone',
+                'session_id': session_id,
                 'message': 'Phone client connected successfully'
             })
+            # Initial credit grant; the phone sends nothing beyond it until acked
+            await self.send_message(websocket, session.flow.make_ack(session.ingest.free_slots()))
 
-            self.audio_websocket = websocket
+        return session
 
 
 
 
+    async def handle_get_snapshot(self, websocket, client_id, data):
+        """Resend full topic state, e.g. after a site client detects a sequence gap"""
+        session = self.get_client_session(client_id)
+        if session is None or not session.is_site(websocket):
+            await self.send_error(websocket, 'Only site client can request snapshots')
+            return
+
+        session.broadcaster.resync(websocket)
+
     async def handle_get_recommendations(self, websocket, client_id, data):
         """Handle recommendation requests from site client"""
         # Only site client should request recommendations
-        if client_id != self.site_socket:
+        session = self.get_client_session(client_id)
+        if session is None or not session.is_site(websocket):
             await self.send_error(websocket, 'Only site client can request recommendations')
             return
         
@@ -242,24 +625,73 @@ class WebSocketServer:
 
     async def handle_audio_chunk(self, websocket, client_id, data):
         """Handle audio chunk messages from phone client"""
+        session = self.get_client_session(client_id)
+        if session is None:
+            await self.send_error(websocket, 'Client must register before sending audio')
+            return
 
+        with metrics.time(STAGE_RECEIVE_DECODE):
+            d = base64.b64decode(data["data"])
 
-        d = base64.b64decode(data["data"])
+        await self.ingest_audio(websocket, session, d)
 
+    async def handle_binary_message(self, websocket, client_id, message):
+        """Handle binary audio frames from phone client"""
+        try:
+            with metrics.time(STAGE_RECEIVE_DECODE):
+                frame = parse_audio_frame(message)
+        except FrameError as e:
+            await self.send_error(websocket, f'Invalid audio frame: {str(e)}')
+            return
 
+        session = self.get_client_session(client_id)
+        if session is None:
+            if not frame.session_id:
+                await self.send_error(websocket, 'Client must register before sending audio')
+                return
+            # Phones streaming binary frames may identify their session in the header alone
+            session = await self.attach_client(websocket, client_id, frame.session_id, 'phone')
+            if session is None:
+                return
+        elif frame.session_id and frame.session_id != session.session_id:
+            await self.send_error(websocket, f'Frame session {frame.session_id} does not match registered session {session.session_id}')
+            return
 
-        self.transcriber._transcription_loop(d)
+        lost = session.track_sequence(frame.sequence)
+        if lost:
+            print(f"⚠️ Session {session.session_id} missed {lost} audio frame(s) before #{frame.sequence}")
 
-        await self.send_message(websocket, {
-            'type': 'audio_chunk_received',
-            'message': 'Audio chunk received successfully',
-            'timestamp': int(time.time() * 1000)
-        })
+        await self.ingest_audio(websocket, session, frame.payload, sequence=frame.sequence)
+
+    async def ingest_audio(self, websocket, session, audio, sequence=None):
+        """Queue decoded audio for the session's transcription worker.
+
+        Frames are acked cumulatively through the session's FlowController
+        rather than one reply per frame."""
+        session.touch()
+        metrics.inc(session.session_id, COUNTER_BYTES_IN, memoryview(audio).nbytes)
+        metrics.inc(session.session_id, COUNTER_FRAMES)
+
+        try:
+            await session.ingest.put(audio)
+        except IngestQueueFull as e:
+            await self.send_error(websocket, str(e))
+            return
+
+        # JSON frames carry no sequence number, so count them instead
+        if sequence is None:
+            sequence = session.frames_received
+        session.frames_received += 1
+
+        message = session.flow.on_frame(sequence, session.ingest.free_slots())
+        if message:
+            await self.send_message(websocket, message)
 
     async def send_message(self, websocket, message):
         """Send a message to the WebSocket client"""
         try:
-            await websocket.send(json.dumps(message))
+            with metrics.time(STAGE_OUTBOUND_SEND):
+                await websocket.send(json.dumps(message))
         except Exception as e:
             print(f"Error sending message: {e}")
 
@@ -277,6 +709,26 @@ class WebSocketServer:
         
         # Set shutdown event
         self.shutdown_event.set()
+
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+
+        if self._load_report_task:
+            self._load_report_task.cancel()
+            self._load_report_task = None
+
+        if self._checkpoint_task:
+            self._checkpoint_task.cancel()
+            self._checkpoint_task = None
+
+        if self._flow_task:
+            self._flow_task.cancel()
+            self._flow_task = None
+
+        if self._warm_task:
+            self._warm_task.cancel()
+            self._warm_task = None
         
         # Notify all connected clients about shutdown
         if self.active_connections:
@@ -307,22 +759,25 @@ class WebSocketServer:
             
             self.active_connections.clear()
         
-        # Clear audio queue
-        print("🧹 Clearing audio queue...")
-        while not self.audio_queue.empty():
-            try:
-                self.audio_queue.get_nowait()
-            except queue.Empty:
-                break
-        
-        # Clear audio chunks
-        print(f"🗑️ Clearing {len(self.audio_chunks)} audio chunks...")
-        self.audio_chunks.clear()
-        
-        # Reset socket references
-        self.phone_socket = None
-        self.site_socket = None
+        # Tear down every session pipeline
+        # (each one is checkpointed on the way out)
+        print(f"🧹 Closing {len(self.sessions)} session(s)...")
+        for session in self.sessions.all_sessions():
+            await self.remove_session(session.session_id)
+        self.client_sessions.clear()
+        if self.recorder:
+            self.recorder.close()
         
+        if self.metrics_server:
+            self.metrics_server.close()
+            await self.metrics_server.wait_closed()
+            self.metrics_server = None
+
+        if self.direct_server:
+            self.direct_server.close()
+            await self.direct_server.wait_closed()
+            self.direct_server = None
+
         # Close the server
         if self.server:
             print("🛑 Stopping WebSocket server...")
@@ -336,9 +791,29 @@ class WebSocketServer:
 
 def main():
     """Main function to start the WebSocket server"""
-    port = int(os.environ.get('PORT', 3001))
-    
-    server = WebSocketServer(host='0.0.0.0', port=port)
+    parser = argparse.ArgumentParser(description='Real-time recommendations WebSocket server')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 3001)))
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='number of worker processes; sessions are pinned to one worker each')
+    parser.add_argument('--record', metavar='DIR',
+                        help='record every session to a replayable cassette in DIR (single process only)')
+    args = parser.parse_args()
+    port = args.port
+
+    if args.workers > 1:
+        if args.record:
+            parser.error('--record is not supported with --workers')
+        from workers import run_workers
+        run_workers('0.0.0.0', port, args.workers)
+        return
+
+    recorder = None
+    if args.record:
+        from benchmarks.cassette import CassetteRecorder
+        recorder = CassetteRecorder(args.record)
+        print(f"⏺️ Recording sessions to {args.record}")
+
+    server = WebSocketServer(host='0.0.0.0', port=port, recorder=recorder)
     
     # Set up signal handlers for graceful shutdown
     def shutdown_handler(signum, frame):
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages timed end to end, from phone frame to dashboard update
+STAGE_RECEIVE_DECODE = "ws_receive_decode"
+STAGE_STT_ROUNDTRIP = "stt_roundtrip"
+STAGE_INTERIM_TO_FINAL = "interim_to_final"
+STAGE_LLM_CHUNKING = "llm_chunking"
+# Streamed chunking: from the request to the first parsed assignment
+STAGE_LLM_CHUNKING_FIRST = "llm_chunking_first_chunk"
+# Batched or capped chunking: from submitting a request to its call starting
+STAGE_CHUNKING_QUEUE = "chunking_queue"
+STAGE_RECOMMEND = "recommend"
+STAGE_OUTBOUND_SEND = "outbound_send"
+STAGE_CHECKPOINT = "checkpoint"
+STAGE_SESSION_RESTORE = "session_restore"
+
+# Per-session counters
+COUNTER_BYTES_IN = "bytes_in"
+COUNTER_FRAMES = "frames"
+COUNTER_DUMPS = "dumps"
+COUNTER_PROMPT_TOKENS = "prompt_tokens"
+COUNTER_PROMPT_TOKENS_SAVED = "prompt_tokens_saved"
+# Dumps matched to a topic locally, those also checked against the LLM, and
+# how many of those the LLM agreed with
+COUNTER_TOPIC_FAST_PATH = "topic_fast_path"
+COUNTER_TOPIC_FAST_PATH_AUDITS = "topic_fast_path_audits"
+COUNTER_TOPIC_FAST_PATH_AGREED = "topic_fast_path_agreed"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyWindow:
+    """Sliding window of recent samples for one stage, plus lifetime sum and
+    count, exported as a Prometheus summary."""
+
+    def __init__(self, window_size: int = 2048):
+        self.samples: Deque[float] = deque(maxlen=window_size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, qs=QUANTILES) -> Dict[float, float]:
+        if not self.samples:
+            return {q: 0.0 for q in qs}
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(round(q * last)))] for q in qs}
+
+
+class MetricsRegistry:
+    def __init__(self, window_size: int = 2048):
+        self.window_size = window_size
+        self._stages: Dict[str, LatencyWindow] = {}
+        self._counters: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            window = self._stages.get(stage)
+            if window is None:
+                window = self._stages[stage] = LatencyWindow(self.window_size)
+            window.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, session_id: str, counter: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[counter][session_id] += amount
+
+    def forget_session(self, session_id: str) -> None:
+        with self._lock:
+            for values in self._counters.values():
+                values.pop(session_id, None)
+
+    def add_collector(self, collector: Callable[[], List[str]]) -> None:
+        """Register a callback returning extra exposition lines (e.g. gauges)."""
+        self._collectors.append(collector)
+
+    def quantiles(self, stage: str) -> Dict[float, float]:
+        with self._lock:
+            window = self._stages.get(stage)
+            return window.quantiles() if window else {q: 0.0 for q in QUANTILES}
+
+    def render(self) -> str:
+        """Render everything in the Prometheus text exposition format."""
+        lines = [
+            "# HELP echopilot_stage_latency_seconds Latency of each pipeline stage",
+            "# TYPE echopilot_stage_latency_seconds summary",
+        ]
+        with self._lock:
+            for stage, window in sorted(self._stages.items()):
+                for q, value in window.quantiles().items():
+                    lines.append(
+                        f'echopilot_stage_latency_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}'
+                    )
+                lines.append(f'echopilot_stage_latency_seconds_sum{{stage="{stage}"}} {window.total:.6f}')
+                lines.append(f'echopilot_stage_latency_seconds_count{{stage="{stage}"}} {window.count}')
+
+            for counter, values in sorted(self._counters.items()):
+                name = f"echopilot_session_{counter}_total"
+                lines.append(f"# TYPE {name} counter")
+                for session_id, value in sorted(values.items()):
+                    lines.append(f'{name}{{session="{escape_label(session_id)}"}} {value:g}')
+
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}", exc_info=True)
+
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        # Drain the request headers
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+            status = "200 OK"
+            body = metrics.render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status = "404 Not Found"
+            body = b"not found\n"
+            content_type = "text/plain"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+            + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.warning(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int) -> Optional[asyncio.AbstractServer]:
+    """Serve `metrics.render()` at http://host:port/metrics on the running loop."""
+    if port <= 0:
+        return None
+    return await asyncio.start_server(_handle_http, host, port)
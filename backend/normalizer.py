@@ -0,0 +1,209 @@
+import logging
+import struct
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Canonical WAV header length, used when a RIFF header cannot be walked
+RAW_FILE_HEADER_SIZE = 44
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioFormatError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    sample_rate: int = 16000
+    channels: int = 1
+    # 16-bit signed or 32-bit float samples, little-endian
+    sample_width: int = 2
+    is_float: bool = False
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.sample_width * self.channels
+
+
+def parse_wav_header(data: bytes) -> Tuple[Optional[AudioFormat], int]:
+    """Return the format declared by a RIFF/WAVE header and the offset of the
+    sample data, or (None, 0) if `data` does not start with one."""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None, 0
+
+    audio_format = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        (chunk_size,) = struct.unpack_from("<I", data, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt " and body + 16 <= len(data):
+            tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if tag == WAVE_FORMAT_EXTENSIBLE and body + 26 <= len(data):
+                (tag,) = struct.unpack_from("<H", data, body + 24)
+            if tag == WAVE_FORMAT_PCM and bits == 16:
+                audio_format = AudioFormat(sample_rate, channels)
+            elif tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+                audio_format = AudioFormat(sample_rate, channels, sample_width=4, is_float=True)
+            else:
+                raise AudioFormatError(f"Unsupported WAV encoding (format {tag}, {bits}-bit)")
+        elif chunk_id == b"data":
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF; the data
+            # always runs to the end of what we were sent
+            return audio_format, body
+        # RIFF chunks are word aligned
+        offset = body + chunk_size + (chunk_size & 1)
+
+    logger.warning("RIFF header without a data chunk, stripping the canonical 44 bytes")
+    return audio_format, min(RAW_FILE_HEADER_SIZE, len(data))
+
+
+class _Resampler:
+    """Streaming linear-interpolation resampler with a box low-pass filter
+    ahead of it when downsampling. Filter history and interpolation phase
+    carry across chunks, so chunk boundaries do not click."""
+
+    def __init__(self, in_rate: int, out_rate: int):
+        self.step = in_rate / out_rate
+        width = int(round(self.step)) if self.step > 1 else 1
+        self._kernel = np.full(width, 1.0 / width, dtype=np.float32) if width > 1 else None
+        self._history = np.zeros(width - 1, dtype=np.float32)
+        self._last: Optional[float] = None
+        self._phase = 0.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self._kernel is not None:
+            padded = np.concatenate((self._history, samples))
+            self._history = padded[len(padded) - len(self._history):]
+            samples = np.convolve(padded, self._kernel, mode="valid")
+
+        if self._last is None:
+            if not len(samples):
+                return samples
+            self._last = float(samples[0])
+        x = np.concatenate(([self._last], samples))
+        self._last = float(x[-1])
+
+        # Output positions on the chunk's sample grid, where index 0 is the
+        # previous chunk's last sample
+        n_out = int(np.floor((len(x) - 1 - self._phase) / self.step)) + 1 if len(x) > 1 else 0
+        if n_out <= 0:
+            self._phase -= len(x) - 1
+            return np.empty(0, dtype=np.float32)
+        positions = self._phase + np.arange(n_out) * self.step
+        self._phase = positions[-1] + self.step - (len(x) - 1)
+        return np.interp(positions, np.arange(len(x)), x).astype(np.float32)
+
+
+class AudioNormalizer:
+    """Turns whatever a phone sends into fixed-size LINEAR16 mono frames at
+    the recognizer's sample rate.
+
+    WAV headers are stripped (and their format adopted), other formats are
+    downmixed and resampled, and the result is coalesced into `frame_ms`
+    frames in a preallocated buffer. A partial frame waits for the next
+    chunk, or for `flush()`; at most one frame of audio is ever held back."""
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 100, input_format: Optional[AudioFormat] = None):
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self._buffer = bytearray(self.frame_bytes)
+        self._filled = 0
+        self._lock = threading.Lock()
+        self._set_format(input_format or AudioFormat(sample_rate))
+
+    def _set_format(self, input_format: AudioFormat) -> None:
+        if input_format.channels < 1 or input_format.sample_rate < 1:
+            raise AudioFormatError(f"Invalid audio format {input_format}")
+        self.input_format = input_format
+        # Bytes of an incomplete sample frame left over from the last chunk
+        self._carry = b""
+        self._resampler = (
+            _Resampler(input_format.sample_rate, self.sample_rate)
+            if input_format.sample_rate != self.sample_rate
+            else None
+        )
+
+    def set_input_format(self, input_format: AudioFormat) -> None:
+        with self._lock:
+            if input_format != self.input_format:
+                logger.info(f"Audio input format: {input_format}")
+                self._set_format(input_format)
+
+    def _is_passthrough(self) -> bool:
+        fmt = self.input_format
+        return fmt.channels == 1 and not fmt.is_float and self._resampler is None
+
+    def _convert(self, data: bytes) -> bytes:
+        fmt = self.input_format
+        dtype = "<f4" if fmt.is_float else "<i2"
+        samples = np.frombuffer(data, dtype=dtype)
+        if fmt.channels > 1:
+            samples = samples.reshape(-1, fmt.channels).mean(axis=1, dtype=np.float32)
+        else:
+            samples = samples.astype(np.float32)
+        if fmt.is_float:
+            samples = samples * 32767.0
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        return np.clip(np.rint(samples), -32768, 32767).astype("<i2").tobytes()
+
+    def _coalesce(self, pcm) -> List:
+        frames = []
+        view = memoryview(pcm)
+        # Whole frames go straight through, uncopied, when nothing is buffered
+        while self._filled == 0 and len(view) >= self.frame_bytes:
+            frames.append(view[:self.frame_bytes])
+            view = view[self.frame_bytes:]
+        while len(view):
+            take = min(self.frame_bytes - self._filled, len(view))
+            self._buffer[self._filled:self._filled + take] = view[:take]
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.frame_bytes:
+                frames.append(bytes(self._buffer))
+                self._filled = 0
+        return frames
+
+    def process(self, chunk) -> List:
+        """Normalize one incoming chunk, returning the complete frames it
+        yields. Frames are bytes or memoryviews into `chunk`, which must not
+        change afterwards; the transcriber makes the one copy."""
+        data = memoryview(chunk).cast("B")
+        with self._lock:
+            header_format, offset = parse_wav_header(data)
+            if offset:
+                if header_format is not None and header_format != self.input_format:
+                    logger.info(f"Audio input format from WAV header: {header_format}")
+                    self._set_format(header_format)
+                data = data[offset:]
+
+            if self._carry:
+                data = memoryview(self._carry + data)
+            usable = len(data) - len(data) % self.input_format.frame_bytes
+            self._carry = bytes(data[usable:])
+            data = data[:usable]
+            if not data:
+                return []
+
+            pcm = data if self._is_passthrough() else self._convert(data)
+            return self._coalesce(pcm)
+
+    def flush(self) -> List[bytes]:
+        """The partial frame held back, if any, as a short final frame; for
+        when no more audio is coming soon (the phone went quiet, or the
+        session stops)."""
+        with self._lock:
+            if not self._filled:
+                return []
+            frame = bytes(self._buffer[:self._filled])
+            self._filled = 0
+            return [frame]
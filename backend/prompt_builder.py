@@ -0,0 +1,327 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, List, Sequence, Tuple
+
+from topic_index import tokenize
+from topic_manager import TopicDigest
+
+# Score bonus for the most recently changed topic, halving for each older one
+RECENCY_WEIGHT = 0.5
+# Shares of the context budget (what is left after instructions and
+# transcript) for topics and recommendations; examples get the rest
+TOPIC_SHARE = 0.5
+RECOMMENDATION_SHARE = 0.15
+
+PROMPT_TEMPLATE = """
+    You are a helpful assistant that identifies summary points of chunks from a transcript
+    in addition to identifying topics that the chunk might belong to as well as previous recommendations for how to continue the topic.
+
+    Here are some examples of topics and the chunk blurbs that might belong to those topics:
+    {examples}
+
+    Here is the transcript to chunk:
+    {transcript}
+
+    Here are the existing topics:
+    {existing_topics}
+
+    Here are the previous recommendations made by the assistant for each topic:
+    {previous_recommendations}
+
+
+    If there are no existing topics that match the chunk, return None for the existing_topic_id parameter
+    and create a new topic in the new_topic_id parameter.
+
+    Note that a chunk has to be ENTIRELY unrelated to the topic in order to justify the creation of
+    a new topic. Therefore, in general chunks in a real conversation will most likely belong to the same topic unless you hear TRANSITION WORDS like "now i want to talk about", or "let's move on to", or other transition words.
+
+    IGNORE any parts of the transcript that you consider meaningless, or provide no conversational value or context, for example
+    filler words like um, uh, so, etc., or any other parts of the transcript that you consider meaningless.
+
+    Correct typos based on the context of the transcript; the transcript is bad.
+    Each chunk should contain one point or idea; a chunk blurb should not involve multiple points.
+    """
+
+# Several sessions' dumps in one call: shared instructions and examples, then
+# one section per request with the same markers as the single prompt
+BATCH_PROMPT_TEMPLATE = """
+    You are a helpful assistant that identifies summary points of chunks from transcripts
+    in addition to identifying topics that the chunk might belong to as well as previous recommendations for how to continue the topic.
+
+    Below are {count} independent requests, each from a different conversation. Chunk each request on its own,
+    using only the topics and recommendations listed under that request, and return exactly one result per request
+    with its request_index.
+
+    Here are some examples of topics and the chunk blurbs that might belong to those topics:
+    {examples}
+{requests}
+
+    For each request: if there are no existing topics that match the chunk, return None for the existing_topic_id parameter
+    and create a new topic in the new_topic_id parameter.
+
+    Note that a chunk has to be ENTIRELY unrelated to the topic in order to justify the creation of
+    a new topic. Therefore, in general chunks in a real conversation will most likely belong to the same topic unless you hear TRANSITION WORDS like "now i want to talk about", or "let's move on to", or other transition words.
+
+    IGNORE any parts of the transcript that you consider meaningless, or provide no conversational value or context, for example
+    filler words like um, uh, so, etc., or any other parts of the transcript that you consider meaningless.
+
+    Correct typos based on the context of the transcript; the transcript is bad.
+    Each chunk should contain one point or idea; a chunk blurb should not involve multiple points.
+    """
+
+BATCH_REQUEST_TEMPLATE = """
+    Request {index}:
+    Here is the transcript to chunk:
+    {transcript}
+
+    Here are the existing topics:
+    {existing_topics}
+
+    Here are the previous recommendations made by the assistant for each topic:
+    {previous_recommendations}
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough local estimate (~4 characters per token for English prose)
+    return (len(text) + 3) // 4
+
+
+def term_vector(text: str) -> Counter:
+    return Counter(tokenize(text))
+
+
+def cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b[word] for word, count in a.items() if word in b)
+    if not dot:
+        return 0.0
+    return dot / (math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values())))
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: max(0, limit - 3)].rstrip() + "..."
+
+
+@dataclass
+class ChunkingPrompt:
+    text: str
+    tokens: int
+    # What the prompt would have cost with every example, topic and recommendation
+    full_tokens: int
+    topics_included: int
+    topics_total: int
+    examples_included: int
+    examples_total: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.full_tokens - self.tokens)
+
+
+class ChunkingPromptBuilder:
+    """Assembles the chunking prompt within a token budget.
+
+    Instructions and the transcript are always sent. The rest of the budget
+    goes to the existing topics, ranked by similarity to the transcript plus
+    how recently they changed; the previous recommendations for the topics
+    that made it in, a couple per topic and truncated; and the examples most
+    similar to the transcript. Similarity is cosine over bag-of-words term
+    counts, and tokens are estimated locally, so building costs no calls.
+    With `budget <= 0` everything is sent, as before."""
+
+    def __init__(
+        self,
+        examples: str,
+        budget: int = 2000,
+        min_topics: int = 1,
+        recommendations_per_topic: int = 2,
+        recommendation_chars: int = 160,
+    ):
+        self.budget = budget
+        self.min_topics = min_topics
+        self.recommendations_per_topic = recommendations_per_topic
+        self.recommendation_chars = recommendation_chars
+        self.examples_text = examples
+        # "Topic: ..." blocks separated by blank lines, with their term vectors
+        self.examples: List[Tuple[str, Counter]] = [
+            (block.strip(), term_vector(block)) for block in re.split(r"\n\s*\n", examples) if block.strip()
+        ]
+        self._base_tokens = estimate_tokens(
+            PROMPT_TEMPLATE.format(examples="", transcript="", existing_topics="", previous_recommendations="")
+        )
+
+    def _full_tokens(self, transcript: str, topics: Sequence[TopicDigest], previous_recommendations: Any) -> int:
+        return (
+            self._base_tokens
+            + estimate_tokens(transcript)
+            + estimate_tokens(self.examples_text)
+            + estimate_tokens(self._format_topics(topics, 0))
+            + estimate_tokens(str(previous_recommendations))
+        )
+
+    def _request_context(
+        self,
+        transcript: str,
+        topics: Sequence[TopicDigest],
+        previous_recommendations: Any,
+    ) -> Tuple[List[TopicDigest], str, str, int]:
+        """Topics chosen for one request, their rendering, the previous
+        recommendations to send, and what is left of the budget for examples."""
+        if self.budget <= 0:
+            return list(topics), self._format_topics(topics, 0), str(previous_recommendations), 0
+
+        query = term_vector(transcript)
+        context = max(0, self.budget - self._base_tokens - estimate_tokens(transcript))
+
+        chosen_topics = self._choose_topics(query, topics, int(context * TOPIC_SHARE))
+        topics_text = self._format_topics(chosen_topics, len(topics) - len(chosen_topics))
+        context -= estimate_tokens(topics_text)
+
+        recommendations = self._format_recommendations(
+            previous_recommendations, [digest.topic_id for digest in chosen_topics],
+            int(max(0, context) * RECOMMENDATION_SHARE / (1 - TOPIC_SHARE)),
+        )
+        context -= estimate_tokens(recommendations)
+        return chosen_topics, topics_text, recommendations, context
+
+    def _examples(self, query_text: str, budget: int) -> List[str]:
+        if self.budget <= 0:
+            return [block for block, _ in self.examples]
+        return self._choose_examples(term_vector(query_text), budget)
+
+    def build(
+        self,
+        transcript: str,
+        topics: Sequence[TopicDigest] = (),
+        previous_recommendations: Any = None,
+    ) -> ChunkingPrompt:
+        chosen_topics, topics_text, recommendations, context = self._request_context(
+            transcript, topics, previous_recommendations
+        )
+        examples = self._examples(transcript, context)
+        text = PROMPT_TEMPLATE.format(
+            examples="\n\n".join(examples) if self.budget > 0 else self.examples_text,
+            transcript=transcript,
+            existing_topics=topics_text,
+            previous_recommendations=recommendations,
+        )
+        return ChunkingPrompt(
+            text=text,
+            tokens=estimate_tokens(text),
+            full_tokens=self._full_tokens(transcript, topics, previous_recommendations),
+            topics_included=len(chosen_topics),
+            topics_total=len(topics),
+            examples_included=len(examples),
+            examples_total=len(self.examples),
+        )
+
+    def build_batch(self, requests: Sequence[Tuple[str, Sequence[TopicDigest], Any]]) -> ChunkingPrompt:
+        """One prompt for several (transcript, topics, previous
+        recommendations) requests. Each request's topics and recommendations
+        are chosen as for its own prompt; the examples are sent once, picked
+        for all the transcripts together. `full_tokens` is what separate
+        unbudgeted prompts would have cost."""
+        sections = []
+        examples_budget = 0
+        full_tokens = 0
+        topics_included = topics_total = 0
+        for index, (transcript, topics, previous_recommendations) in enumerate(requests):
+            chosen_topics, topics_text, recommendations, context = self._request_context(
+                transcript, topics, previous_recommendations
+            )
+            examples_budget = max(examples_budget, context)
+            full_tokens += self._full_tokens(transcript, topics, previous_recommendations)
+            topics_included += len(chosen_topics)
+            topics_total += len(topics)
+            sections.append(BATCH_REQUEST_TEMPLATE.format(
+                index=index,
+                transcript=transcript,
+                existing_topics=topics_text,
+                previous_recommendations=recommendations,
+            ))
+
+        examples = self._examples(" ".join(transcript for transcript, _, _ in requests), examples_budget)
+        text = BATCH_PROMPT_TEMPLATE.format(
+            count=len(requests),
+            examples="\n\n".join(examples) if self.budget > 0 else self.examples_text,
+            requests="".join(sections),
+        )
+        return ChunkingPrompt(
+            text=text,
+            tokens=estimate_tokens(text),
+            full_tokens=full_tokens,
+            topics_included=topics_included,
+            topics_total=topics_total,
+            examples_included=len(examples),
+            examples_total=len(self.examples),
+        )
+
+    def _choose_topics(self, query: Counter, topics: Sequence[TopicDigest], budget: int) -> List[TopicDigest]:
+        by_recency = sorted(topics, key=lambda digest: digest.last_changed, reverse=True)
+        recency = {digest.topic_id: RECENCY_WEIGHT * 0.5 ** rank for rank, digest in enumerate(by_recency)}
+        ranked = sorted(
+            topics,
+            key=lambda digest: cosine(
+                query, term_vector(" ".join([digest.topic_id.replace("-", " "), digest.description, *digest.recent_blurbs]))
+            ) + recency[digest.topic_id],
+            reverse=True,
+        )
+        chosen, spent = [], 0
+        for digest in ranked:
+            cost = estimate_tokens(self._topic_line(digest)) + 1
+            if len(chosen) >= self.min_topics and spent + cost > budget:
+                continue
+            chosen.append(digest)
+            spent += cost
+        return chosen
+
+    @staticmethod
+    def _topic_line(digest: TopicDigest) -> str:
+        return f"- {digest.topic_id}: {digest.description}"
+
+    def _format_topics(self, topics: Sequence[TopicDigest], omitted: int) -> str:
+        if not topics:
+            return "No topics yet." if not omitted else f"({omitted} less related topics not shown)"
+        lines = [self._topic_line(digest) for digest in topics]
+        if omitted:
+            lines.append(f"({omitted} less related topics not shown)")
+        return "\n".join(lines)
+
+    def _format_recommendations(self, recommendations: Any, topic_ids: List[str], budget: int) -> str:
+        if not recommendations:
+            return "None"
+        if not isinstance(recommendations, dict):
+            # Unparsed recommender output
+            return _truncate(str(recommendations), min(budget * 4, self.recommendation_chars * 2))
+        lines, spent = [], 0
+        for topic_id in topic_ids:
+            items = recommendations.get(topic_id)
+            if not items:
+                continue
+            if isinstance(items, str):
+                items = [items]
+            picked = [_truncate(str(item), self.recommendation_chars) for item in items[: self.recommendations_per_topic]]
+            line = f"- {topic_id}: " + " | ".join(picked)
+            cost = estimate_tokens(line) + 1
+            if spent + cost > budget:
+                break
+            lines.append(line)
+            spent += cost
+        return "\n".join(lines) or "None"
+
+    def _choose_examples(self, query: Counter, budget: int) -> List[str]:
+        ranked = sorted(self.examples, key=lambda example: cosine(query, example[1]), reverse=True)
+        chosen, spent = [], 0
+        for block, _ in ranked:
+            cost = estimate_tokens(block) + 1
+            if spent + cost > budget:
+                continue
+            chosen.append(block)
+            spent += cost
+        return chosen
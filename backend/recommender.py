@@ -5,18 +5,37 @@ import json
 
 from time import time
 
+from metrics import metrics, STAGE_RECOMMEND
+from prompt_builder import estimate_tokens
+from response_cache import recommendation_cache
+from topic_manager import Topic
 from config import (
     GEMINI_MODEL,
     PROJECT_ID,
     LOCATION,
 )
 
+def _cache_parts(topics) -> list:
+    """What recommendations depend on: each topic's id, description and chunk
+    contents. The topics' current recommendations are left out, since they
+    are what this call replaces."""
+    parts = []
+    for entry in topics:
+        topic_id, topic = entry if isinstance(entry, tuple) else (None, entry)
+        if isinstance(topic, Topic):
+            parts.append([topic_id, topic.description, [chunk.content for chunk in topic.chunk_stack]])
+        else:
+            parts.append([topic_id, topic])
+    return parts
+
+
 class Recommender:
 
     def __init__(self):
 
         vertexai.init(project=PROJECT_ID, location=LOCATION)
         self.model = GenerativeModel(GEMINI_MODEL)
+        self.last_prompt_tokens = 0
         print(f"Using model: {GEMINI_MODEL}")
     
     def recommend(self, topics):
@@ -41,13 +60,24 @@ class Recommender:
         Here are the topics:
         {topics}"""
 
-        response = self.model.generate_content(prompt)
+        # The prompt is fixed apart from the topics
+        cache_key = recommendation_cache.key(GEMINI_MODEL, _cache_parts(topics))
+        cached = recommendation_cache.get(cache_key)
+        if cached is not None:
+            self.last_prompt_tokens = 0
+            return cached
+
+        self.last_prompt_tokens = estimate_tokens(prompt)
+        with metrics.time(STAGE_RECOMMEND):
+            response = self.model.generate_content(prompt)
         response_text = response.text.strip()
 
         # parse the ```json `
         if "```json" in response_text:
             response_text = response_text.split("```json")[1].split("```")[0]
-            return json.loads(response_text)
+            recommendations = json.loads(response_text)
+            recommendation_cache.set(cache_key, recommendations)
+            return recommendations
         return response_text
 
 
@@ -0,0 +1,155 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+import diskcache
+from cachetools import TTLCache
+
+from config import (
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_DISK_MB,
+    RESPONSE_CACHE_DISK_TTL,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+MEMORY_HIT = "memory_hit"
+DISK_HIT = "disk_hit"
+MISS = "miss"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Case and whitespace differences (STT re-punctuation, retries that
+    re-join the same finals) don't change the answer."""
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return normalize_text(value)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class ResponseCache:
+    """Two-tier cache of LLM responses.
+
+    The memory tier is an LRU of `max_entries` that expire after `ttl`
+    seconds. With a `directory`, entries are also written to a `diskcache`
+    store that survives restarts and is shared by every worker process on
+    the host; it evicts least recently used entries beyond `disk_size_mb`
+    and drops them after `disk_ttl` seconds. A disk hit is copied into
+    memory. `max_entries <= 0` disables the cache.
+
+    Values must be picklable, and only values worth repeating should be
+    stored (callers skip errors and unparsed output)."""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 256,
+        ttl: float = 900.0,
+        directory: Optional[str] = None,
+        disk_size_mb: int = 256,
+        disk_ttl: Optional[float] = 86400.0,
+    ):
+        self.name = name
+        self.enabled = max_entries > 0
+        self.disk_ttl = disk_ttl if disk_ttl and disk_ttl > 0 else None
+        self._memory = TTLCache(maxsize=max(1, max_entries), ttl=ttl)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {MEMORY_HIT: 0, DISK_HIT: 0, MISS: 0}
+        self._disk = None
+        if self.enabled and directory:
+            try:
+                self._disk = diskcache.Cache(
+                    os.path.join(directory, name),
+                    size_limit=disk_size_mb * 1024 * 1024,
+                    eviction_policy="least-recently-used",
+                )
+            except Exception as e:
+                logger.warning(f"Disk tier for {name} cache unavailable, using memory only: {e}")
+
+    @staticmethod
+    def key(model: str, *parts: Any) -> str:
+        """Stable hash of the model and the (normalized) request parts."""
+        payload = json.dumps([model, _normalize(list(parts))], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._counts[MEMORY_HIT] += 1
+                return copy.deepcopy(value)
+
+        value = None
+        if self._disk is not None:
+            try:
+                value = self._disk.get(key)
+            except Exception as e:
+                logger.warning(f"{self.name} cache disk read failed: {e}")
+
+        with self._lock:
+            if value is None:
+                self._counts[MISS] += 1
+                return None
+            self._counts[DISK_HIT] += 1
+            self._memory[key] = value
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled or value is None:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._memory[key] = value
+        if self._disk is not None:
+            try:
+                self._disk.set(key, value, expire=self.disk_ttl)
+            except Exception as e:
+                logger.warning(f"{self.name} cache disk write failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counts)
+            stats["memory_entries"] = len(self._memory)
+        stats["disk_entries"] = len(self._disk) if self._disk is not None else 0
+        return stats
+
+    def clear(self) -> None:
+        """Drop every entry in both tiers (the counts are kept)."""
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+def _cache(name: str) -> ResponseCache:
+    return ResponseCache(
+        name,
+        max_entries=RESPONSE_CACHE_SIZE,
+        ttl=RESPONSE_CACHE_TTL,
+        directory=RESPONSE_CACHE_DIR or None,
+        disk_size_mb=RESPONSE_CACHE_DISK_MB,
+        disk_ttl=RESPONSE_CACHE_DISK_TTL,
+    )
+
+
+chunking_cache = _cache("chunking")
+recommendation_cache = _cache("recommendation")
+response_caches = (chunking_cache, recommendation_cache)
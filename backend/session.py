@@ -0,0 +1,299 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from config import (
+    PROJECT_ID,
+    LOCATION,
+    AUDIO_FRAME_MS,
+    AUDIO_INPUT_SAMPLE_RATE,
+    AUDIO_INPUT_CHANNELS,
+    TRANSCRIPT_SPILL_DIR,
+    CHUNKING_MAX_IN_FLIGHT,
+    DUMP_TARGET_LATENCY,
+    DUMP_MAX_PER_MINUTE,
+    TOPIC_FAST_PATH_THRESHOLD,
+    TOPIC_FAST_PATH_MARGIN,
+    TOPIC_FAST_PATH_AUDIT_EVERY,
+    CHUNKING_STREAM,
+    TRANSCRIPT_TAIL_BYTES,
+    INGEST_QUEUE_SIZE,
+    INGEST_FULL_POLICY,
+    INGEST_BLOCK_TIMEOUT,
+    INGEST_CLOSE_TIMEOUT,
+    SITE_QUEUE_SIZE,
+    SITE_SLOW_POLICY,
+    FLOW_WINDOW_FRAMES,
+    FLOW_ACK_EVERY,
+    FLOW_ACK_INTERVAL,
+    CAPTION_MAX_RATE,
+)
+from broadcast import Broadcaster
+from captions import CaptionStream
+from flow import FlowController
+from ingest import AudioIngestQueue
+from metrics import metrics
+from normalizer import AudioFormat, AudioNormalizer
+from coalescing_worker import CoalescingWorker
+from transcriber import Transcriber, TranscriberConfig
+from recommender import Recommender
+from topic_manager import TopicManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ID = "default"
+
+
+class Session:
+    """A single conversation: its own transcription pipeline plus the phone
+    socket and any number of site subscribers paired to it."""
+
+    def __init__(
+        self,
+        session_id: str,
+        on_chunks_produced: Optional[Callable[["Session", Dict[str, str]], None]] = None,
+        snapshot_builder: Optional[Callable[["Session"], dict]] = None,
+        on_speech_event: Optional[Callable[["Session", str], None]] = None,
+        transcriber_config: Optional[TranscriberConfig] = None,
+        on_recommend: Optional[Callable[["Session", List[str]], None]] = None,
+    ):
+        self.session_id = session_id
+        self.topic_manager = TopicManager()
+        self.transcriber = Transcriber(
+            self.topic_manager,
+            config=transcriber_config or TranscriberConfig(
+                vertex_project_id=PROJECT_ID,
+                vertex_location=LOCATION,
+                transcript_spill_dir=TRANSCRIPT_SPILL_DIR or None,
+                transcript_tail_bytes=TRANSCRIPT_TAIL_BYTES,
+                max_chunking_in_flight=CHUNKING_MAX_IN_FLIGHT,
+                dump_target_latency=DUMP_TARGET_LATENCY,
+                max_dumps_per_minute=DUMP_MAX_PER_MINUTE,
+                topic_fast_path_threshold=TOPIC_FAST_PATH_THRESHOLD,
+                topic_fast_path_margin=TOPIC_FAST_PATH_MARGIN,
+                topic_fast_path_audit_every=TOPIC_FAST_PATH_AUDIT_EVERY,
+                stream_chunking=CHUNKING_STREAM,
+            ),
+            on_working_buffer_update=lambda buffer: self.captions.touch(),
+            on_dump=self._on_dump,
+            on_chunks_produced=self._on_chunks_produced,
+            session_id=session_id,
+            on_speech_event=self._on_speech_event,
+        )
+        self.recommender = Recommender()
+
+        # Whatever the phone sends becomes fixed-size LINEAR16 mono frames at
+        # the recognizer's rate before it reaches the transcriber
+        self.normalizer = AudioNormalizer(
+            sample_rate=self.transcriber.config.sample_rate_hertz,
+            frame_ms=AUDIO_FRAME_MS,
+            input_format=AudioFormat(AUDIO_INPUT_SAMPLE_RATE, AUDIO_INPUT_CHANNELS),
+        )
+
+        # Decoded audio is handed to a worker thread so blocking STT and
+        # chunking calls stay off the event loop
+        self.ingest = AudioIngestQueue(
+            self._feed_audio,
+            maxsize=INGEST_QUEUE_SIZE,
+            policy=INGEST_FULL_POLICY,
+            block_timeout=INGEST_BLOCK_TIMEOUT,
+            name=session_id,
+            # A phone that stops sending leaves a partial frame behind
+            on_idle=self.flush_audio,
+        )
+
+        self.phone_socket = None
+        self.flow = FlowController(
+            window=FLOW_WINDOW_FRAMES,
+            ack_every=FLOW_ACK_EVERY,
+            ack_interval=FLOW_ACK_INTERVAL,
+        )
+        self.frames_received = 0
+        self.broadcaster = Broadcaster(
+            lambda: snapshot_builder(self) if snapshot_builder else {},
+            queue_size=SITE_QUEUE_SIZE,
+            policy=SITE_SLOW_POLICY,
+            name=session_id,
+        )
+        # Live caption for site subscribers; bound to the event loop by the server
+        self.captions = CaptionStream(
+            self.transcriber.get_working_buffer_text,
+            self.broadcaster.publish,
+            max_rate=CAPTION_MAX_RATE,
+            active=lambda: len(self.broadcaster) > 0,
+        )
+
+        # Recommendations for topics with new chunks, requested with
+        # `recommendations.request(topic_ids)`: run off the chunking threads,
+        # and a burst of requests (e.g. streamed chunks) is merged into one call
+        self.recommendations = CoalescingWorker(
+            lambda topic_ids: on_recommend(self, topic_ids) if on_recommend else None,
+            name=f"recommend-{session_id}",
+        )
+
+        self.last_sequence: Optional[int] = None
+        self.frames_lost = 0
+
+        self.created_at: float = time.time()
+        self.last_activity: float = self.created_at
+        self._on_chunks_produced_callback = on_chunks_produced
+        self._on_speech_event_callback = on_speech_event
+
+    def _on_chunks_produced(self, chunks: Dict[str, str]) -> None:
+        if self._on_chunks_produced_callback:
+            self._on_chunks_produced_callback(self, chunks)
+
+    def _on_dump(self, text: str) -> None:
+        print(f"[{self.session_id}] Dumped text: {text}")
+        # The chunked text has left the caption
+        self.captions.touch()
+
+    def _on_speech_event(self, event: str) -> None:
+        if self._on_speech_event_callback:
+            self._on_speech_event_callback(self, event)
+
+    def _feed_audio(self, chunk) -> None:
+        for frame in self.normalizer.process(chunk):
+            self.transcriber.feed(frame)
+
+    def flush_audio(self) -> None:
+        """Send the partial frame the normalizer is holding back to STT."""
+        for frame in self.normalizer.flush():
+            if self.transcriber.is_running:
+                self.transcriber.feed(frame)
+
+    def touch(self) -> None:
+        self.last_activity = time.time()
+
+    def track_sequence(self, sequence: int) -> int:
+        """Record a binary frame's sequence number, returning how many frames
+        were skipped since the previous one."""
+        lost = 0
+        if self.last_sequence is not None:
+            gap = (sequence - self.last_sequence - 1) & 0xFFFFFFFF
+            # Small gaps are lost frames; anything else is a client restarting its counter
+            if gap < 0x7FFFFFFF:
+                lost = gap
+        self.last_sequence = sequence
+        self.frames_lost += lost
+        return lost
+
+    def is_site(self, websocket) -> bool:
+        return websocket in self.broadcaster
+
+    def has_clients(self) -> bool:
+        return self.phone_socket is not None or len(self.broadcaster) > 0
+
+    def is_idle(self, idle_timeout: float, now: Optional[float] = None) -> bool:
+        if self.has_clients():
+            return False
+        now = now if now is not None else time.time()
+        return now - self.last_activity >= idle_timeout
+
+    def detach(self, websocket) -> Optional[str]:
+        """Unpair a socket from this session, returning which role it held."""
+        role = None
+        if self.phone_socket is websocket:
+            self.phone_socket = None
+            role = "phone"
+        if self.broadcaster.unsubscribe(websocket):
+            role = "site"
+        self.touch()
+        return role
+
+    def close(self) -> None:
+        # Wait out the chunk the ingest worker is handling, so nothing feeds
+        # the transcriber behind the flushed partial frame or after it stops
+        self.ingest.stop(timeout=INGEST_CLOSE_TIMEOUT)
+        self.flush_audio()
+        self.transcriber.stop(timeout=None, dump=False)
+        self.phone_socket = None
+        self.recommendations.close()
+        self.captions.close()
+        self.broadcaster.close()
+        self.transcriber.clear_buffers()
+        self.transcriber.close()
+        self.topic_manager.clear()
+        metrics.forget_session(self.session_id)
+
+
+class SessionRegistry:
+    """Sessions keyed by the id clients send in `register_client`."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[str], Session],
+        idle_timeout: float = 300.0,
+        on_remove: Optional[Callable[[Session], None]] = None,
+    ):
+        self._session_factory = session_factory
+        self.idle_timeout = idle_timeout
+        self.on_remove = on_remove
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def get_or_create(self, session_id: str) -> Session:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._session_factory(session_id)
+                self._sessions[session_id] = session
+                logger.info(f"Created session {session_id}")
+            session.touch()
+            return session
+
+    def pop(self, session_id: str) -> Optional[Session]:
+        """Take a session out of the registry without tearing it down; finish
+        with `close_session()`."""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def close_session(self, session: Session) -> None:
+        if self.on_remove:
+            try:
+                self.on_remove(session)
+            except Exception as e:
+                logger.error(f"on_remove hook failed for session {session.session_id}: {e}", exc_info=True)
+        session.close()
+        logger.info(f"Removed session {session.session_id}")
+
+    def remove(self, session_id: str) -> Optional[Session]:
+        session = self.pop(session_id)
+        if session:
+            self.close_session(session)
+        return session
+
+    def idle_ids(self, now: Optional[float] = None) -> List[str]:
+        with self._lock:
+            return [
+                session_id
+                for session_id, session in self._sessions.items()
+                if session.is_idle(self.idle_timeout, now)
+            ]
+
+    def reap_idle(self, now: Optional[float] = None) -> List[str]:
+        idle_ids = self.idle_ids(now)
+        for session_id in idle_ids:
+            self.remove(session_id)
+        return idle_ids
+
+    def all_sessions(self) -> List[Session]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def clear(self) -> None:
+        for session in self.all_sessions():
+            self.remove(session.session_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "tests")
+
+# Sessions build speech and LLM clients; the local fakes stand in for them
+from benchmarks.fakes import install_fakes  # noqa: E402
+
+install_fakes()
+
+
+@pytest.fixture
+def make_session():
+    from session import Session
+
+    sessions = []
+
+    def make(session_id: str = "test"):
+        session = Session(session_id)
+        sessions.append(session)
+        return session
+
+    yield make
+    for session in sessions:
+        session.close()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+from captions import CaptionStream, common_prefix_length, utf16_length
+
+
+def test_utf16_length_counts_surrogate_pairs():
+    assert utf16_length("abc") == 3
+    assert utf16_length("é") == 1
+    assert utf16_length("😀") == 2
+
+
+def test_common_prefix_length():
+    assert common_prefix_length("hello", "hello world") == 5
+    assert common_prefix_length("hello there", "help") == 3
+    assert common_prefix_length("", "abc") == 0
+    assert common_prefix_length("abc", "xyz") == 0
+
+
+def _run_captions(texts):
+    """Publish each text in turn; returns the caption messages sent."""
+    sent = []
+    current = [""]
+
+    async def run():
+        stream = CaptionStream(lambda: current[0], sent.append, max_rate=1000)
+        stream.bind(asyncio.get_running_loop())
+        for text in texts:
+            current[0] = text
+            stream.touch()
+            await asyncio.sleep(0.01)
+        return stream
+
+    stream = asyncio.run(run())
+    return [json.loads(message) for message in sent], stream
+
+
+def test_caption_sends_only_the_change():
+    messages, stream = _run_captions(["hello", "hello world", "hello world"])
+    assert messages == [
+        {"type": "caption", "seq": 1, "base": 0, "text": "hello"},
+        {"type": "caption", "seq": 2, "base": 5, "text": " world"},
+    ]
+    assert stream.snapshot() == {"seq": 2, "text": "hello world"}
+
+
+def test_caption_base_counts_utf16_code_units():
+    messages, _ = _run_captions(["héllo 😀", "héllo 😀 there"])
+    assert messages[1]["base"] == 8
+    assert messages[1]["text"] == " there"
+
+
+def test_caption_rewrite_keeps_common_prefix():
+    messages, _ = _run_captions(["ice scream", "ice cream"])
+    assert messages[1]["base"] == 4
+    assert messages[1]["text"] == "cream"
+
+
+def test_closed_stream_sends_nothing():
+    sent = []
+
+    async def run():
+        stream = CaptionStream(lambda: "text", sent.append, max_rate=1000)
+        stream.bind(asyncio.get_running_loop())
+        stream.close()
+        stream.touch()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert sent == []
@@ -0,0 +1,98 @@
+import os
+import time
+
+from checkpoint import SessionCheckpointer
+
+
+def _topics(session):
+    _, topics = session.topic_manager.snapshot()
+    return {
+        topic_id: (topic.description, [(c.blurb, c.content) for c in topic.chunk_stack])
+        for topic_id, topic in topics.items()
+    }
+
+
+def _lines(path):
+    with open(path) as f:
+        return [line for line in f if line.strip()]
+
+
+def _populate(session):
+    session.topic_manager.add_chunk("t1", "first chunk", "first", "Topic one")
+    session.transcriber.restore_buffers("earlier words", "still speaking", {"t1": "a tip"})
+
+
+def test_restore_rebuilds_the_session(tmp_path, make_session):
+    checkpointer = SessionCheckpointer(str(tmp_path))
+    original = make_session("s1")
+    _populate(original)
+    assert checkpointer.checkpoint(original)
+
+    restored = make_session("s1")
+    assert SessionCheckpointer(str(tmp_path)).restore(restored)
+    assert _topics(restored) == _topics(original)
+    assert restored.transcriber.get_long_term_buffer_text() == "earlier words"
+    assert restored.transcriber.get_working_buffer_text() == "still speaking"
+    assert restored.transcriber.previous_recommendations == {"t1": "a tip"}
+
+
+def test_later_checkpoints_append_changes(tmp_path, make_session):
+    checkpointer = SessionCheckpointer(str(tmp_path))
+    original = make_session("s1")
+    _populate(original)
+    checkpointer.checkpoint(original)
+
+    original.topic_manager.add_chunk("t1", "second chunk", "second")
+    original.topic_manager.add_chunk("t2", "other chunk", "other", "Topic two")
+    original.transcriber.long_term.append(" and more")
+    assert checkpointer.checkpoint(original)
+    assert len(_lines(checkpointer.path_for("s1"))) == 2
+
+    restored = make_session("s1")
+    SessionCheckpointer(str(tmp_path)).restore(restored)
+    assert _topics(restored) == _topics(original)
+    assert restored.transcriber.get_long_term_buffer_text() == original.transcriber.get_long_term_buffer_text()
+
+
+def test_compaction_rewrites_a_single_base(tmp_path, make_session):
+    checkpointer = SessionCheckpointer(str(tmp_path), compact_every=2)
+    original = make_session("s1")
+    for index in range(4):
+        original.topic_manager.add_chunk("t1", f"chunk {index}", f"blurb {index}")
+        checkpointer.checkpoint(original)
+    # base, 2 increments, then a fresh base
+    assert len(_lines(checkpointer.path_for("s1"))) == 1
+
+    restored = make_session("s1")
+    SessionCheckpointer(str(tmp_path)).restore(restored)
+    assert _topics(restored) == _topics(original)
+
+
+def test_torn_last_record_is_ignored(tmp_path, make_session):
+    checkpointer = SessionCheckpointer(str(tmp_path))
+    original = make_session("s1")
+    _populate(original)
+    checkpointer.checkpoint(original)
+    with open(checkpointer.path_for("s1"), "a") as f:
+        f.write('{"topics": {"t1": {"chunks": [["cut')
+
+    restored = make_session("s1")
+    assert checkpointer.restore(restored)
+    assert _topics(restored) == _topics(original)
+
+
+def test_restore_without_a_file(tmp_path, make_session):
+    assert not SessionCheckpointer(str(tmp_path)).restore(make_session("missing"))
+
+
+def test_prune_removes_expired_files(tmp_path, make_session):
+    checkpointer = SessionCheckpointer(str(tmp_path))
+    for session_id in ("old", "new"):
+        checkpointer.checkpoint(make_session(session_id))
+    old_path = checkpointer.path_for("old")
+    expired = time.time() - 3600
+    os.utime(old_path, (expired, expired))
+
+    assert checkpointer.prune(60) == 1
+    assert not os.path.exists(old_path)
+    assert os.path.exists(checkpointer.path_for("new"))
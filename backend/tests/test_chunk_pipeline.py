@@ -0,0 +1,132 @@
+import threading
+from concurrent.futures import CancelledError
+
+from chunk_pipeline import ChunkingPipeline
+
+
+class Gates:
+    """Work that blocks on a per-text event until the test releases it."""
+
+    def __init__(self, *texts):
+        self.events = {text: threading.Event() for text in texts}
+        self.started = {text: threading.Event() for text in texts}
+
+    def __call__(self, text):
+        self.started[text].set()
+        assert self.events[text].wait(5)
+        return text.upper()
+
+    def release(self, text):
+        self.events[text].set()
+
+
+def test_results_applied_in_submission_order():
+    gates = Gates("a", "b", "c")
+    applied = []
+    pipeline = ChunkingPipeline(gates, lambda text, result, error: applied.append(result), max_in_flight=3)
+    for text in "abc":
+        assert pipeline.submit(text)
+    gates.release("c")
+    gates.release("b")
+    assert not pipeline.wait(0.1)
+    assert applied == []
+    gates.release("a")
+    assert pipeline.wait(5)
+    assert applied == ["A", "B", "C"]
+    pipeline.shutdown(wait=True)
+
+
+def test_partials_applied_in_order_before_their_dump():
+    events = []
+    release_first = threading.Event()
+    pipeline = None
+
+    def work(text):
+        if text == "first":
+            assert release_first.wait(5)
+        pipeline.emit(f"{text}-part")
+        return text
+
+    pipeline = ChunkingPipeline(
+        work,
+        lambda text, result, error: events.append(("apply", result)),
+        max_in_flight=2,
+        apply_partial=lambda text, item: events.append(("partial", item)),
+    )
+    pipeline.submit("first")
+    pipeline.submit("second")
+    release_first.set()
+    assert pipeline.wait(5)
+    assert events == [
+        ("partial", "first-part"),
+        ("apply", "first"),
+        ("partial", "second-part"),
+        ("apply", "second"),
+    ]
+    pipeline.shutdown(wait=True)
+
+
+def test_errors_reach_apply():
+    applied = []
+
+    def work(text):
+        raise RuntimeError("boom")
+
+    pipeline = ChunkingPipeline(work, lambda text, result, error: applied.append((text, result, error)))
+    pipeline.submit("a")
+    assert pipeline.wait(5)
+    [(text, result, error)] = applied
+    assert (text, result) == ("a", None)
+    assert isinstance(error, RuntimeError)
+    pipeline.shutdown(wait=True)
+
+
+def test_submit_refused_when_full():
+    gates = Gates("a", "b")
+    pipeline = ChunkingPipeline(gates, lambda text, result, error: None, max_in_flight=1)
+    assert pipeline.submit("a")
+    assert not pipeline.submit("b")
+    assert not pipeline.submit("b", block=True, timeout=0.05)
+    assert pipeline.pending_texts() == ["a"]
+    gates.release("a")
+    assert pipeline.submit("b", block=True, timeout=5)
+    gates.release("b")
+    assert pipeline.wait(5)
+    pipeline.shutdown(wait=True)
+
+
+def test_shutdown_applies_cancelled_dumps_in_order():
+    gates = Gates("a", "b")
+    applied = []
+    done = threading.Event()
+
+    def apply(text, result, error):
+        applied.append((text, type(error) if error else result))
+        if len(applied) == 2:
+            done.set()
+
+    pipeline = ChunkingPipeline(gates, apply, max_in_flight=1)
+    pipeline.submit("a")
+    # The executor keeps its single thread, so "b" waits behind "a"
+    pipeline.max_in_flight = 2
+    assert gates.started["a"].wait(5)
+    pipeline.submit("b")
+    pipeline.shutdown()
+    gates.release("a")
+    assert done.wait(5)
+    assert applied == [("a", "A"), ("b", CancelledError)]
+
+
+def test_close_drops_outstanding_results():
+    gates = Gates("a", "b")
+    applied = []
+    pipeline = ChunkingPipeline(gates, lambda text, result, error: applied.append(text), max_in_flight=2)
+    pipeline.submit("a")
+    pipeline.submit("b")
+    assert gates.started["a"].wait(5)
+    pipeline.close()
+    gates.release("a")
+    gates.release("b")
+    assert pipeline.wait(1)
+    assert applied == []
+    assert not pipeline.submit("c")
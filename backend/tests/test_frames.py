@@ -0,0 +1,59 @@
+import pytest
+
+from frames import (
+    AUDIO_FRAME_HEADER,
+    AUDIO_FRAME_HEADER_SIZE,
+    AUDIO_FRAME_MAGIC,
+    AUDIO_FRAME_VERSION,
+    FrameError,
+    encode_audio_frame,
+    parse_audio_frame,
+)
+
+
+def test_round_trip():
+    pcm = bytes(range(256)) * 4
+    frame = parse_audio_frame(encode_audio_frame(pcm, 7, session_id="room-1", timestamp_ms=1234))
+    assert frame.session_id == "room-1"
+    assert frame.sequence == 7
+    assert frame.timestamp_ms == 1234
+    assert bytes(frame.payload) == pcm
+
+
+def test_payload_is_a_view_into_the_message():
+    message = bytearray(encode_audio_frame(b"\x01\x02\x03\x04", 0))
+    frame = parse_audio_frame(message)
+    message[AUDIO_FRAME_HEADER_SIZE] = 0xFF
+    assert frame.payload[0] == 0xFF
+
+
+def test_missing_session_id_parses_as_none():
+    assert parse_audio_frame(encode_audio_frame(b"", 0)).session_id is None
+
+
+def test_sequence_is_stored_modulo_2_32():
+    assert parse_audio_frame(encode_audio_frame(b"", 2**32 + 5)).sequence == 5
+
+
+def test_session_id_limit_counts_utf8_bytes():
+    assert parse_audio_frame(encode_audio_frame(b"", 0, session_id="é" * 8)).session_id == "é" * 8
+    with pytest.raises(FrameError):
+        encode_audio_frame(b"", 0, session_id="é" * 9)
+
+
+def test_short_frame_rejected():
+    with pytest.raises(FrameError):
+        parse_audio_frame(b"EA\x01")
+
+
+@pytest.mark.parametrize("magic, version", [(b"XX", AUDIO_FRAME_VERSION), (AUDIO_FRAME_MAGIC, 99)])
+def test_bad_header_rejected(magic, version):
+    header = AUDIO_FRAME_HEADER.pack(magic, version, 0, b"", 0, 0)
+    with pytest.raises(FrameError):
+        parse_audio_frame(header)
+
+
+def test_invalid_utf8_session_id_rejected():
+    header = AUDIO_FRAME_HEADER.pack(AUDIO_FRAME_MAGIC, AUDIO_FRAME_VERSION, 0, b"\xff\xfe", 0, 0)
+    with pytest.raises(FrameError):
+        parse_audio_frame(header)
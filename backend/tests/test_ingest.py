@@ -0,0 +1,162 @@
+import asyncio
+import threading
+
+import pytest
+
+from ingest import (
+    POLICY_BLOCK,
+    POLICY_DROP_OLDEST,
+    POLICY_REJECT,
+    AudioIngestQueue,
+    IngestQueueFull,
+)
+
+
+class Handler:
+    """Records chunks; blocks on the first one until released."""
+
+    def __init__(self):
+        self.chunks = []
+        self.busy = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, chunk):
+        self.busy.set()
+        assert self.release.wait(5)
+        self.chunks.append(chunk)
+
+
+def _fill(ingest, handler, count):
+    """Queue a first chunk the worker holds on to, then `count` more."""
+
+    async def run():
+        await ingest.put(b"held")
+        assert handler.busy.wait(5)
+        for index in range(count):
+            await ingest.put(bytes([index]))
+
+    asyncio.run(run())
+
+
+def _wait_processed(ingest, count):
+    async def run():
+        while ingest.processed < count:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_chunks_handled_in_order():
+    handler = Handler()
+    handler.release.set()
+    ingest = AudioIngestQueue(handler, maxsize=8)
+
+    async def run():
+        for index in range(5):
+            await ingest.put(bytes([index]))
+
+    asyncio.run(run())
+    _wait_processed(ingest, 5)
+    ingest.stop(timeout=5)
+    assert handler.chunks == [bytes([index]) for index in range(5)]
+
+
+def test_drop_oldest_handles_the_newest_chunks():
+    handler = Handler()
+    ingest = AudioIngestQueue(handler, maxsize=2, policy=POLICY_DROP_OLDEST)
+    _fill(ingest, handler, 4)
+    handler.release.set()
+    _wait_processed(ingest, 3)
+    ingest.stop(timeout=5)
+    assert ingest.dropped == 2
+    assert handler.chunks == [b"held", bytes([2]), bytes([3])]
+
+
+def test_reject_raises_when_full():
+    handler = Handler()
+    ingest = AudioIngestQueue(handler, maxsize=2, policy=POLICY_REJECT)
+    _fill(ingest, handler, 2)
+    with pytest.raises(IngestQueueFull):
+        asyncio.run(ingest.put(b"late"))
+    assert ingest.rejected == 1
+    handler.release.set()
+    ingest.stop(timeout=5)
+
+
+def test_block_waits_for_room():
+    handler = Handler()
+    ingest = AudioIngestQueue(handler, maxsize=1, policy=POLICY_BLOCK, block_timeout=5)
+    _fill(ingest, handler, 1)
+
+    async def run():
+        asyncio.get_running_loop().call_later(0.05, handler.release.set)
+        await ingest.put(b"waited")
+
+    asyncio.run(run())
+    ingest.stop(timeout=5)
+    assert ingest.rejected == 0
+    assert ingest.enqueued == 3
+
+
+def test_block_gives_up_after_timeout():
+    handler = Handler()
+    ingest = AudioIngestQueue(handler, maxsize=1, policy=POLICY_BLOCK, block_timeout=0.05)
+    _fill(ingest, handler, 1)
+    with pytest.raises(IngestQueueFull):
+        asyncio.run(ingest.put(b"late"))
+    handler.release.set()
+    ingest.stop(timeout=5)
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        AudioIngestQueue(lambda chunk: None, policy="sometimes")
+
+
+def test_put_after_stop_is_dropped_until_started():
+    handler = Handler()
+    handler.release.set()
+    ingest = AudioIngestQueue(handler)
+    ingest.stop(timeout=5)
+    asyncio.run(ingest.put(b"late"))
+    assert ingest.dropped == 1
+    assert handler.chunks == []
+
+    ingest.start()
+    asyncio.run(ingest.put(b"again"))
+    _wait_processed(ingest, 1)
+    ingest.stop(timeout=5)
+    assert handler.chunks == [b"again"]
+
+
+def test_stop_discards_queued_chunks():
+    handler = Handler()
+    ingest = AudioIngestQueue(handler, maxsize=4)
+    _fill(ingest, handler, 3)
+    ingest.stop()
+    handler.release.set()
+    ingest.stop(timeout=5)
+    assert handler.chunks == [b"held"]
+
+
+def test_restart_waits_for_the_previous_worker():
+    handler = Handler()
+    ingest = AudioIngestQueue(handler, name="restart")
+    _fill(ingest, handler, 0)
+    ingest.stop()
+    threading.Timer(0.05, handler.release.set).start()
+    # Joins the old worker, which finishes "held" first
+    ingest.start()
+    asyncio.run(ingest.put(b"next"))
+    _wait_processed(ingest, 2)
+    ingest.stop(timeout=5)
+    assert handler.chunks == [b"held", b"next"]
+    assert [t for t in threading.enumerate() if t.name == "ingest-restart"] == []
+
+
+def test_idle_hook_runs_after_a_pause():
+    idle = threading.Event()
+    ingest = AudioIngestQueue(lambda chunk: None, on_idle=idle.set, idle_after=0.01)
+    asyncio.run(ingest.put(b"chunk"))
+    assert idle.wait(5)
+    ingest.stop(timeout=5)
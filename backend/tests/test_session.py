@@ -0,0 +1,28 @@
+def test_first_frame_loses_nothing(make_session):
+    session = make_session()
+    assert session.track_sequence(41) == 0
+    assert session.frames_lost == 0
+
+
+def test_gaps_count_as_lost_frames(make_session):
+    session = make_session()
+    session.track_sequence(1)
+    assert session.track_sequence(2) == 0
+    assert session.track_sequence(5) == 2
+    assert session.frames_lost == 2
+
+
+def test_sequence_wraps_around(make_session):
+    session = make_session()
+    session.track_sequence(0xFFFFFFFF)
+    assert session.track_sequence(0) == 0
+    session.track_sequence(0xFFFFFFFE)
+    assert session.track_sequence(1) == 2
+    assert session.frames_lost == 2
+
+
+def test_counter_restart_is_not_a_loss(make_session):
+    session = make_session()
+    session.track_sequence(1000)
+    assert session.track_sequence(0) == 0
+    assert session.frames_lost == 0
@@ -0,0 +1,141 @@
+import re
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "the and for that this with you are was were have has had but not what when where which who "
+    "will would can could should about there their they them then than into from our your its "
+    "just like some more also been being very really okay yeah".split()
+)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+# Phrases the chunking prompt treats as a change of topic
+TRANSITION_RE = re.compile(
+    r"\b(?:let'?s (?:move on|talk about|switch|change|turn to|get to)|moving on|move on to"
+    r"|now i (?:want|wanna|would like) to (?:talk|discuss|move|switch)|next (?:topic|thing|item|question)"
+    r"|on (?:another|a different) note|chang(?:e|ing) (?:the )?(?:subject|topic)|switch(?:ing)? gears"
+    r"|different topic|another topic)\b",
+    re.IGNORECASE,
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased content words (no short words or stopwords)."""
+    return [word for word in _WORD_RE.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS]
+
+
+@dataclass
+class TopicMatch:
+    topic_id: str
+    score: float
+    # Score of the second best topic (0 with a single topic)
+    runner_up: float
+
+    @property
+    def margin(self) -> float:
+        return self.score - self.runner_up
+
+
+class TopicIndex:
+    """Local embeddings of each topic, for assigning speech to a topic
+    without an LLM call.
+
+    A text is embedded with the hashing trick: words are hashed into `dim`
+    buckets, counts are log-scaled and weighted by inverse document
+    frequency, learnt from every description, blurb and chunk indexed so
+    far. A topic is embedded from its description and its `recent` latest
+    blurbs and chunk texts; texts are compared by cosine similarity.
+
+    Not thread-safe; TopicManager calls it under its lock."""
+
+    def __init__(self, dim: int = 4096, recent: int = 3):
+        self.dim = dim
+        self.recent = recent
+        self._descriptions: Dict[str, str] = {}
+        self._recent: Dict[str, Deque[np.ndarray]] = {}
+        # Raw bucket counts per topic, rebuilt when the topic changes
+        self._counts: Dict[str, np.ndarray] = {}
+        self._df = np.zeros(dim, dtype=np.float32)
+        self._documents = 0
+
+    def _bucket_counts(self, text: str) -> np.ndarray:
+        counts = np.zeros(self.dim, dtype=np.float32)
+        for word in tokenize(text):
+            counts[zlib.crc32(word.encode("utf-8")) % self.dim] += 1
+        return counts
+
+    def _observe_document(self, counts: np.ndarray) -> None:
+        self._df += counts > 0
+        self._documents += 1
+
+    def _weigh(self, counts: np.ndarray) -> np.ndarray:
+        idf = np.log((1 + self._documents) / (1 + self._df)) + 1
+        weighted = np.log1p(counts) * idf
+        norm = np.linalg.norm(weighted, axis=-1, keepdims=True)
+        return weighted / np.maximum(norm, 1e-9)
+
+    def _rebuild(self, topic_id: str) -> None:
+        counts = self._bucket_counts(self._descriptions.get(topic_id, ""))
+        for recent in self._recent.get(topic_id, ()):
+            counts += recent
+        self._counts[topic_id] = counts
+
+    def set_description(self, topic_id: str, description: str) -> None:
+        self._descriptions[topic_id] = description
+        self._observe_document(self._bucket_counts(description))
+        self._rebuild(topic_id)
+
+    def add_chunk(self, topic_id: str, blurb: str, content: str) -> None:
+        counts = self._bucket_counts(f"{blurb} {content}")
+        self._observe_document(counts)
+        self._recent.setdefault(topic_id, deque(maxlen=self.recent)).append(counts)
+        self._rebuild(topic_id)
+
+    def clear(self) -> None:
+        self._descriptions.clear()
+        self._recent.clear()
+        self._counts.clear()
+        self._df[:] = 0
+        self._documents = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def match(self, text: str) -> Optional[TopicMatch]:
+        """The topic most similar to `text`, or None without topics or words."""
+        if not self._counts:
+            return None
+        query = self._bucket_counts(text)
+        if not query.any():
+            return None
+        topic_ids = list(self._counts)
+        scores = self._weigh(np.stack([self._counts[topic_id] for topic_id in topic_ids])) @ self._weigh(query)
+        order = np.argsort(scores)[::-1]
+        best = int(order[0])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else 0.0
+        return TopicMatch(topic_id=topic_ids[best], score=float(scores[best]), runner_up=runner_up)
+
+    def summarize(self, text: str, max_words: int = 25) -> str:
+        """Extractive blurb: the sentence most representative of `text`,
+        cut to `max_words`."""
+        sentences = [sentence for sentence in _SENTENCE_RE.split(" ".join(text.split())) if sentence]
+        if not sentences:
+            return ""
+        if len(sentences) > 1:
+            vectors = self._weigh(np.stack([self._bucket_counts(sentence) for sentence in sentences]))
+            centroid = self._weigh(vectors.sum(axis=0))
+            best = sentences[int(np.argmax(vectors @ centroid))]
+        else:
+            best = sentences[0]
+        words = best.split()
+        if len(words) > max_words:
+            return " ".join(words[:max_words]) + "..."
+        return best
+
+
+def is_transition(text: str) -> bool:
+    return TRANSITION_RE.search(text) is not None
@@ -1,7 +1,9 @@
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 import threading
 
+from topic_index import TopicIndex, TopicMatch
+
 
 @dataclass
 class Chunk:
@@ -13,12 +15,51 @@ class Chunk:
 class Topic:
     description: str
     chunk_stack: List[Chunk] = field(default_factory=list)
+    recommendations: List[str] = field(default_factory=list)
+
+
+@dataclass
+class TopicUpdate:
+    """A single change to a topic, numbered in the order it was applied."""
+
+    seq: int
+    kind: str
+    topic_id: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class TopicDigest:
+    """What the chunking prompt needs to know about a topic."""
+
+    topic_id: str
+    description: str
+    # Sequence number of the topic's last change; higher is more recent
+    last_changed: int
+    recent_blurbs: List[str] = field(default_factory=list)
+
+
+CHUNK_APPENDED = "chunk_appended"
+DESCRIPTION_CHANGED = "description_changed"
+RECOMMENDATIONS_REPLACED = "recommendations_replaced"
 
 
 class TopicManager:
     def __init__(self):
         self._topics: Dict[str, Topic] = {}
         self._lock = threading.Lock()
+        self._version = 0
+        self._pending_updates: List[TopicUpdate] = []
+        self._last_changed: Dict[str, int] = {}
+        # Local embeddings of every topic for matching speech without an LLM
+        self._index = TopicIndex()
+
+    def _record(self, kind: str, topic_id: str, **data) -> None:
+        self._version += 1
+        self._last_changed[topic_id] = self._version
+        self._pending_updates.append(
+            TopicUpdate(seq=self._version, kind=kind, topic_id=topic_id, data=data)
+        )
 
     def add_chunk(
         self,
@@ -30,15 +71,84 @@ class TopicManager:
         with self._lock:
             if topic_id not in self._topics:
                 self._topics[topic_id] = Topic(description=topic_description)
+                if topic_description:
+                    self._index.set_description(topic_id, topic_description)
+                    self._record(
+                        DESCRIPTION_CHANGED, topic_id, description=topic_description
+                    )
             chunk = Chunk(blurb=chunk_blurb, content=chunk_content)
-            self._topics[topic_id].chunk_stack.append(chunk)
+            topic = self._topics[topic_id]
+            topic.chunk_stack.append(chunk)
+            self._index.add_chunk(topic_id, chunk.blurb, chunk.content)
+            self._record(
+                CHUNK_APPENDED,
+                topic_id,
+                index=len(topic.chunk_stack) - 1,
+                blurb=chunk.blurb,
+                content=chunk.content,
+            )
 
     def update_description(self, topic_id: str, description: str) -> None:
         with self._lock:
             if topic_id not in self._topics:
                 self._topics[topic_id] = Topic(description=description)
+            elif self._topics[topic_id].description == description:
+                return
             else:
                 self._topics[topic_id].description = description
+            self._index.set_description(topic_id, description)
+            self._record(DESCRIPTION_CHANGED, topic_id, description=description)
+
+    def set_recommendations(self, topic_id: str, recommendations: List[str]) -> None:
+        with self._lock:
+            if topic_id not in self._topics:
+                return
+            self._topics[topic_id].recommendations = list(recommendations)
+            self._record(
+                RECOMMENDATIONS_REPLACED,
+                topic_id,
+                recommendations=list(recommendations),
+            )
+
+    def drain_updates(self) -> List[TopicUpdate]:
+        """Return and forget every change recorded since the last drain."""
+        with self._lock:
+            updates = self._pending_updates
+            self._pending_updates = []
+            return updates
+
+    def snapshot(self) -> Tuple[int, Dict[str, Topic]]:
+        """Copy of all topics together with the sequence number of the last
+        change they include; updates with a higher seq are not reflected."""
+        with self._lock:
+            return self._version, {
+                topic_id: Topic(
+                    description=topic.description,
+                    chunk_stack=list(topic.chunk_stack),
+                    recommendations=list(topic.recommendations),
+                )
+                for topic_id, topic in self._topics.items()
+            }
+
+    def restore(self, version: int, topics: Dict[str, Topic]) -> None:
+        """Replace all topics with previously saved state. Nothing is added to
+        the update journal; subscribers pick the state up from snapshots."""
+        with self._lock:
+            self._topics = dict(topics)
+            self._version = max(self._version, version)
+            # Recency is not saved; restored topics rank as equally old
+            self._last_changed.clear()
+            self._index.clear()
+            for topic_id, topic in self._topics.items():
+                self._index.set_description(topic_id, topic.description)
+                for chunk in topic.chunk_stack[-self._index.recent:]:
+                    self._index.add_chunk(topic_id, chunk.blurb, chunk.content)
+            self._pending_updates.clear()
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
 
     def get_topic_summaries(self) -> Dict[str, str]:
         with self._lock:
@@ -56,6 +166,27 @@ class TopicManager:
                 formatted += f"- {topic_id}: {topic.description}\n"
             return formatted.strip()
 
+    def get_topic_digests(self, recent_blurbs: int = 3) -> List[TopicDigest]:
+        with self._lock:
+            return [
+                TopicDigest(
+                    topic_id=topic_id,
+                    description=topic.description,
+                    last_changed=self._last_changed.get(topic_id, 0),
+                    recent_blurbs=[chunk.blurb for chunk in topic.chunk_stack[-recent_blurbs:]],
+                )
+                for topic_id, topic in self._topics.items()
+            ]
+
+    def match_topic(self, text: str) -> Optional[TopicMatch]:
+        """The existing topic `text` is most similar to, by local embedding."""
+        with self._lock:
+            return self._index.match(text)
+
+    def summarize_chunk(self, text: str) -> str:
+        with self._lock:
+            return self._index.summarize(text)
+
     def get_all_topics(self) -> Dict[str, Topic]:
         with self._lock:
             return {topic_id: topic for topic_id, topic in self._topics.items()}
@@ -82,3 +213,6 @@ class TopicManager:
     def clear(self) -> None:
         with self._lock:
             self._topics.clear()
+            self._pending_updates.clear()
+            self._last_changed.clear()
+            self._index.clear()
@@ -1,12 +1,32 @@
+import itertools
 import time
+import queue
 import threading
 import logging
-from typing import Generator, Optional, Callable, Dict
+from collections import deque
+from concurrent.futures import CancelledError
+from typing import Deque, Generator, List, Optional, Callable, Dict, Tuple
 from dataclasses import dataclass
 from google.cloud import speech_v1 as speech
-from audio_streams import AudioStream
+from chunk_pipeline import ChunkingPipeline
 from chunking import chunk_transcript_by_topics
+from dump_scheduler import DumpScheduler
+from topic_index import TopicMatch, is_transition
 from topic_manager import TopicManager
+from transcript_buffer import TranscriptBuffer
+from transcript_store import TranscriptStore
+from vad import VoiceActivityDetector, SPEECH_END
+from metrics import (
+    metrics,
+    STAGE_STT_ROUNDTRIP,
+    STAGE_INTERIM_TO_FINAL,
+    COUNTER_DUMPS,
+    COUNTER_PROMPT_TOKENS,
+    COUNTER_PROMPT_TOKENS_SAVED,
+    COUNTER_TOPIC_FAST_PATH,
+    COUNTER_TOPIC_FAST_PATH_AUDITS,
+    COUNTER_TOPIC_FAST_PATH_AGREED,
+)
 
 import dotenv
 
@@ -22,6 +42,14 @@ class TranscriberConfig:
     encoding: speech.RecognitionConfig.AudioEncoding = (
         speech.RecognitionConfig.AudioEncoding.LINEAR16
     )
+    # Dump scheduling: aim for finalized speech to be chunked within
+    # dump_target_latency seconds, with at most max_dumps_per_minute LLM
+    # calls. min_word_count is the smallest batch worth dumping ahead of the
+    # deadline. With dump_target_latency <= 0, dump every min_word_count
+    # words / min_time_since_dump seconds instead.
+    dump_target_latency: float = 15.0
+    max_dumps_per_minute: int = 6
+    dump_max_words: int = 400
     min_word_count: int = 10
     min_time_since_dump: float = 5.0
     enable_automatic_punctuation: bool = True
@@ -29,6 +57,40 @@ class TranscriberConfig:
     vertex_project_id: Optional[str] = None
     vertex_location: str = "us-central1"
     restart_interval_seconds: float = 300.0
+    # Half-close the stream after this long without audio; a new one opens
+    # when audio resumes
+    stream_idle_timeout: float = 5.0
+    # Chunks buffered between the ingest worker and the streaming request
+    # generator; a full queue blocks the feeder, which pushes back on the phone
+    audio_queue_size: int = 16
+    # Upper bound on not-yet-finalized audio kept for replay into a new stream
+    max_replay_seconds: float = 30.0
+    # Voice-activity detection: only speech (plus padding) is sent to STT
+    vad_enabled: bool = True
+    vad_frame_ms: int = 20
+    vad_energy_threshold_db: float = -45.0
+    vad_zcr_threshold: float = 0.3
+    vad_onset_ms: int = 40
+    vad_hangover_ms: int = 400
+    vad_padding_ms: int = 200
+    # Dumps being chunked at once; later speech keeps accumulating meanwhile
+    max_chunking_in_flight: int = 2
+    # Long-term transcript spill file location (system temp dir if None) and
+    # how much recent text stays in memory
+    transcript_spill_dir: Optional[str] = None
+    transcript_tail_bytes: int = 16384
+    # Local topic fast path: a dump of at least topic_fast_path_min_words
+    # words whose embedding matches one existing topic with this similarity,
+    # ahead of the next best by topic_fast_path_margin, is assigned to it
+    # without an LLM call (0 = off). Every topic_fast_path_audit_every-th
+    # match is still sent to the LLM to measure agreement (0 = never).
+    topic_fast_path_threshold: float = 0.3
+    topic_fast_path_margin: float = 0.15
+    topic_fast_path_min_words: int = 12
+    topic_fast_path_audit_every: int = 10
+    # Stream chunking responses and apply each topic assignment as soon as
+    # it is parsed instead of waiting for the whole result
+    stream_chunking: bool = False
 
 
 class Transcriber:
@@ -36,42 +98,104 @@ class Transcriber:
         self,
         topic_manager: TopicManager,
         config: Optional[TranscriberConfig] = None,
-        on_working_buffer_update: Optional[Callable[[str], None]] = None,
+        on_working_buffer_update: Optional[Callable[[TranscriptBuffer], None]] = None,
         on_dump: Optional[Callable[[str], None]] = None,
         on_chunks_produced: Optional[Callable[[Dict[str, str]], None]] = None,
         previous_recommendations: Optional[Dict[str, str]] = None,
+        session_id: str = "default",
+        on_speech_event: Optional[Callable[[str], None]] = None,
     ):
         self.topic_manager = topic_manager
+        self.session_id = session_id
         self.config = config or TranscriberConfig()
         self.on_working_buffer_update = on_working_buffer_update
         self.on_dump = on_dump
         self.on_chunks_produced = on_chunks_produced
+        self.on_speech_event = on_speech_event
         self.previous_recommendations = previous_recommendations
-        self.working_buffer: str = ""
-        self.long_term_buffer: str = ""
+        # Finalized segments plus the current interim; rendered to a string
+        # only when the text is actually needed
+        self.transcript = TranscriptBuffer()
+        # Everything already sent for chunking, on disk with a small memory tail
+        self.long_term = TranscriptStore(
+            directory=self.config.transcript_spill_dir,
+            tail_bytes=self.config.transcript_tail_bytes,
+        )
 
-        self._last_interim_text: str = ""
-        self._last_dump_time: float = time.time()
+        self.scheduler = DumpScheduler(
+            target_latency=self.config.dump_target_latency,
+            max_dumps_per_minute=self.config.max_dumps_per_minute,
+            min_words=self.config.min_word_count,
+            max_words=self.config.dump_max_words,
+            min_interval=self.config.min_time_since_dump,
+            max_in_flight=self.config.max_chunking_in_flight,
+        )
+        self.scheduler.reset(time.time())
         self._stream_start_time: float = time.time()
         self._is_running = False
+        # Set by stop() until the next explicit start(), and by close() for
+        # good; feed() only starts a stream when neither is set
+        self._stopped = False
+        self._closed = False
         self._needs_restart = False
         self._transcription_thread: Optional[threading.Thread] = None
         self._lock = threading.Lock()
+        self._dump_lock = threading.Lock()
+        self._fast_path_matches = itertools.count(1)
+
+        # Audio waiting for the current stream, and audio already sent to it
+        # whose transcript is not final yet (stream end offset, chunk). The
+        # latter is replayed into the next stream on rotation so nothing is lost.
+        self._audio_queue: queue.Queue = queue.Queue(maxsize=self.config.audio_queue_size)
+        self._unfinalized: Deque[Tuple[float, bytes]] = deque()
+        self._replay_lock = threading.Lock()
+        self._stream_audio_seconds: float = 0.0
+        self._last_request_time: Optional[float] = None
+        self._current_call = None
+
+        # LLM chunking runs off the transcription thread, results applied in order
+        self.chunking = ChunkingPipeline(
+            self._chunk_text,
+            self._apply_chunking,
+            max_in_flight=self.config.max_chunking_in_flight,
+            name=session_id,
+            apply_partial=self._apply_assignment,
+        )
+
+        self.vad: Optional[VoiceActivityDetector] = None
+        if self.config.vad_enabled:
+            self.vad = VoiceActivityDetector(
+                sample_rate=self.config.sample_rate_hertz,
+                frame_ms=self.config.vad_frame_ms,
+                energy_threshold_db=self.config.vad_energy_threshold_db,
+                zcr_threshold=self.config.vad_zcr_threshold,
+                onset_ms=self.config.vad_onset_ms,
+                hangover_ms=self.config.vad_hangover_ms,
+                padding_ms=self.config.vad_padding_ms,
+            )
 
         self.client = speech.SpeechClient()
 
+    @property
+    def working_buffer(self) -> str:
+        return self.transcript.render()
+
+    @property
+    def long_term_buffer(self) -> str:
+        return self.long_term.text()
+
     def dump_ready(self) -> bool:
         with self._lock:
-            if not self.working_buffer:
+            word_count = self.transcript.final_word_count
+            if not word_count or not self.chunking.has_capacity():
                 return False
+            return self.scheduler.should_dump(word_count, self.chunking.in_flight(), time.time())
 
-            word_count = len(self.working_buffer.split())
-            time_since_dump = time.time() - self._last_dump_time
-
-            return (
-                word_count >= self.config.min_word_count
-                and time_since_dump >= self.config.min_time_since_dump
-            )
+    def _maybe_dump(self) -> None:
+        # Called from both the response loop and the request generator
+        with self._dump_lock:
+            if self.dump_ready():
+                self._dump_to_long_term()
 
     def _should_restart_stream(self) -> bool:
         if self.config.restart_interval_seconds <= 0:
@@ -80,91 +204,178 @@ class Transcriber:
         time_since_start = time.time() - self._stream_start_time
         return time_since_start >= self.config.restart_interval_seconds
 
-    def _dump_to_long_term(self) -> None:
+    def _dump_to_long_term(
+        self, block: bool = False, timeout: Optional[float] = None, include_interim: bool = False
+    ) -> bool:
+        """Hand the finalized part of the working buffer (all of it with
+        `include_interim`) to the chunking pipeline. Returns False, leaving
+        the buffer to keep growing, when the pipeline already has its
+        maximum number of dumps in flight."""
         with self._lock:
-            if not self.working_buffer:
-                return
+            if include_interim:
+                text_to_chunk = self.transcript.render()
+                word_count = self.transcript.word_count
+            else:
+                text_to_chunk = self.transcript.render_final()
+                word_count = self.transcript.final_word_count
+            if not text_to_chunk:
+                return False
+            if not self.chunking.submit(text_to_chunk, block=block, timeout=timeout):
+                return False
 
-            text_to_chunk = self.working_buffer
-            dumped_text = self.working_buffer
+            if include_interim:
+                self.transcript.clear()
+            else:
+                self.transcript.clear_final()
+            self.scheduler.record_dump(time.time())
 
-        logger.info("Dumping working buffer to long-term")
+        logger.info(
+            f"Dumping working buffer to long-term ({word_count} words, "
+            f"{self.chunking.in_flight()} dump(s) in flight)"
+        )
         logger.debug(f"Text to chunk: {text_to_chunk[:100]}...")
-        logger.debug(f"Word count: {len(text_to_chunk.split())}")
+        return True
+
+    def _chunk_text(self, text_to_chunk: str) -> Dict:
+        """Runs on a chunking worker thread."""
+        match = self._match_topic_locally(text_to_chunk)
+        audit = False
+        if match is not None:
+            metrics.inc(self.session_id, COUNTER_TOPIC_FAST_PATH)
+            audit_every = self.config.topic_fast_path_audit_every
+            audit = audit_every > 0 and next(self._fast_path_matches) % audit_every == 0
+            if not audit:
+                metrics.inc(self.session_id, COUNTER_DUMPS)
+                return self._assign_locally(text_to_chunk, match)
+
+        existing_topics = self.topic_manager.get_topic_digests()
+        logger.debug(f"Existing topics: {[digest.topic_id for digest in existing_topics]}")
+
+        started = time.time()
+        result = chunk_transcript_by_topics(
+            text_to_chunk,
+            existing_topics=existing_topics,
+            project_id=self.config.vertex_project_id,
+            location=self.config.vertex_location,
+            previous_recommendations=self.previous_recommendations,
+            on_assignment=self.chunking.emit if self.config.stream_chunking else None,
+        )
 
-        try:
-            existing_topics = self.topic_manager.get_topic_summaries_formatted()
-            logger.debug(f"Existing topics:\n{existing_topics}")
-
-            result = chunk_transcript_by_topics(
-                text_to_chunk,
-                existing_topics=existing_topics,
-                project_id=self.config.vertex_project_id,
-                location=self.config.vertex_location,
-                previous_recommendations=self.previous_recommendations,
+        # A cache hit says nothing about how long the LLM takes
+        if not result.get("cached"):
+            self.scheduler.observe_latency(time.time() - started)
+
+        if audit:
+            # Agreement means the LLM put every complete chunk in the matched topic
+            agreed = set(result.get("complete_chunks", {})) == {match.topic_id}
+            metrics.inc(self.session_id, COUNTER_TOPIC_FAST_PATH_AUDITS)
+            if agreed:
+                metrics.inc(self.session_id, COUNTER_TOPIC_FAST_PATH_AGREED)
+            logger.info(
+                f"Fast path audit: local {match.topic_id} ({match.score:.2f}), "
+                f"LLM {list(result.get('complete_chunks', {}))}, {'agreed' if agreed else 'disagreed'}"
             )
 
-            logger.debug(f"Chunking result: {result}")
+        logger.debug(f"Chunking result: {result}")
+        metrics.inc(self.session_id, COUNTER_DUMPS)
+        metrics.inc(self.session_id, COUNTER_PROMPT_TOKENS, result.get("prompt_tokens", 0))
+        metrics.inc(self.session_id, COUNTER_PROMPT_TOKENS_SAVED, result.get("prompt_tokens_saved", 0))
+        return result
+
+    def _match_topic_locally(self, text: str) -> Optional[TopicMatch]:
+        """A topic the text clearly belongs to, or None when the LLM should
+        decide (fast path off, too little text, a topic transition, or no
+        confident match)."""
+        threshold = self.config.topic_fast_path_threshold
+        if threshold <= 0 or len(text.split()) < self.config.topic_fast_path_min_words:
+            return None
+        if is_transition(text):
+            return None
+        match = self.topic_manager.match_topic(text)
+        if match is None or match.score < threshold or match.margin < self.config.topic_fast_path_margin:
+            return None
+        return match
+
+    def _assign_locally(self, text: str, match: TopicMatch) -> Dict:
+        """The whole dump as one chunk of the matched topic, with an
+        extractive blurb; same shape as a chunking result."""
+        content = " ".join(text.split())
+        blurb = self.topic_manager.summarize_chunk(content)
+        logger.info(f"Fast path: assigned dump to {match.topic_id} (similarity {match.score:.2f}, margin {match.margin:.2f})")
+        return {
+            "complete_chunks": {match.topic_id: [content]},
+            "chunk_blurbs": {match.topic_id: [blurb]},
+            "incomplete_text": "",
+            "topic_descriptions": {},
+            "prompt_tokens": 0,
+            "prompt_tokens_saved": 0,
+            "fast_path": True,
+        }
+
+    def _add_chunk(self, topic_id: str, content: str, blurb: str, description: str) -> None:
+        self.topic_manager.add_chunk(
+            topic_id=topic_id,
+            chunk_content=content,
+            chunk_blurb=blurb,
+            topic_description=description,
+        )
+        logger.info(
+            f"Added chunk to topic: {topic_id} with blurb: '{blurb}'"
+        )
 
-            complete_chunks = result.get("complete_chunks", {})
-            chunk_blurbs = result.get("chunk_blurbs", {})
-            incomplete_text = result.get("incomplete_text", "")
-            topic_descriptions = result.get("topic_descriptions", {})
+    def _apply_assignment(self, dumped_text: str, assignment) -> None:
+        """Apply one streamed topic assignment. Called in dump order, before
+        the rest of its dump's result."""
+        topic_id = assignment.existing_topic_id or assignment.new_topic_id
+        description = assignment.updated_description or ""
+        self._add_chunk(topic_id, assignment.chunk_content, assignment.chunk_blurb, description)
+        if description:
+            self.topic_manager.update_description(topic_id, description)
+        if self.on_chunks_produced:
+            self.on_chunks_produced({topic_id: [assignment.chunk_content]})
+
+    def _apply_chunking(self, dumped_text: str, result: Optional[Dict], error: Optional[BaseException]) -> None:
+        """Apply one dump's chunking result. Called in dump order."""
+        if isinstance(error, CancelledError):
+            logger.info("Chunking cancelled on shutdown, keeping text as long-term transcript")
+            self.long_term.append(dumped_text)
+            return
+        if error is not None:
+            logger.error(f"Error chunking transcript: {error}", exc_info=error)
+            self.long_term.append(dumped_text)
+            if self.on_dump:
+                self.on_dump(dumped_text)
+            return
 
-            logger.info(f"Complete chunks: {list(complete_chunks.keys())}")
-            logger.debug(f"Incomplete text length: {len(incomplete_text)}")
-            logger.debug(f"Topic descriptions: {list(topic_descriptions.keys())}")
+        complete_chunks = result.get("complete_chunks", {})
+        chunk_blurbs = result.get("chunk_blurbs", {})
+        incomplete_text = result.get("incomplete_text", "")
+        topic_descriptions = result.get("topic_descriptions", {})
 
-            with self._lock:
-                if complete_chunks:
-                    for topic_id, contents in complete_chunks.items():
-                        blurbs = chunk_blurbs.get(topic_id, [])
-                        description = topic_descriptions.get(topic_id, "")
-
-                        for content, blurb in zip(contents, blurbs):
-                            self.topic_manager.add_chunk(
-                                topic_id=topic_id,
-                                chunk_content=content,
-                                chunk_blurb=blurb,
-                                topic_description=description,
-                            )
-                            logger.info(
-                                f"Added chunk to topic: {topic_id} with blurb: '{blurb}'"
-                            )
-
-                        if description:
-                            logger.info(f"Updated description for topic {topic_id}")
-
-                    if self.on_chunks_produced:
-                        self.on_chunks_produced(complete_chunks)
-
-                if self.long_term_buffer and incomplete_text:
-                    self.long_term_buffer += " " + incomplete_text
-                elif incomplete_text:
-                    self.long_term_buffer = incomplete_text
-
-                self.working_buffer = ""
-                self._last_interim_text = ""
-                self._last_dump_time = time.time()
+        logger.info(f"Complete chunks: {list(complete_chunks.keys())}")
+        logger.debug(f"Incomplete text length: {len(incomplete_text)}")
+        logger.debug(f"Topic descriptions: {list(topic_descriptions.keys())}")
 
-            if self.on_dump:
-                self.on_dump(dumped_text)
+        # Streamed chunks were applied as they arrived (_apply_assignment)
+        if complete_chunks and not result.get("streamed"):
+            for topic_id, contents in complete_chunks.items():
+                blurbs = chunk_blurbs.get(topic_id, [])
+                description = topic_descriptions.get(topic_id, "")
 
-        except Exception as e:
-            logger.error(f"Error chunking transcript: {e}", exc_info=True)
+                for content, blurb in zip(contents, blurbs):
+                    self._add_chunk(topic_id, content, blurb, description)
 
-            with self._lock:
-                if self.long_term_buffer:
-                    self.long_term_buffer += " " + self.working_buffer
-                else:
-                    self.long_term_buffer = self.working_buffer
+                if description:
+                    self.topic_manager.update_description(topic_id, description)
+                    logger.info(f"Updated description for topic {topic_id}")
 
-                self.working_buffer = ""
-                self._last_interim_text = ""
-                self._last_dump_time = time.time()
+            if self.on_chunks_produced:
+                self.on_chunks_produced(complete_chunks)
 
-            if self.on_dump:
-                self.on_dump(dumped_text)
+        self.long_term.append(incomplete_text)
+
+        if self.on_dump:
+            self.on_dump(dumped_text)
 
     def _create_streaming_config(self) -> speech.StreamingRecognitionConfig:
         recognition_config = speech.RecognitionConfig(
@@ -179,23 +390,84 @@ class Transcriber:
         )
         return streaming_config
 
+    def _chunk_seconds(self, chunk: bytes) -> float:
+        # LINEAR16 mono: two bytes per sample
+        return len(chunk) / (2 * self.config.sample_rate_hertz)
+
+    def _send_chunk(self, chunk: bytes) -> speech.StreamingRecognizeRequest:
+        with self._replay_lock:
+            self._stream_audio_seconds += self._chunk_seconds(chunk)
+            self._unfinalized.append((self._stream_audio_seconds, chunk))
+            while (
+                self._unfinalized
+                and self._stream_audio_seconds - self._unfinalized[0][0] > self.config.max_replay_seconds
+            ):
+                self._unfinalized.popleft()
+        self._last_request_time = time.perf_counter()
+        return speech.StreamingRecognizeRequest(audio_content=chunk)
+
     def _audio_generator(
-        self,
+        self, replay: List[bytes]
     ) -> Generator[speech.StreamingRecognizeRequest, None, None]:
-        """for audio_chunk in self.audio_stream.get_chunk_generator():
-            print(f"Audio chunk: {audio_chunk}")
-            if not self._is_running:
-                break
-            if not isinstance(audio_chunk, bytes):
-                raise TypeError(f"Audio chunk must be bytes, got {type(audio_chunk)}")
-            if len(audio_chunk) == 0:
+        """Requests for one streaming call: first any audio replayed from the
+        previous stream, then live audio until the stream is due for rotation,
+        goes idle, or the transcriber stops."""
+        for chunk in replay:
+            yield self._send_chunk(chunk)
+
+        last_audio_time = time.time()
+        while self._is_running:
+            if self._should_restart_stream():
+                self._needs_restart = True
+                return
+            try:
+                chunk = self._audio_queue.get(timeout=0.1)
+            except queue.Empty:
+                if time.time() - last_audio_time >= self.config.stream_idle_timeout:
+                    return
+                # Nothing arriving (e.g. silence dropped by VAD): the dump
+                # deadline still has to be honored
+                self._maybe_dump()
+                continue
+            if chunk is None:
+                return
+            if len(chunk) == 0:
                 continue
-            yield speech.StreamingRecognizeRequest(audio_content=audio_chunk)"""
+            last_audio_time = time.time()
+            yield self._send_chunk(chunk)
+
+    def _mark_finalized(self, result_end_seconds: float) -> None:
+        """Forget audio the recognizer has produced a final result for."""
+        # result_end_time comes back through a protobuf Duration, so allow for
+        # rounding against our float offsets
+        result_end_seconds += 0.005
+        with self._replay_lock:
+            while self._unfinalized and self._unfinalized[0][0] <= result_end_seconds:
+                self._unfinalized.popleft()
+
+    def _take_replay(self) -> List[bytes]:
+        with self._replay_lock:
+            replay = [chunk for _, chunk in self._unfinalized]
+            self._unfinalized.clear()
+            self._stream_audio_seconds = 0.0
+            return replay
+
+    def _discard_interim(self) -> None:
+        """Drop the trailing interim text; the replayed audio will produce it again."""
+        with self._lock:
+            self.transcript.discard_interim()
 
     def _process_responses(
         self, responses: Generator[speech.StreamingRecognizeResponse, None, None]
     ) -> None:
         for response in responses:
+            # After rotation, results from the old stream are superseded by the
+            # replay into the new one
+            if self._needs_restart:
+                break
+
+            # A deadline may have passed since the last response
+            self._maybe_dump()
 
             if not response.results:
                 continue
@@ -208,130 +480,246 @@ class Transcriber:
             transcript = result.alternatives[0].transcript
             is_final = result.is_final
 
+            if is_final:
+                self._mark_finalized(result.result_end_time.total_seconds())
+
             with self._lock:
                 if is_final:
-                    if self.working_buffer and self._last_interim_text:
-                        final_text = self.working_buffer[
-                            : -len(self._last_interim_text)
-                        ]
-                        if final_text:
-                            self.working_buffer = final_text + " " + transcript
-                        else:
-                            self.working_buffer = transcript
-                    else:
-                        if self.working_buffer:
-                            self.working_buffer += " " + transcript
-                        else:
-                            self.working_buffer = transcript
-                    self._last_interim_text = ""
+                    segment = self.transcript.finalize(transcript)
+                    if segment.interim_to_final is not None:
+                        metrics.observe(STAGE_INTERIM_TO_FINAL, segment.interim_to_final)
+                    if segment.word_count:
+                        self.scheduler.observe_final(segment.word_count, time.time())
                 else:
-                    if self._last_interim_text:
-                        base_text = self.working_buffer[: -len(self._last_interim_text)]
-                    else:
-                        base_text = self.working_buffer
-
-                    if base_text and transcript:
-                        self.working_buffer = base_text + " " + transcript
-                    elif transcript:
-                        self.working_buffer = transcript
-                    else:
-                        self.working_buffer = base_text
-
-                    self._last_interim_text = (
-                        " " + transcript if base_text and transcript else transcript
-                    )
+                    self.transcript.set_interim(transcript)
 
                 if self.on_working_buffer_update:
-                    self.on_working_buffer_update(self.working_buffer)
-
-            if is_final and self.dump_ready():
-                self._dump_to_long_term()
-
-    def _transcription_loop(self, audio_element) -> None:
-
-        try:
-            self._stream_start_time = time.time()
-            self._needs_restart = False
-
-            logger.info(
-                f"Starting transcription stream (restart interval: {self.config.restart_interval_seconds}s)"
-            )
-
-            streaming_config = self._create_streaming_config()
+                    self.on_working_buffer_update(self.transcript)
 
-            responses = self.client.streaming_recognize(
-                config=streaming_config, requests=[speech.StreamingRecognizeRequest(audio_content=audio_element)]
-            )
-            self._process_responses(responses)
-
-            if self._needs_restart and self._is_running:
-                logger.info("Performing stream restart: dumping working buffer")
-                if self.working_buffer:
-                    self._dump_to_long_term()
-                logger.info("Stream restart complete, restarting recognition")
+            self._maybe_dump()
 
+    def _timed_responses(
+        self,
+        responses: Generator[speech.StreamingRecognizeResponse, None, None],
+    ) -> Generator[speech.StreamingRecognizeResponse, None, None]:
+        """Pass responses through, recording the STT round-trip from the most
+        recent audio request to each response."""
+        for response in responses:
+            if self._last_request_time is not None:
+                metrics.observe(STAGE_STT_ROUNDTRIP, time.perf_counter() - self._last_request_time)
+            yield response
+
+    def _wait_for_audio(self) -> Optional[bytes]:
+        """Block until audio arrives so no stream is held open while idle."""
+        while self._is_running:
+            try:
+                chunk = self._audio_queue.get(timeout=0.5)
+            except queue.Empty:
+                self._maybe_dump()
+                continue
+            if chunk is None:
+                return None
+            if len(chunk):
+                return chunk
+        return None
+
+    def _transcription_loop(self) -> None:
+        """One long-lived streaming_recognize call at a time, rotated every
+        restart_interval_seconds. On rotation (or an error) the new stream is
+        opened straight away and fed the audio the old one had not finalized."""
+        replay_unfinalized = False
+        while self._is_running:
+            # Only a rotated or failed stream hands its audio on; after a
+            # normal half-close the recognizer already flushed what it could
+            replay = self._take_replay()
+            if not replay_unfinalized:
+                replay = []
+            replay_unfinalized = False
+            if not replay:
+                first_chunk = self._wait_for_audio()
+                if first_chunk is None:
+                    break
+                replay = [first_chunk]
+
+            try:
+                self._stream_start_time = time.time()
+                self._needs_restart = False
+
+                logger.info(
+                    f"Starting transcription stream (restart interval: {self.config.restart_interval_seconds}s, "
+                    f"replaying {len(replay)} chunk(s))"
+                )
+
+                streaming_config = self._create_streaming_config()
+                self._current_call = self.client.streaming_recognize(
+                    config=streaming_config, requests=self._audio_generator(replay)
+                )
+                self._process_responses(self._timed_responses(self._current_call))
+
+                if self._needs_restart:
+                    logger.info("Rotating transcription stream")
+                    if hasattr(self._current_call, "cancel"):
+                        self._current_call.cancel()
+                    self._discard_interim()
+                    replay_unfinalized = True
+
+            except Exception as e:
+                logger.error(f"Transcription error: {e}", exc_info=True)
+                self._discard_interim()
+                replay_unfinalized = True
+                if self._is_running:
+                    logger.warning("Error in transcription, restarting in 2 seconds...")
+                    time.sleep(2)
+            finally:
+                self._current_call = None
+
+        logger.info("Transcription loop exited")
+
+    def feed(self, audio: bytes) -> None:
+        """Queue audio for the running stream, starting a fresh transcriber's
+        stream if needed (audio fed after stop() is dropped). Blocks while
+        the queue is full. Silence is dropped here when VAD is enabled."""
+        # Binary frames arrive as memoryviews into the WebSocket message;
+        # protobuf needs bytes, so this is the single copy of the audio
+        if isinstance(audio, memoryview):
+            audio = audio.tobytes()
+
+        if self.vad is not None:
+            audio, events = self.vad.process(audio)
+            for event in events:
+                if event == SPEECH_END:
+                    logger.info(
+                        f"Speech ended ({self.vad.suppressed_fraction:.0%} of audio suppressed so far)"
+                    )
+                if self.on_speech_event:
+                    self.on_speech_event(event)
+            if not audio:
+                return
 
-        except Exception as e:
-            logger.error(f"Transcription error: {e}", exc_info=True)
-            if self._is_running:
-                logger.warning("Error in transcription, restarting in 2 seconds...")
-                time.sleep(2)
+        if not self._is_running:
+            # Only a fresh transcriber starts on demand; after stop() audio
+            # is dropped until start() is called explicitly
+            if self._stopped or self._closed:
+                logger.debug("Dropping audio fed to a stopped transcriber")
+                return
+            self.start()
+        self._audio_queue.put(audio)
 
+    @property
+    def is_running(self) -> bool:
+        return self._is_running
 
     def start(self) -> None:
         if self._is_running:
             return
+        if self._closed:
+            raise RuntimeError(f"Transcriber for session {self.session_id} is closed")
+        self._stopped = False
+
+        previous = self._transcription_thread
+        if previous is not None and previous is not threading.current_thread():
+            # A stopped loop still reads self._audio_queue until it notices;
+            # wait for it (its stream half-closes once _is_running is False)
+            # so two loops never share the queue
+            previous.join()
+        # The last run's stop sentinel may still be queued
+        self._audio_queue = queue.Queue(maxsize=self.config.audio_queue_size)
 
         self._is_running = True
-        self.audio_stream.start()
 
         self._transcription_thread = threading.Thread(
-            target=self._transcription_loop, daemon=True
+            target=self._transcription_loop, name=f"transcriber-{self.session_id}", daemon=True
         )
         self._transcription_thread.start()
         logger.info("Transcription thread started")
 
-    def stop(self) -> None:
+    def stop(self, timeout: Optional[float] = 5.0, dump: bool = True) -> None:
+        """Stop streaming. With timeout=None the thread is left to exit on its
+        own (a later start() waits for it); with dump=False the working
+        buffer is not sent for chunking. Audio fed afterwards is dropped
+        until start() is called again."""
+        self._stopped = True
         if not self._is_running:
             return
 
         self._is_running = False
-        self.audio_stream.stop()
+        while True:
+            try:
+                self._audio_queue.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            self._audio_queue.put_nowait(None)
+        except queue.Full:
+            pass
 
-        if self._transcription_thread:
-            self._transcription_thread.join(timeout=5.0)
-            self._transcription_thread = None
+        # The thread is kept so a later start() can wait for it to exit
+        if self._transcription_thread and timeout is not None:
+            self._transcription_thread.join(timeout=timeout)
 
-        if self.working_buffer:
-            self._dump_to_long_term()
+        if dump and self.transcript:
+            self._dump_to_long_term(block=True, timeout=timeout, include_interim=True)
+        if timeout is not None and not self.chunking.wait(timeout):
+            logger.warning(f"Stopped with {self.chunking.in_flight()} chunking dump(s) still in flight")
+        self.chunking.shutdown()
 
         logger.info("Transcription stopped")
 
     def get_working_buffer_text(self) -> str:
+        """Everything not chunked yet: dumps still in the pipeline, then the
+        live working buffer."""
         with self._lock:
-            return self.working_buffer
+            parts = self.chunking.pending_texts()
+            parts.append(self.transcript.render())
+        return " ".join(part for part in parts if part)
 
     def get_long_term_buffer_text(self) -> str:
-        with self._lock:
-            return self.long_term_buffer
+        return self.long_term.text()
+
+    def get_recent_transcript(self, words: int) -> str:
+        """The last `words` words, long-term and working buffer together,
+        without reading the whole long-term transcript."""
+        working = self.get_working_buffer_text()
+        working_words = len(working.split())
+        if working_words >= words:
+            return " ".join(working.split()[-words:])
+        earlier = self.long_term.last_words(words - working_words)
+        return f"{earlier} {working}" if earlier and working else earlier or working
 
     def get_full_transcript(self) -> str:
+        working = self.get_working_buffer_text()
+        long_term = self.long_term.text()
+        if long_term and working:
+            return long_term + " " + working
+        return long_term or working
+
+    def restore_buffers(
+        self,
+        long_term_buffer: str = "",
+        working_buffer: str = "",
+        previous_recommendations: Optional[Dict[str, str]] = None,
+    ) -> None:
         with self._lock:
-            if self.long_term_buffer and self.working_buffer:
-                return self.long_term_buffer + " " + self.working_buffer
-            elif self.long_term_buffer:
-                return self.long_term_buffer
-            else:
-                return self.working_buffer
+            self.long_term.reset(long_term_buffer)
+            self.transcript.reset(working_buffer)
+            self.scheduler.reset(time.time(), pending=bool(working_buffer))
+            self.previous_recommendations = previous_recommendations
 
     def clear_buffers(self) -> None:
         with self._lock:
-            self.working_buffer = ""
-            self.long_term_buffer = ""
-            self._last_interim_text = ""
-            self._last_dump_time = time.time()
+            self.transcript.clear()
+            self.long_term.reset()
+            self.scheduler.reset(time.time())
             self._stream_start_time = time.time()
 
+    def close(self) -> None:
+        """Release the chunking workers and the long-term transcript's spill
+        file. Audio fed afterwards is dropped, and so are chunking results
+        still to come: nothing is applied to the closed store."""
+        self._closed = True
+        self.chunking.close()
+        self.long_term.close()
+
     def __enter__(self):
         self.start()
         return self
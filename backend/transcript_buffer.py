@@ -0,0 +1,116 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class Segment:
+    text: str
+    word_count: int
+    # perf_counter times: when the first interim for this utterance arrived
+    # (None if the recognizer went straight to a final) and when it was finalized
+    first_interim_at: Optional[float] = None
+    finalized_at: Optional[float] = None
+
+    @property
+    def interim_to_final(self) -> Optional[float]:
+        if self.first_interim_at is None or self.finalized_at is None:
+            return None
+        return self.finalized_at - self.first_interim_at
+
+
+class TranscriptBuffer:
+    """Working transcript as a list of finalized segments plus at most one
+    interim segment that the recognizer keeps revising.
+
+    Word and character counts are maintained as segments change, so checking
+    them is O(1); the full text is only built when `render()` is called.
+    Not thread-safe; the Transcriber guards it with its own lock."""
+
+    def __init__(self):
+        self.segments: List[Segment] = []
+        self.interim: Optional[Segment] = None
+        self._final_words = 0
+        # Rendered length of the finalized segments, separators included
+        self._final_chars = 0
+        self._final_nonempty = 0
+
+    @property
+    def word_count(self) -> int:
+        return self._final_words + (self.interim.word_count if self.interim else 0)
+
+    @property
+    def final_word_count(self) -> int:
+        return self._final_words
+
+    @property
+    def char_count(self) -> int:
+        chars = self._final_chars
+        if self.interim and self.interim.text:
+            chars += len(self.interim.text) + (1 if self._final_nonempty else 0)
+        return chars
+
+    @property
+    def latest_text(self) -> str:
+        """The interim segment, or the last finalized one if there is none."""
+        if self.interim is not None:
+            return self.interim.text
+        return self.segments[-1].text if self.segments else ""
+
+    def __bool__(self) -> bool:
+        return self.char_count > 0
+
+    def set_interim(self, text: str, now: Optional[float] = None) -> None:
+        now = now if now is not None else time.perf_counter()
+        if self.interim is None:
+            self.interim = Segment(text, len(text.split()), first_interim_at=now)
+        else:
+            self.interim.text = text
+            self.interim.word_count = len(text.split())
+
+    def finalize(self, text: str, now: Optional[float] = None) -> Segment:
+        """Replace the interim segment with the recognizer's final text."""
+        now = now if now is not None else time.perf_counter()
+        first_interim_at = self.interim.first_interim_at if self.interim else None
+        self.interim = None
+        segment = Segment(text, len(text.split()), first_interim_at=first_interim_at, finalized_at=now)
+        self._append_final(segment)
+        return segment
+
+    def _append_final(self, segment: Segment) -> None:
+        self.segments.append(segment)
+        self._final_words += segment.word_count
+        if segment.text:
+            self._final_chars += len(segment.text) + (1 if self._final_nonempty else 0)
+            self._final_nonempty += 1
+
+    def discard_interim(self) -> None:
+        self.interim = None
+
+    def render(self) -> str:
+        texts = [segment.text for segment in self.segments if segment.text]
+        if self.interim is not None and self.interim.text:
+            texts.append(self.interim.text)
+        return " ".join(texts)
+
+    def render_final(self) -> str:
+        return " ".join(segment.text for segment in self.segments if segment.text)
+
+    def clear_final(self) -> None:
+        """Drop the finalized segments, keeping the interim one."""
+        interim = self.interim
+        self.reset()
+        self.interim = interim
+
+    def reset(self, text: str = "") -> None:
+        """Replace everything with `text` as a single finalized segment."""
+        self.segments = []
+        self.interim = None
+        self._final_words = 0
+        self._final_chars = 0
+        self._final_nonempty = 0
+        if text:
+            self._append_final(Segment(text, len(text.split())))
+
+    def clear(self) -> None:
+        self.reset()
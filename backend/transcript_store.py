@@ -0,0 +1,134 @@
+import bisect
+import logging
+import mmap
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = b" "
+
+
+class TranscriptStore:
+    """Append-only long-term transcript for one session, spilled to disk.
+
+    Text is written straight to an unlinked temporary file (so nothing is
+    left behind if the process dies) and read back through mmap. Only a
+    small tail of recent text and a per-append index are kept in memory;
+    the index holds byte offsets, cumulative word counts and timestamps so
+    word- and time-windowed reads touch only the bytes they return.
+
+    Offsets are byte offsets into the rendered transcript (entries joined by
+    single spaces, UTF-8), and always fall on entry boundaries."""
+
+    def __init__(self, directory: Optional[str] = None, tail_bytes: int = 16384):
+        self.tail_bytes = tail_bytes
+        self._file = tempfile.TemporaryFile(mode="w+b", buffering=0, dir=directory, prefix="transcript-")
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reset_index()
+
+    def _reset_index(self) -> None:
+        self.size = 0
+        self.word_count = 0
+        # One entry per append: where its text starts, the index of its first
+        # word, and when it was appended
+        self._offsets: List[int] = []
+        self._first_words: List[int] = []
+        self._timestamps: List[float] = []
+        # Recent writes as (offset, bytes); starts on an entry boundary
+        self._tail: Deque[Tuple[int, bytes]] = deque()
+        self._tail_size = 0
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def append(self, text: str, timestamp: Optional[float] = None) -> None:
+        if not text:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            data = (SEPARATOR if self.size else b"") + text.encode("utf-8")
+            self._file.write(data)
+
+            self._offsets.append(self.size + (len(SEPARATOR) if self.size else 0))
+            self._first_words.append(self.word_count)
+            self._timestamps.append(timestamp if timestamp is not None else time.time())
+            self._tail.append((self.size, data))
+            self._tail_size += len(data)
+            self.size += len(data)
+            self.word_count += len(text.split())
+
+            while len(self._tail) > 1 and self._tail_size - len(self._tail[0][1]) >= self.tail_bytes:
+                self._tail_size -= len(self._tail.popleft()[1])
+
+    def _read(self, start: int, end: int) -> bytes:
+        if start >= end:
+            return b""
+        if self._tail and start >= self._tail[0][0]:
+            tail_start = self._tail[0][0]
+            return b"".join(data for _, data in self._tail)[start - tail_start:end - tail_start]
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self.size, access=mmap.ACCESS_READ)
+        return self._map[start:end]
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> str:
+        """Text between two byte offsets previously seen as `size`."""
+        with self._lock:
+            return self._read(start, self.size if end is None else min(end, self.size)).decode("utf-8")
+
+    def text(self) -> str:
+        """The whole transcript. Materializes it; prefer the windowed reads."""
+        return self.read()
+
+    def last_words(self, n: int) -> str:
+        with self._lock:
+            if n <= 0 or not self._offsets:
+                return ""
+            first_wanted = max(0, self.word_count - n)
+            index = max(0, bisect.bisect_right(self._first_words, first_wanted) - 1)
+            words = self._read(self._offsets[index], self.size).decode("utf-8").split()
+            return " ".join(words[-n:])
+
+    def between(self, start_time: float, end_time: float) -> str:
+        """Text appended between two time.time() timestamps."""
+        with self._lock:
+            first = bisect.bisect_left(self._timestamps, start_time)
+            last = bisect.bisect_right(self._timestamps, end_time)
+            if first >= last:
+                return ""
+            end = self._offsets[last] - len(SEPARATOR) if last < len(self._offsets) else self.size
+            return self._read(self._offsets[first], end).decode("utf-8")
+
+    def reset(self, text: str = "") -> None:
+        with self._lock:
+            if self._closed:
+                return
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.seek(0)
+            self._file.truncate()
+            self._reset_index()
+        self.append(text)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
+            self._reset_index()
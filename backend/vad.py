@@ -0,0 +1,138 @@
+import logging
+from collections import deque
+from typing import Deque, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+# Quiet frames still count as speech when they cross zero this often; that
+# keeps unvoiced sounds like "s" and "f" at word edges
+UNVOICED_MARGIN_DB = 10.0
+SILENCE_DB = -120.0
+
+
+class VoiceActivityDetector:
+    """Drops silence from LINEAR16 mono audio before it reaches STT.
+
+    Each chunk is split into short frames and classified with vectorized
+    energy and zero-crossing-rate features. Speech starts after
+    `onset_ms` of consecutive speech frames and ends after `hangover_ms`
+    without one. Up to `padding_ms` of audio before the onset is forwarded
+    with it so word beginnings are not clipped. Chunks that are entirely
+    speech are forwarded unchanged."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        energy_threshold_db: float = -45.0,
+        zcr_threshold: float = 0.3,
+        onset_ms: int = 40,
+        hangover_ms: int = 400,
+        padding_ms: int = 200,
+    ):
+        self.frame_samples = max(1, sample_rate * frame_ms // 1000)
+        self.sample_rate = sample_rate
+        self.energy_threshold_db = energy_threshold_db
+        self.zcr_threshold = zcr_threshold
+        self.onset_frames = max(1, onset_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.padding_frames = padding_ms // frame_ms
+
+        self.in_speech = False
+        self._onset = 0
+        self._hangover = 0
+        # Frames held back while silent, forwarded as padding if speech starts
+        self._padding: Deque[bytes] = deque(maxlen=max(self.padding_frames, self.onset_frames))
+        # Odd trailing byte of the last chunk: the first half of a sample
+        self._carry = b""
+
+        self.samples_in = 0
+        self.samples_forwarded = 0
+
+    @property
+    def suppressed_fraction(self) -> float:
+        if not self.samples_in:
+            return 0.0
+        return 1.0 - self.samples_forwarded / self.samples_in
+
+    def _classify(self, samples: np.ndarray) -> np.ndarray:
+        """One speech/non-speech flag per frame, the last of which may be short."""
+        starts = np.arange(0, len(samples), self.frame_samples)
+        counts = np.diff(np.append(starts, len(samples)))
+
+        x = samples.astype(np.float32)
+        rms = np.sqrt(np.add.reduceat(x * x, starts) / counts)
+        with np.errstate(divide="ignore"):
+            energy_db = np.maximum(20.0 * np.log10(rms / 32768.0), SILENCE_DB)
+
+        # A sign change between sample i and i+1 is credited to sample i's frame
+        crossings = np.append(np.signbit(samples[1:]) != np.signbit(samples[:-1]), False)
+        zcr = np.add.reduceat(crossings, starts) / counts
+
+        voiced = energy_db >= self.energy_threshold_db
+        unvoiced = (energy_db >= self.energy_threshold_db - UNVOICED_MARGIN_DB) & (zcr >= self.zcr_threshold)
+        return voiced | unvoiced
+
+    def process(self, chunk: bytes) -> Tuple[bytes, List[str]]:
+        """Return the audio to forward from this chunk and any speech
+        start/end events it produced."""
+        if self._carry:
+            chunk = self._carry + chunk
+            self._carry = b""
+        usable = len(chunk) - len(chunk) % 2
+        if usable < len(chunk):
+            # Forwarding half a sample would shift every later one
+            self._carry = bytes(chunk[usable:])
+        if usable == 0:
+            return b"", []
+
+        samples = np.frombuffer(chunk, dtype="<i2", count=usable // 2)
+        flags = self._classify(samples)
+        self.samples_in += len(samples)
+
+        frame_bytes = self.frame_samples * 2
+        forwarded: List[bytes] = []
+        events: List[str] = []
+        for index, is_speech in enumerate(flags.tolist()):
+            start = index * frame_bytes
+            end = min(start + frame_bytes, usable)
+            frame = chunk[start:end]
+
+            if self.in_speech:
+                self._hangover = self.hangover_frames if is_speech else self._hangover - 1
+                if self._hangover > 0:
+                    forwarded.append(frame)
+                    continue
+                self.in_speech = False
+                self._onset = 0
+                events.append(SPEECH_END)
+                self._padding.append(frame)
+                continue
+
+            self._onset = self._onset + 1 if is_speech else 0
+            if self._onset < self.onset_frames:
+                self._padding.append(frame)
+                continue
+
+            self.in_speech = True
+            self._hangover = self.hangover_frames
+            events.append(SPEECH_START)
+            forwarded.extend(self._padding)
+            self._padding.clear()
+            forwarded.append(frame)
+
+        audio = b"".join(forwarded)
+        self.samples_forwarded += len(audio) // 2
+        return audio, events
+
+    def reset(self) -> None:
+        self.in_speech = False
+        self._onset = 0
+        self._hangover = 0
+        self._padding.clear()
+        self._carry = b""
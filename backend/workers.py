@@ -0,0 +1,156 @@
+import asyncio
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+
+# A worker that exits on its own is restarted after this many seconds
+RESPAWN_DELAY = 1.0
+
+
+class SessionDirectory:
+    """Which worker process owns each session, shared by all workers.
+
+    Every socket of a session (phone and site) must land on the same worker,
+    since that is where the session's pipeline lives. The first worker to see
+    a session id claims it for the least-loaded worker; the others redirect
+    clients there.
+    """
+
+    def __init__(self, manager, worker_ports: List[int], ctx=multiprocessing):
+        self.worker_ports = list(worker_ports)
+        self._owners = manager.dict()
+        self._lock = manager.Lock()
+        self._sessions = ctx.Array("i", len(worker_ports))
+        self._connections = ctx.Array("i", len(worker_ports))
+        # Set while the worker's process is running; new sessions only go to live workers
+        self._alive = ctx.Array("b", len(worker_ports))
+
+    @property
+    def worker_count(self) -> int:
+        return len(self.worker_ports)
+
+    def owner_of(self, session_id: str) -> Optional[int]:
+        return self._owners.get(session_id)
+
+    def claim(self, session_id: str) -> int:
+        """Return the owning worker, assigning the least-loaded one if the
+        session is new."""
+        with self._lock:
+            owner = self._owners.get(session_id)
+            if owner is None:
+                live = [i for i in range(self.worker_count) if self._alive[i]] or range(self.worker_count)
+                owner = min(
+                    live,
+                    key=lambda i: (self._sessions[i], self._connections[i], i),
+                )
+                self._owners[session_id] = owner
+                # Count it now so a burst of new sessions spreads out before
+                # the owner's next load report
+                self._sessions[owner] += 1
+            return owner
+
+    def release(self, session_id: str, worker_id: int) -> None:
+        with self._lock:
+            if self._owners.get(session_id) == worker_id:
+                del self._owners[session_id]
+
+    def report_load(self, worker_id: int, sessions: int, connections: int) -> None:
+        self._sessions[worker_id] = sessions
+        self._connections[worker_id] = connections
+
+    def mark_alive(self, worker_id: int) -> None:
+        self._alive[worker_id] = 1
+
+    def forget_worker(self, worker_id: int) -> int:
+        """Drop a worker that exited: its sessions are claimed afresh by the
+        next client that asks for them. Returns how many were dropped."""
+        with self._lock:
+            self._alive[worker_id] = 0
+            orphans = [session_id for session_id, owner in self._owners.items() if owner == worker_id]
+            for session_id in orphans:
+                del self._owners[session_id]
+            self._sessions[worker_id] = 0
+            self._connections[worker_id] = 0
+        return len(orphans)
+
+
+def _run_worker(worker_id: int, host: str, port: int, directory: SessionDirectory) -> None:
+    from mainserver import WebSocketServer
+
+    server = WebSocketServer(host=host, port=port, worker_id=worker_id, directory=directory)
+
+    def stop(signum, frame):
+        # Unwind asyncio.run normally so sessions are checkpointed and
+        # released and clients are told the server is going away
+        if server.loop is None or server.loop.is_closed():
+            raise SystemExit(0)
+        server.loop.call_soon_threadsafe(server.shutdown_event.set)
+
+    # Let the supervisor decide when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        asyncio.run(server.start_server())
+    except Exception as e:
+        print(f'❌ Worker {worker_id} error: {e}')
+
+
+def run_workers(host: str, port: int, workers: int) -> None:
+    """Run `workers` server processes sharing `port` via SO_REUSEPORT.
+
+    Worker i also listens on port + 1 + i, which is where clients are
+    redirected once their session is known to live on worker i.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager:
+        directory = SessionDirectory(manager, [port + 1 + i for i in range(workers)], ctx=ctx)
+
+        def spawn(worker_id: int):
+            process = ctx.Process(
+                target=_run_worker,
+                args=(worker_id, host, port, directory),
+                name=f"worker-{worker_id}",
+            )
+            process.start()
+            directory.mark_alive(worker_id)
+            return process
+
+        def stop(signum, frame):
+            # Unwind into the finally below so workers are stopped with the
+            # supervisor instead of being orphaned
+            raise SystemExit(0)
+
+        signal.signal(signal.SIGTERM, stop)
+        processes: Dict[int, multiprocessing.Process] = {}
+        try:
+            for worker_id in range(workers):
+                processes[worker_id] = spawn(worker_id)
+            print(f"🚀 Started {workers} workers on port {port} (direct ports {directory.worker_ports[0]}-{directory.worker_ports[-1]})")
+
+            while True:
+                exited = wait([process.sentinel for process in processes.values()])
+                for worker_id, process in list(processes.items()):
+                    if process.sentinel not in exited:
+                        continue
+                    process.join()
+                    orphans = directory.forget_worker(worker_id)
+                    print(f"⚠️ Worker {worker_id} exited with code {process.exitcode}, "
+                          f"released {orphans} session(s); restarting in {RESPAWN_DELAY:.0f}s")
+                    time.sleep(RESPAWN_DELAY)
+                    processes[worker_id] = spawn(worker_id)
+        except KeyboardInterrupt:
+            print('\n⚠️ Keyboard interrupt received, stopping workers...')
+        except SystemExit:
+            print('\n⚠️ SIGTERM received, stopping workers...')
+            raise
+        finally:
+            # A second signal must not cut the shutdown short
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+            for process in processes.values():
+                process.join(timeout=10)
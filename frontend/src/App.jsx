@@ -6,9 +6,10 @@ import { motion, useScroll } from "framer-motion";
 
 
 export default function App() {
-  let { topics, status } = useWsTopics();
+  let { topics, status, caption } = useWsTopics();
 
-  const [allTopics, setAllTopics] = useState([]);
+  // useWsTopics keeps the full, patched topic list
+  const allTopics = topics ?? [];
   const [expandedItems, setExpandedItems] = useState(new Set());
   const [scrollPosition, setScrollPosition] = useState(0);
   const scrollRef = useRef(null);
@@ -20,18 +21,6 @@ export default function App() {
     return unsubscribe;
   }, [scrollX]);
 
-  useEffect(() => {
-
-    if (!topics) return;
-    topics.forEach(new_t => {
-      if (!allTopics.map(t => t.topic_key).includes(new_t.topic_key)) {
-        setAllTopics([...allTopics, new_t]);
-      } else {
-        setAllTopics(allTopics.map(t => t.topic_key === new_t.topic_key ? new_t : t));
-      }
-    })
-  }, [topics])
-
   const toggleExpanded = (topicKey, itemIndex) => {
     const itemId = `${topicKey}-${itemIndex}`;
     setExpandedItems(prev => {
@@ -56,6 +45,10 @@ export default function App() {
         </h2>
       </header>
 
+      {caption && (
+        <p className="caption" aria-live="polite">{caption}</p>
+      )}
+
       <section className="hstrip" aria-label="Topics carousel" ref={scrollRef}>
         {allTopics.map((t, index) => {
           // Calculate staggered effects based on scroll position and index
@@ -2,13 +2,42 @@
 import { useEffect, useRef, useState } from "react";
 
 const WS_URL = import.meta.env.VITE_WS_URL; // z.B. wss://10.253.143.247:3001/ws
+const SESSION_ID = import.meta.env.VITE_SESSION_ID || "default";
+
+// Apply one delta from the server to the topic map (keyed by topic_key)
+function applyUpdate(topicMap, update) {
+  const prev = topicMap.get(update.topic_key) ?? {
+    topic_key: update.topic_key,
+    topic_summary: "",
+    content_stack: [],
+    recommendations: [],
+  };
+  const next = { ...prev };
+
+  if (update.type === "chunk_appended") {
+    const stack = [...prev.content_stack];
+    stack[update.index ?? stack.length] = { blurb: update.blurb, content: update.content };
+    next.content_stack = stack;
+  } else if (update.type === "description_changed") {
+    next.topic_summary = update.description;
+  } else if (update.type === "recommendations_replaced") {
+    next.recommendations = update.recommendations;
+  } else {
+    return;
+  }
+  topicMap.set(update.topic_key, next);
+}
 
 export function useWsTopics() {
   const [topics, setTopics] = useState(null);        // {version, topics:[...]}
   const [status, setStatus] = useState("idle");  // idle|connecting|open|error
   const [error, setError] = useState(null);
+  const [caption, setCaption] = useState("");    // live, not yet chunked transcript
 
   const wsRef = useRef(null);
+  const topicMapRef = useRef(new Map());
+  const seqRef = useRef(0);
+  const captionRef = useRef({ seq: 0, text: "" });
 
   useEffect(() => {
     if (!WS_URL) {
@@ -17,12 +46,16 @@ export function useWsTopics() {
       return;
     }
 
+    // Set when a multi-worker backend redirects us to the worker owning our session
+    let redirectUrl = null;
+
     function connect() {
       setStatus("connecting");
       setError(null);
 
-      const ws = new WebSocket(WS_URL);
+      const ws = new WebSocket(redirectUrl ?? WS_URL);
       wsRef.current = ws;
+      redirectUrl = null;
 
       
 
@@ -30,7 +63,7 @@ export function useWsTopics() {
         setStatus("open");
 
 
-        ws.send(JSON.stringify({ "type": "register_client", client_type: "site" }));
+        ws.send(JSON.stringify({ "type": "register_client", client_type: "site", session_id: SESSION_ID }));
 
       };
 
@@ -40,11 +73,43 @@ export function useWsTopics() {
 
           console.log("msg", msg);
 
-          if (msg.type === "connected") {
+          if (msg.type === "redirect") {
+            const url = new URL(WS_URL);
+            url.port = String(msg.port);
+            redirectUrl = url.toString();
+            ws.close();
+          } else if (msg.type === "connected") {
             setStatus("connected");
-          } else if (msg.type === "data") {
-            setTopics(msg.data.topics);
-            console.log("topics", msg.data.topics);
+          } else if (msg.type === "snapshot") {
+            topicMapRef.current = new Map(msg.data.topics.map(t => [t.topic_key, t]));
+            seqRef.current = msg.seq;
+            setTopics([...topicMapRef.current.values()]);
+            if (msg.caption) {
+              captionRef.current = msg.caption;
+              setCaption(msg.caption.text);
+            }
+          } else if (msg.type === "caption") {
+            // Delta against the previous caption: keep `base` UTF-16 units (JS string indices), append `text`
+            const prev = captionRef.current;
+            if (msg.seq <= prev.seq) return; // already in the snapshot
+            if (msg.seq !== prev.seq + 1) {
+              ws.send(JSON.stringify({ type: "get_snapshot" }));
+              return;
+            }
+            captionRef.current = { seq: msg.seq, text: prev.text.slice(0, msg.base) + msg.text };
+            setCaption(captionRef.current.text);
+          } else if (msg.type === "updates") {
+            for (const update of msg.updates) {
+              if (update.seq <= seqRef.current) continue; // already in the snapshot
+              if (update.seq !== seqRef.current + 1) {
+                // Missed a delta; resync from a fresh snapshot
+                ws.send(JSON.stringify({ type: "get_snapshot" }));
+                return;
+              }
+              applyUpdate(topicMapRef.current, update);
+              seqRef.current = update.seq;
+            }
+            setTopics([...topicMapRef.current.values()]);
           }
           // Optional: weitere message types hier behandeln
         } catch (e) {
@@ -59,7 +124,7 @@ export function useWsTopics() {
 
       ws.onclose = () => {
 
-        setTimeout(connect, 1000);
+        setTimeout(connect, redirectUrl ? 0 : 1000);
       };
     }
 
@@ -70,5 +135,5 @@ export function useWsTopics() {
     };
   }, []);
 
-  return { topics, status, error };
+  return { topics, status, error, caption };
 }
@@ -5,6 +5,35 @@ import Svg, { Defs, Ellipse, Filter, FeBlend, FeColorMatrix, FeComposite, FeFloo
 
 const AnimatedG = Animated.createAnimatedComponent(G);
 
+// Must match the session id the dashboard registers with
+const SESSION_ID = 'default';
+
+// Binary audio frame header, see backend/frames.py:
+// magic "EA", version, flags, 16-byte session id, uint32 sequence, uint64 timestamp (little-endian)
+const AUDIO_FRAME_HEADER_SIZE = 32;
+const MAX_SESSION_ID_BYTES = 16;
+
+// The header holds the id as UTF-8 bytes; the server rejects longer ids
+const SESSION_ID_BYTES = new TextEncoder().encode(SESSION_ID);
+if (SESSION_ID_BYTES.length > MAX_SESSION_ID_BYTES) {
+  throw new Error(`SESSION_ID must be at most ${MAX_SESSION_ID_BYTES} bytes in UTF-8`);
+}
+
+const encodeAudioFrame = (pcm: ArrayBuffer, sequence: number): ArrayBuffer => {
+  const frame = new ArrayBuffer(AUDIO_FRAME_HEADER_SIZE + pcm.byteLength);
+  const view = new DataView(frame);
+  const bytes = new Uint8Array(frame);
+  bytes[0] = 0x45; // 'E'
+  bytes[1] = 0x41; // 'A'
+  view.setUint8(2, 1);
+  view.setUint8(3, 0);
+  bytes.set(SESSION_ID_BYTES, 4);
+  view.setUint32(20, sequence >>> 0, true);
+  view.setBigUint64(24, BigInt(Date.now()), true);
+  bytes.set(new Uint8Array(pcm), AUDIO_FRAME_HEADER_SIZE);
+  return frame;
+};
+
 
 export default function HomeScreen() {
   const [isActive, setIsActive] = useState(false);
@@ -16,6 +45,11 @@ export default function HomeScreen() {
   const rotateValue = new Animated.Value(0);
   const recordingRef = useRef<Audio.Recording | null>(null);
   const socketRef = useRef<WebSocket | null>(null);
+  const sequenceRef = useRef(0);
+  // Credit-based flow control: highest sequence the server lets us send, and
+  // frames held back while we are out of credit
+  const creditLimitRef = useRef(-1);
+  const pendingFramesRef = useRef<ArrayBuffer[]>([]);
   const animationIntervalRef = useRef<number | null>(null);
   
   // Animation values for each rotating group
@@ -45,8 +79,7 @@ export default function HomeScreen() {
     };
   }, []);
 
-  const initializeWebSocket = () => {
-    const webSocketURL = 'ws://10.253.143.247:3001';
+  const initializeWebSocket = (webSocketURL: string = 'ws://10.253.143.247:3001') => {
     try {
       // Create a new WebSocket instance
       const socket = new WebSocket(webSocketURL);
@@ -62,6 +95,7 @@ export default function HomeScreen() {
         const registerMessage = {
           type: 'register_client',
           client_type: 'phone',
+          session_id: SESSION_ID,
           timestamp: Date.now(),
           capabilities: {
             audio_streaming: true,
@@ -81,6 +115,20 @@ export default function HomeScreen() {
           // Parse the received message
           const data = JSON.parse(event.data);
           console.log('WebSocket message received:', data);
+
+          if (data.type === 'flow') {
+            const acked = data.ack ?? firstPendingSequence() - 1;
+            creditLimitRef.current = acked + data.credits;
+            flushPendingFrames();
+          }
+
+          // A multi-worker backend points us at the worker that owns our session
+          if (data.type === 'redirect') {
+            const redirectURL = webSocketURL.replace(/:\d+(?=\/|$)/, `:${data.port}`);
+            socket.onclose = null;
+            socket.close();
+            initializeWebSocket(redirectURL);
+          }
         } catch (error) {
           console.log('WebSocket message received (raw):', event.data);
         }
@@ -108,6 +156,27 @@ export default function HomeScreen() {
   };
 
 
+  // Sequence number of the oldest frame still waiting for credit
+  const firstPendingSequence = () => sequenceRef.current - pendingFramesRef.current.length;
+
+  const flushPendingFrames = () => {
+    const socket = socketRef.current;
+    while (socket && pendingFramesRef.current.length > 0 && firstPendingSequence() <= creditLimitRef.current) {
+      socket.send(pendingFramesRef.current.shift()!);
+    }
+  };
+
+  const MAX_PENDING_FRAMES = 50;
+
+  const sendAudioFrame = (pcm: ArrayBuffer) => {
+    pendingFramesRef.current.push(encodeAudioFrame(pcm, sequenceRef.current++));
+    if (pendingFramesRef.current.length > MAX_PENDING_FRAMES) {
+      // Out of credit for too long: drop the oldest audio rather than grow without bound
+      pendingFramesRef.current.shift();
+    }
+    flushPendingFrames();
+  };
+
   const disconnectWebSocket = () => {
     if (socketRef.current) {
       socketRef.current.close();
@@ -209,21 +278,9 @@ export default function HomeScreen() {
                 });
               }
               
-              // Convert to base64 for transmission
-              const base64Audio = btoa(String.fromCharCode(...new Uint8Array(audioArrayBuffer as ArrayBuffer)));
-              
-              // Send real audio data
-              const message = {
-                type: 'audio_chunk',
-                data: base64Audio,
-                timestamp: Date.now(),
-                sampleRate: 16000,
-                channels: 1,
-                size: (audioArrayBuffer as ArrayBuffer).byteLength,
-                client_type: 'phone'
-              };
-              
-              socketRef.current.send(JSON.stringify(message));
+              // Send raw PCM as a binary frame (no base64/JSON overhead), or hold
+              // it until the server grants more credit
+              sendAudioFrame(audioArrayBuffer as ArrayBuffer);
               console.log(`Sent real audio chunk: ${(audioArrayBuffer as ArrayBuffer).byteLength} bytes`);
             }
 